@@ -0,0 +1,166 @@
+"""
+广播数据解析模块
+注册表只保存原始广播对象，只有在访问时才解析成结构化字段并缓存；
+解析器可插拔，内置 iBeacon、Eddystone 和厂商数据解析
+"""
+
+import struct
+import uuid
+from typing import Callable, Dict, List, Optional
+
+# 常用厂商ID（Bluetooth SIG Company Identifiers）
+COMPANY_APPLE = 0x004C
+KNOWN_COMPANIES = {
+    0x0006: 'Microsoft',
+    0x000D: 'Texas Instruments',
+    0x004C: 'Apple',
+    0x0059: 'Nordic Semiconductor',
+    0x0075: 'Samsung',
+    0x00E0: 'Google',
+    0x02E5: 'Espressif'
+}
+
+EDDYSTONE_SERVICE_UUID = '0000feaa-0000-1000-8000-00805f9b34fb'
+# Eddystone帧类型
+EDDYSTONE_UID = 0x00
+EDDYSTONE_URL = 0x10
+EDDYSTONE_TLM = 0x20
+EDDYSTONE_EID = 0x30
+
+_URL_SCHEMES = ('http://www.', 'https://www.', 'http://', 'https://')
+_URL_EXPANSIONS = ('.com/', '.org/', '.edu/', '.net/', '.info/', '.biz/', '.gov/',
+                   '.com', '.org', '.edu', '.net', '.info', '.biz', '.gov')
+
+# 缓存在 device_info 中的键：(原始广播对象, 解析器版本, 解析结果)
+_CACHE_KEY = '_decoded_advertisement'
+
+
+def decode_ibeacon(advertisement_data) -> Optional[Dict]:
+    """解析Apple iBeacon：厂商数据 0x004C，前缀 0x02 0x15"""
+    data = (advertisement_data.manufacturer_data or {}).get(COMPANY_APPLE)
+    if not data or len(data) < 23 or data[0] != 0x02 or data[1] != 0x15:
+        return None
+    major, minor, tx_power = struct.unpack_from('>HHb', data, 18)
+    return {
+        'uuid': str(uuid.UUID(bytes=bytes(data[2:18]))),
+        'major': major,
+        'minor': minor,
+        'measured_power': tx_power
+    }
+
+
+def _decode_eddystone_url(data: bytes) -> Optional[str]:
+    if len(data) < 3 or data[2] >= len(_URL_SCHEMES):
+        return None
+    parts = [_URL_SCHEMES[data[2]]]
+    for byte in data[3:]:
+        if byte < len(_URL_EXPANSIONS):
+            parts.append(_URL_EXPANSIONS[byte])
+        elif 0x20 < byte < 0x7F:
+            parts.append(chr(byte))
+        else:
+            return None
+    return ''.join(parts)
+
+
+def decode_eddystone(advertisement_data) -> Optional[Dict]:
+    """解析Eddystone（UID/URL/TLM/EID帧）"""
+    data = (advertisement_data.service_data or {}).get(EDDYSTONE_SERVICE_UUID)
+    if not data or len(data) < 2:
+        return None
+    frame_type = data[0]
+    if frame_type == EDDYSTONE_UID and len(data) >= 18:
+        return {
+            'frame': 'uid',
+            'tx_power': struct.unpack_from('b', data, 1)[0],
+            'namespace': bytes(data[2:12]).hex(),
+            'instance': bytes(data[12:18]).hex()
+        }
+    if frame_type == EDDYSTONE_URL:
+        url = _decode_eddystone_url(data)
+        if url is None:
+            return None
+        return {'frame': 'url', 'tx_power': struct.unpack_from('b', data, 1)[0], 'url': url}
+    if frame_type == EDDYSTONE_TLM and len(data) >= 14 and data[1] == 0:
+        battery_mv, temperature, adv_count, uptime = struct.unpack_from('>HhII', data, 2)
+        return {
+            'frame': 'tlm',
+            'battery_mv': battery_mv,
+            # 8.8定点数，0x8000表示不支持
+            'temperature': None if temperature == -0x8000 else temperature / 256.0,
+            'adv_count': adv_count,
+            'uptime_s': uptime / 10.0
+        }
+    if frame_type == EDDYSTONE_EID and len(data) >= 10:
+        return {'frame': 'eid', 'tx_power': struct.unpack_from('b', data, 1)[0],
+                'eid': bytes(data[2:10]).hex()}
+    return None
+
+
+def decode_manufacturer(advertisement_data) -> Optional[List[Dict]]:
+    """把厂商数据解析为 [{company_id, company, data}]"""
+    manufacturer_data = advertisement_data.manufacturer_data
+    if not manufacturer_data:
+        return None
+    return [
+        {'company_id': company_id, 'company': KNOWN_COMPANIES.get(company_id),
+         'data': bytes(data).hex()}
+        for company_id, data in manufacturer_data.items()
+    ]
+
+
+# 已注册的解析器：名称 -> decoder(advertisement_data) -> 解析结果或None
+_decoders = {
+    'ibeacon': decode_ibeacon,
+    'eddystone': decode_eddystone,
+    'manufacturer': decode_manufacturer
+}
+# 解析器变化时使已缓存的解析结果失效
+_DECODER_GENERATION = [0]
+
+
+def register_decoder(name: str, decoder: Callable[[object], Optional[object]]):
+    """注册广播解析器，解析结果出现在 decode_advertisement() 返回值的同名键下"""
+    _decoders[name] = decoder
+    _DECODER_GENERATION[0] += 1
+
+
+def unregister_decoder(name: str):
+    """注销广播解析器"""
+    if _decoders.pop(name, None) is not None:
+        _DECODER_GENERATION[0] += 1
+
+
+def decode_advertisement(device_info: Dict) -> Optional[Dict]:
+    """返回设备最近一次广播的结构化数据
+
+    包含 local_name / tx_power / service_uuids / manufacturer_data / service_data，
+    以及每个匹配的解析器的结果。结果缓存在 device_info 中，
+    收到新的广播或解析器变化之前重复调用不会再次解析。没有广播数据时返回None。
+    """
+    advertisement_data = device_info.get('advertisement_data')
+    if advertisement_data is None:
+        return None
+    cached = device_info.get(_CACHE_KEY)
+    if cached is not None and cached[0] is advertisement_data and cached[1] == _DECODER_GENERATION[0]:
+        return cached[2]
+
+    decoded = {
+        'local_name': getattr(advertisement_data, 'local_name', None),
+        'tx_power': getattr(advertisement_data, 'tx_power', None),
+        'service_uuids': list(getattr(advertisement_data, 'service_uuids', None) or []),
+        'manufacturer_data': {k: bytes(v) for k, v in
+                              (getattr(advertisement_data, 'manufacturer_data', None) or {}).items()},
+        'service_data': {k: bytes(v) for k, v in
+                         (getattr(advertisement_data, 'service_data', None) or {}).items()}
+    }
+    for name, decoder in list(_decoders.items()):
+        try:
+            result = decoder(advertisement_data)
+        except (AttributeError, IndexError, TypeError, ValueError, struct.error):
+            # 格式不符合预期的数据当作不匹配
+            result = None
+        if result is not None:
+            decoded[name] = result
+    device_info[_CACHE_KEY] = (advertisement_data, _DECODER_GENERATION[0], decoded)
+    return decoded
@@ -5,6 +5,7 @@
 """
 
 import asyncio
+import os
 import threading
 from typing import List, Dict, Callable, Optional
 from kivy.app import App
@@ -17,6 +18,10 @@ from kivy.clock import Clock
 from kivy.properties import BooleanProperty, ObjectProperty, StringProperty
 from kivy.logger import Logger
 from bluetooth_manager import BluetoothManager
+from receive_buffer import ReceiveBuffer, SUMMARIZE, format_summary
+from message_log import MessageLogView
+from device_list import DeviceListView, ORDER_PROXIMITY
+from ui_dispatcher import UIDispatcher
 
 class BluetoothAppUI(BoxLayout):
     """蓝牙APP的主界面类"""
@@ -27,7 +32,7 @@ class BluetoothAppUI(BoxLayout):
     
     status_label = ObjectProperty()
     scan_button = ObjectProperty()
-    devices_layout = ObjectProperty()
+    device_list = ObjectProperty()
     message_display = ObjectProperty()
     message_input = ObjectProperty()
     send_button = ObjectProperty()
@@ -35,9 +40,17 @@ class BluetoothAppUI(BoxLayout):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.title = "蓝牙助手"
-        self.bluetooth_manager = BluetoothManager()
+        app = App.get_running_app()
+        self.bluetooth_manager = BluetoothManager(data_dir=app.user_data_dir if app else None)
+        self.bluetooth_manager.supervisor.state_callback = self.on_link_state
+        # 接收数据先进入有界缓冲区，由UI每帧批量取出
+        self.rx_buffer = ReceiveBuffer(policy=SUMMARIZE)
+        # 所有界面修改经由调度器每帧合并应用一次
+        self.ui = UIDispatcher()
         self.devices_list = []
         self.connected_device = None
+        # 启动时不扫描，直接重连上次会话结束时仍连接的设备
+        self.reconnect_on_start = True
     
     def on_kv_post(self, base_widget):
         """KV文件加载完成后的回调"""
@@ -48,85 +61,90 @@ class BluetoothAppUI(BoxLayout):
         # 获取KV文件中的组件
         self.status_label = self.ids.status_label
         self.scan_button = self.ids.scan_button
-        self.devices_layout = self.ids.devices_layout
+        self.device_list = self.ids.device_list
         self.message_display = self.ids.message_display
         self.message_input = self.ids.message_input
         self.send_button = self.ids.send_button
         
+        # 设备列表：按地址增量更新，估算距离近的排在前面
+        self.device_list.select_callback = self.connect_device
+        self.device_list.empty_text = '未找到蓝牙设备'
+        self.device_list.item_color = (0.2, 0.6, 0.8, 1)
+        self.device_list.set_order(ORDER_PROXIMITY)
+        
+        # 完整消息历史写入磁盘
+        app = App.get_running_app()
+        if app:
+            self.message_display.log.open_history(os.path.join(app.user_data_dir, 'message_history.log'))
+        
         # 初始状态设置
         self.is_connected = False
         self.is_scanning = False
+        
+        # 每帧取一次接收缓冲区
+        Clock.schedule_interval(self.drain_received, 0)
     
     def update_status(self, message):
         """更新状态显示"""
-        def update(dt):
-            if self.status_label:
-                self.status_label.text = message
-        Clock.schedule_once(update)
+        self.ui.set('status', self._apply_status, message)
+    
+    def _apply_status(self, message):
+        if self.status_label:
+            self.status_label.text = message
     
     def update_devices_list(self, devices):
-        """更新设备列表显示"""
-        def update(dt):
-            if not self.devices_layout:
-                return
-                
-            self.devices_layout.clear_widgets()
-            if not devices:
-                no_device_label = Label(
-                    text='未找到蓝牙设备',
-                    font_size='16sp',
-                    size_hint_y=None,
-                    height=40,
-                    color=(0.5, 0.5, 0.5, 1)
-                )
-                self.devices_layout.add_widget(no_device_label)
-                return
-                
-            for device in devices:
-                device_button = Button(
-                    text=f"{device['name']} ({device['address']})",
-                    size_hint_y=None,
-                    height=50,
-                    background_color=(0.2, 0.6, 0.8, 1),
-                    on_press=lambda x, d=device: self.connect_device(d)
-                )
-                self.devices_layout.add_widget(device_button)
-                
-        Clock.schedule_once(update)
+        """更新设备列表显示（只应用变化的部分）"""
+        self.ui.set('devices', self._apply_devices, devices)
+    
+    def _apply_devices(self, devices):
+        if self.device_list:
+            self.device_list.set_devices(devices)
     
     def append_message(self, message, is_sent=False):
         """在消息显示区域添加消息"""
-        def update(dt):
-            if not self.message_display:
-                return
-            prefix = "发送: " if is_sent else "接收: "
-            color_prefix = "[color=00FF00]" if is_sent else "[color=0066CC]"
-            end_color = "[/color]"
-            formatted_message = f"{color_prefix}{prefix}{message}{end_color}\n"
-            
-            self.message_display.text += formatted_message
-            # 滚动到底部
-            self.message_display.cursor = (0, len(self.message_display.text))
-                
-        Clock.schedule_once(update)
+        self.ui.append('log', self.append_lines, self.format_message(message, is_sent))
+    
+    def format_message(self, message, is_sent=False):
+        """生成 (消息文本, 颜色) 日志条目"""
+        prefix = "发送: " if is_sent else "接收: "
+        color = (0.0, 0.6, 0.0, 1) if is_sent else (0.0, 0.4, 0.8, 1)
+        return (f"{prefix}{message}", color)
+    
+    def append_lines(self, lines):
+        """一次性追加多行到消息显示区域（在UI线程中调用）"""
+        if not self.message_display:
+            return
+        self.message_display.extend(lines)
+    
+    def drain_received(self, dt):
+        """每帧从接收缓冲区批量取出数据并显示"""
+        items, summary = self.rx_buffer.drain_summary()
+        if not items and not summary:
+            return
+        lines = [self.format_message(data) for data in items]
+        if summary and self.rx_buffer.policy == SUMMARIZE:
+            lines.append(format_summary(summary, self.rx_buffer.dropped_total))
+        self.append_lines(lines)
     
     def set_scanning_state(self, scanning):
         """设置扫描状态"""
-        def update(dt):
-            self.is_scanning = scanning
-            if self.scan_button:
-                self.scan_button.text = '正在扫描...' if scanning else '扫描蓝牙设备'
-                self.scan_button.disabled = scanning
-        Clock.schedule_once(update)
+        self.ui.set('scanning', self._apply_scanning_state, scanning)
+    
+    def _apply_scanning_state(self, scanning):
+        self.is_scanning = scanning
+        if self.scan_button:
+            self.scan_button.text = '正在扫描...' if scanning else '扫描蓝牙设备'
+            self.scan_button.disabled = scanning
     
     def set_connected_state(self, connected):
         """设置连接状态"""
-        def update(dt):
-            self.is_connected = connected
-            if self.send_button:
-                self.send_button.disabled = not connected
-                self.send_button.background_color = (0.2, 0.6, 0.8, 1) if connected else (0.7, 0.7, 0.7, 1)
-        Clock.schedule_once(update)
+        self.ui.set('connected', self._apply_connected_state, connected)
+    
+    def _apply_connected_state(self, connected):
+        self.is_connected = connected
+        if self.send_button:
+            self.send_button.disabled = not connected
+            self.send_button.background_color = (0.2, 0.6, 0.8, 1) if connected else (0.7, 0.7, 0.7, 1)
     
     def scan_devices(self):
         """扫描蓝牙设备"""
@@ -134,16 +152,43 @@ class BluetoothAppUI(BoxLayout):
             return
             
         self.set_scanning_state(True)
-        self.update_status('正在扫描蓝牙设备...')
-        self.devices_list = []
+        # 先显示缓存的设备，扫描完成后再标记确认/未确认
+        self.devices_list = self.bluetooth_manager.cached_devices() + self.bluetooth_manager.known_device_infos()
+        if self.devices_list:
+            self.update_devices_list(self.devices_list)
+            self.update_status(f'正在扫描蓝牙设备...（已显示 {len(self.devices_list)} 个缓存设备）')
+        else:
+            self.update_status('正在扫描蓝牙设备...')
         self.bluetooth_manager.scan_devices(self.on_scan_complete)
     
     def on_scan_complete(self, devices):
         """扫描完成回调"""
         self.devices_list = devices
         self.set_scanning_state(False)
-        self.update_status(f'扫描完成，找到 {len(devices)} 个设备')
-        self.update_devices_list(devices)
+        confirmed = sum(1 for d in devices if d.get('confirmed', True))
+        stale = len(devices) - confirmed
+        if stale:
+            self.update_status(f'扫描完成，找到 {confirmed} 个设备，{stale} 个缓存设备未确认')
+        else:
+            self.update_status(f'扫描完成，找到 {confirmed} 个设备')
+        # 没有扫描到的已知设备也保留在列表中，可直接按地址连接
+        self.update_devices_list(devices + self.bluetooth_manager.known_device_infos())
+    
+    def restore_last_session(self):
+        """显示已知设备，并按设置直接重连上次会话的设备（应用启动时调用）"""
+        known = self.bluetooth_manager.known_device_infos()
+        if known:
+            self.update_devices_list(known)
+        session = self.bluetooth_manager.known_devices.last_session()
+        if not (self.reconnect_on_start and session):
+            return
+        names = '、'.join(d['name'] for d in session)
+        self.update_status(f'正在重连上次的设备: {names}')
+        self.bluetooth_manager.reconnect_last_session(
+            self.on_connect_success,
+            self.on_connect_failed,
+            self.on_data_received
+        )
     
     def connect_device(self, device):
         """连接蓝牙设备"""
@@ -172,20 +217,35 @@ class BluetoothAppUI(BoxLayout):
         self.set_connected_state(False)
     
     def on_data_received(self, data):
-        """数据接收回调"""
-        self.append_message(data, is_sent=False)
+        """数据接收回调（在蓝牙线程中执行，只放入缓冲区）"""
+        self.rx_buffer.push(data)
+    
+    def on_link_state(self, address, state):
+        """链路状态变化回调（自动重连）"""
+        texts = {
+            'lost': '连接已断开，正在尝试重连...',
+            'reconnecting': '正在重新连接...',
+            'restored': '已重新连接',
+            'stalled': '链路长时间没有数据',
+            'failed': '重连失败，请重新连接设备'
+        }
+        if state in texts:
+            self.update_status(texts[state])
+    
+    def on_send_complete(self, message, success):
+        """发送完成回调（在UI线程中执行）"""
+        if success:
+            self.append_message(message, is_sent=True)
+        else:
+            self.update_status('发送失败')
     
     def send_message(self):
         """发送消息"""
         message = self.message_input.text.strip()
         if message and self.is_connected:
-            # 发送消息
-            success = self.bluetooth_manager.send_message(message)
-            if success:
-                self.append_message(message, is_sent=True)
-                self.message_input.text = ''
-            else:
-                self.update_status('发送失败')
+            # 非阻塞发送，结果通过on_send_complete回调
+            self.message_input.text = ''
+            self.bluetooth_manager.send_message_nowait(message, callback=self.on_send_complete)
         elif not self.is_connected:
             self.update_status('请先连接设备')
         elif not message:
@@ -214,6 +274,8 @@ class BluetoothApp(App):
     def on_start(self):
         """应用启动时的初始化"""
         Logger.info("蓝牙APP开始运行")
+        if self.root:
+            self.root.restore_last_session()
     
     def on_stop(self):
         """应用关闭时清理资源"""
@@ -222,7 +284,9 @@ class BluetoothApp(App):
         # 但我们需要先获取根组件
         if hasattr(self, 'root') and self.root:
             if hasattr(self.root, 'bluetooth_manager') and self.root.bluetooth_manager:
-                self.root.bluetooth_manager.disconnect_all()
+                self.root.bluetooth_manager.shutdown()
+            if self.root.message_display:
+                self.root.message_display.close()
 
 if __name__ == '__main__':
     BluetoothApp().run()
\ No newline at end of file
@@ -0,0 +1,217 @@
+"""
+后台扫描模块
+按占空比周期性扫描（每个周期扫描 scan_window 秒、间隔 scan_interval 秒），
+可与已建立的连接同时运行；超过TTL没有收到广播的设备从注册表中移除
+"""
+
+import asyncio
+from typing import Callable, Dict, List, Optional
+
+from kivy.logger import Logger
+
+from scan_filter import ScanFilter
+
+# 每个周期的扫描时长和周期长度（秒），默认占空比20%
+DEFAULT_SCAN_WINDOW = 2.0
+DEFAULT_SCAN_INTERVAL = 10.0
+# 设备超过该时间（秒）没有收到广播即视为离开
+DEFAULT_DEVICE_TTL = 60.0
+# 有活动连接时周期长度的放大倍数，给连接让出更多射频时间
+DEFAULT_BUSY_INTERVAL_FACTOR = 2.0
+
+
+class BackgroundScanner:
+    """BluetoothManager 的后台扫描器
+
+    start()/stop()/pause()/resume() 必须在蓝牙事件循环中调用（BluetoothManager.start_background_scan()/
+    stop_background_scan() 会提交到事件循环）；configure() 可在任意线程调用，
+    新参数在当前等待结束后立即生效。
+    正在建立连接时跳过本周期的扫描窗口，不和它争用射频；前台扫描期间由 BluetoothManager
+    调用 pause() 提前结束进行中的窗口，resume() 之前不再开始新的窗口。
+    device_callback(device_info, is_new) 在新设备或RSSI变化时调用，
+    expired_callback(devices) 在设备过期移除后调用，都在事件循环线程中执行。
+    """
+
+    def __init__(self, manager,
+                 scan_window: float = DEFAULT_SCAN_WINDOW,
+                 scan_interval: float = DEFAULT_SCAN_INTERVAL,
+                 device_ttl: Optional[float] = DEFAULT_DEVICE_TTL,
+                 busy_interval_factor: float = DEFAULT_BUSY_INTERVAL_FACTOR,
+                 scan_filter: Optional[ScanFilter] = None):
+        self.manager = manager
+        self.scan_window = scan_window
+        self.scan_interval = scan_interval
+        self.device_ttl = device_ttl
+        self.busy_interval_factor = busy_interval_factor
+        # 后台扫描专用的过滤条件，为None时使用 manager.scan_filter
+        self.scan_filter = scan_filter
+        self.device_callback = None
+        self.expired_callback = None
+        # 统计：完成的扫描窗口数、跳过的窗口数和过期移除的设备数
+        self.windows = 0
+        self.skipped = 0
+        self.expired = 0
+        self._task = None
+        self._wakeup = None
+        # pause() 的嵌套计数；_interrupt 提前结束扫描窗口，_idle 在没有扫描窗口进行时置位
+        self._paused = 0
+        self._interrupt = None
+        self._idle = None
+        self._validate(scan_window, scan_interval, device_ttl)
+
+    @staticmethod
+    def _validate(scan_window: float, scan_interval: float, device_ttl: Optional[float]):
+        if scan_window <= 0:
+            raise ValueError(f"扫描窗口必须大于0: {scan_window}")
+        if scan_interval < scan_window:
+            raise ValueError(f"扫描间隔不能小于扫描窗口: {scan_interval} < {scan_window}")
+        if device_ttl is not None and device_ttl <= 0:
+            raise ValueError(f"设备TTL必须大于0: {device_ttl}")
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def duty_cycle(self) -> float:
+        """扫描时间占比（不含有连接时的放大）"""
+        return self.scan_window / self.scan_interval
+
+    def configure(self, scan_window: Optional[float] = None,
+                  scan_interval: Optional[float] = None,
+                  device_ttl: Optional[float] = None,
+                  busy_interval_factor: Optional[float] = None):
+        """运行时调整参数，未指定的参数保持不变"""
+        scan_window = self.scan_window if scan_window is None else scan_window
+        scan_interval = self.scan_interval if scan_interval is None else scan_interval
+        device_ttl = self.device_ttl if device_ttl is None else device_ttl
+        self._validate(scan_window, scan_interval, device_ttl)
+        self.scan_window = scan_window
+        self.scan_interval = scan_interval
+        self.device_ttl = device_ttl
+        if busy_interval_factor is not None:
+            self.busy_interval_factor = busy_interval_factor
+        loop = self.manager.loop
+        if self._wakeup is not None and loop is not None:
+            loop.call_soon_threadsafe(self._wakeup.set)
+
+    def start(self, device_callback: Optional[Callable[[Dict, bool], None]] = None,
+              expired_callback: Optional[Callable[[List[Dict]], None]] = None):
+        """开始后台扫描（已在运行时只更新回调）"""
+        self.device_callback = device_callback
+        self.expired_callback = expired_callback
+        if self.running:
+            return
+        Logger.info(f"后台扫描已启动: 窗口 {self.scan_window} 秒 / 周期 {self.scan_interval} 秒")
+        self._wakeup = asyncio.Event()
+        self._interrupt = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        """停止后台扫描，等待当前扫描窗口的扫描器停止"""
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        self._wakeup = None
+        Logger.info("后台扫描已停止")
+
+    async def pause(self):
+        """暂停后台扫描：提前结束进行中的扫描窗口并等待其扫描器停止，可嵌套调用"""
+        self._paused += 1
+        if self._idle is not None and not self._idle.is_set():
+            self._interrupt.set()
+            await self._idle.wait()
+
+    def resume(self):
+        """恢复 pause() 暂停的后台扫描，按原周期继续"""
+        self._paused = max(self._paused - 1, 0)
+
+    def _busy(self) -> bool:
+        """暂停、正在建立连接或前台扫描时不占用射频"""
+        return self._paused > 0 or self.manager.connects_pending > 0 or self.manager.is_scanning
+
+    async def _run(self):
+        # 除了取消之外还检查任务是否已被stop()替换：唤醒和取消同时发生时wait_for可能吞掉取消
+        task = asyncio.current_task()
+        while self._task is task:
+            scanned = 0.0
+            if self._busy():
+                self.skipped += 1
+            else:
+                try:
+                    await self._scan_window()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    Logger.error(f"后台扫描出错: {e}")
+                scanned = self.scan_window
+            self.expire()
+
+            interval = self.scan_interval
+            if self.manager.clients:
+                interval *= self.busy_interval_factor
+            await self._sleep(interval - scanned)
+
+    async def _sleep(self, seconds: float):
+        """等待到下一个周期，configure() 会提前唤醒以应用新参数"""
+        self._wakeup.clear()
+        if seconds <= 0:
+            return
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _scan_window(self):
+        manager = self.manager
+        scanner = manager._create_scanner(self._device_detected,
+                                          self.scan_filter or manager.scan_filter)
+        self._interrupt.clear()
+        self._idle.clear()
+        try:
+            await scanner.start()
+            try:
+                await asyncio.wait_for(self._interrupt.wait(), self.scan_window)
+                Logger.info("后台扫描窗口提前结束")
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                await scanner.stop()
+        finally:
+            self._idle.set()
+        self.windows += 1
+
+    def _device_detected(self, device, advertisement_data):
+        device_info, is_new, rssi_changed = self.manager._record_advertisement(device, advertisement_data)
+        if is_new:
+            Logger.info(f"后台扫描发现设备: {device.name} ({device.address})")
+        elif not rssi_changed:
+            return
+        if self.device_callback is not None:
+            try:
+                self.device_callback(device_info, is_new)
+            except Exception as e:
+                Logger.error(f"后台扫描回调出错: {e}")
+
+    def expire(self) -> List[Dict]:
+        """移除超过TTL没有广播的设备（已连接设备除外），返回被移除的设备"""
+        if self.device_ttl is None:
+            return []
+        removed = self.manager._expire_cached(self.device_ttl)
+        if not removed:
+            return removed
+        self.expired += len(removed)
+        Logger.info(f"{len(removed)} 个设备已超时移除")
+        if self.expired_callback is not None:
+            try:
+                self.expired_callback(removed)
+            except Exception as e:
+                Logger.error(f"设备过期回调出错: {e}")
+        return removed
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+蓝牙管理器性能基准测试
+基于模拟后端测量扫描、连接、发送和通知各热点路径，结果输出为JSON便于版本间对比
+
+用法: python benchmark.py [--output bench.json] [--quick]
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+# 避免Kivy解析命令行参数和输出大量控制台日志
+os.environ.setdefault('KIVY_NO_ARGS', '1')
+os.environ.setdefault('KIVY_NO_CONSOLELOG', '1')
+
+import logging
+from typing import Dict, List, Optional
+
+from kivy.logger import Logger
+
+from bluetooth_manager import BluetoothManager
+from scan_filter import ScanFilter
+from simulated_backend import SimulatedBackend, SimulatedPeripheral
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """计算常用分位数（毫秒）"""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    n = len(ordered)
+
+    def pick(q):
+        return ordered[min(n - 1, int(q * n))] * 1000.0
+
+    return {
+        'count': n,
+        'min_ms': ordered[0] * 1000.0,
+        'p50_ms': pick(0.50),
+        'p90_ms': pick(0.90),
+        'p99_ms': pick(0.99),
+        'max_ms': ordered[-1] * 1000.0,
+        'mean_ms': sum(ordered) / n * 1000.0
+    }
+
+
+def connect(manager: BluetoothManager, device_info: Dict, data_callback=lambda d: None):
+    """连接模拟外设，失败时抛出RuntimeError，避免失败的连接混入测量结果"""
+    errors = []
+    if not manager.connect_device(device_info, lambda d: None, errors.append, data_callback).result():
+        raise RuntimeError(f"连接 {device_info['address']} 失败: {'; '.join(errors) or '未知错误'}")
+
+
+class ReplayBackend(SimulatedBackend):
+    """记录扫描器检测回调的模拟后端，基准测试直接向该回调重放广播"""
+
+    def __init__(self, peripherals):
+        super().__init__(peripherals)
+        self.detection_callback = None
+
+    def create_scanner(self, detection_callback, **kwargs):
+        self.detection_callback = detection_callback
+        return super().create_scanner(detection_callback, **kwargs)
+
+
+def bench_scan(data_dir: str, peripherals: int, rounds: int,
+               scan_filter: Optional[ScanFilter] = None) -> Dict:
+    """扫描回调处理能力：把预先生成的广播尽快重放给 scan_devices_async 的检测回调
+
+    回调与真实扫描相同（扫描过滤 + 注册表/RSSI平滑更新），在蓝牙事件循环中执行，
+    不经过模拟扫描器的调度，结果反映每条广播的处理开销而不是广播产生速率。
+    下推给平台的服务UUID过滤不在测量范围内。
+    """
+    backend = ReplayBackend(SimulatedBackend.fleet(peripherals).peripherals.values())
+    advertisements = [(p.device, p.advertisement())
+                      for _ in range(rounds) for p in backend.peripherals.values()]
+    manager = BluetoothManager(data_dir=data_dir, backend=backend)
+
+    async def replay():
+        manager._begin_scan()
+        manager._create_scanner(manager._on_scan_advertisement, scan_filter)
+        detected = backend.detection_callback
+        start = time.perf_counter()
+        for device, advertisement_data in advertisements:
+            detected(device, advertisement_data)
+        return time.perf_counter() - start
+
+    try:
+        elapsed = manager.submit(replay()).result()
+        devices_found = len(manager.registry)
+    finally:
+        manager.shutdown()
+    count = len(advertisements)
+    result = {
+        'peripherals': peripherals,
+        'advertisements': count,
+        'elapsed_s': elapsed,
+        'advertisements_per_sec': count / elapsed,
+        'us_per_advertisement': elapsed / count * 1e6,
+        'devices_found': devices_found
+    }
+    if scan_filter is not None:
+        result['filter_accepted'] = scan_filter.accepted
+        result['filter_rejected'] = scan_filter.rejected
+    return result
+
+
+def bench_connect(data_dir: str, count: int) -> Dict:
+    """连接延迟分位数（逐个连接，模拟外设连接耗时为0）"""
+    backend = SimulatedBackend.fleet(count, connect_latency=0.0)
+    manager = BluetoothManager(data_dir=data_dir, backend=backend)
+    samples = []
+    try:
+        for address in backend.peripherals:
+            info = backend.device_info(address)
+            start = time.perf_counter()
+            connect(manager, info)
+            samples.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for address in list(manager.clients):
+            manager.disconnect_device(address)
+        disconnect_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        infos = [backend.device_info(a) for a in backend.peripherals]
+        results = manager.connect_many(infos, lambda a, d: None, max_concurrency=8).result()
+        many_elapsed = time.perf_counter() - start
+        failed = [address for address, r in results.items() if not r['success']]
+        if failed:
+            raise RuntimeError(f"connect_many 有 {len(failed)} 个设备连接失败: {', '.join(failed)}")
+    finally:
+        manager.shutdown()
+    result = percentiles(samples)
+    result['disconnect_total_s'] = disconnect_elapsed
+    result['connect_many_total_s'] = many_elapsed
+    result['connect_many_success'] = sum(1 for r in results.values() if r['success'])
+    return result
+
+
+def bench_send(data_dir: str, messages: int, message_size: int, bulk_size: int) -> Dict:
+    """发送吞吐量：小消息写入速率和大块数据字节速率"""
+    peripheral = SimulatedPeripheral('C0:FF:00:00:00:01', 'SIM-SEND',
+                                     connect_latency=0.0, write_latency=0.001)
+    backend = SimulatedBackend([peripheral])
+    manager = BluetoothManager(data_dir=data_dir, backend=backend)
+    try:
+        connect(manager, backend.device_info(peripheral.address))
+        message = 'x' * (message_size - 1)
+
+        start = time.perf_counter()
+        futures = [manager.send_message_nowait(message) for _ in range(messages)]
+        ok = sum(1 for f in futures if f.result())
+        elapsed = time.perf_counter() - start
+
+        payload = bytes(bulk_size)
+        writes_before = peripheral.writes_received
+        start = time.perf_counter()
+        stats = manager.submit(manager.send_bytes_async(payload)).result()
+        bulk_elapsed = time.perf_counter() - start
+        metrics = manager.get_metrics()
+    finally:
+        manager.shutdown()
+    return {
+        'messages': messages,
+        'message_size': message_size,
+        'messages_ok': ok,
+        'messages_per_sec': messages / elapsed,
+        'message_bytes_per_sec': messages * message_size / elapsed,
+        'message_gatt_writes': writes_before,
+        'bulk_bytes': bulk_size,
+        'bulk_chunks': stats['chunks'] if stats else 0,
+        'bulk_bytes_per_sec': bulk_size / bulk_elapsed,
+        'manager_metrics': metrics
+    }
+
+
+def bench_notify(data_dir: str, rate: float, duration: float) -> Dict:
+    """通知到回调的延迟：通知内容携带发送时刻"""
+    peripheral = SimulatedPeripheral(
+        'C0:FF:00:00:00:02', 'SIM-NOTIFY', connect_latency=0.0, notify_rate=rate,
+        notify_payload=lambda seq: b'%d\n' % time.perf_counter_ns()
+    )
+    backend = SimulatedBackend([peripheral])
+    manager = BluetoothManager(data_dir=data_dir, backend=backend)
+    samples = []
+
+    def on_data(message):
+        samples.append((time.perf_counter_ns() - int(message)) / 1e9)
+
+    try:
+        connect(manager, backend.device_info(peripheral.address), on_data)
+        time.sleep(duration)
+        metrics = manager.get_metrics()
+    finally:
+        manager.shutdown()
+    result = percentiles(samples)
+    result['manager_metrics'] = metrics
+    result['rate_hz'] = rate
+    result['delivered_per_sec'] = len(samples) / duration
+    return result
+
+
+def run_benchmarks(quick: bool = False) -> Dict:
+    """运行全部基准测试"""
+    scale = 0.2 if quick else 1.0
+    with tempfile.TemporaryDirectory() as data_dir:
+        results = {
+            'scan': bench_scan(data_dir, int(1000 * scale) or 1, 20),
+            # 只关心5%的设备时，过滤在回调入口处丢弃其余广播的开销
+            'scan_filtered': bench_scan(data_dir, int(1000 * scale) or 1, 20,
+                                        ScanFilter(name_pattern=r'^SIM-00[0-4]')),
+            'connect': bench_connect(data_dir, int(100 * scale) or 1),
+            'send': bench_send(data_dir, int(5000 * scale) or 1, 20, int(256 * 1024 * scale)),
+            'notify': bench_notify(data_dir, 500.0, 2.0 * scale)
+        }
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'quick': quick,
+        'results': results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='蓝牙管理器性能基准测试')
+    parser.add_argument('--output', '-o', help='结果JSON文件路径（默认输出到标准输出）')
+    parser.add_argument('--quick', action='store_true', help='缩小规模快速运行')
+    args = parser.parse_args()
+
+    Logger.setLevel(logging.WARNING)
+    report = run_benchmarks(args.quick)
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+        print(f"基准测试结果已写入 {args.output}")
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+"""
+蓝牙传输后端模块
+定义BluetoothManager使用的后端接口，默认后端基于bleak
+"""
+
+from typing import Callable, Optional
+
+from bleak import BleakScanner, BleakClient
+
+
+class BluetoothBackend:
+    """蓝牙传输后端接口
+
+    create_scanner 返回的对象需要提供 bleak BleakScanner 的 start()/stop()；
+    create_client 返回的对象需要提供 bleak BleakClient 的 connect()/disconnect()/
+    start_notify()/write_gatt_char() 以及 is_connected、services、mtu_size 属性。
+    """
+
+    def create_scanner(self, detection_callback: Callable, **kwargs):
+        """创建扫描器，detection_callback(device, advertisement_data)"""
+        raise NotImplementedError
+
+    def create_client(self, device, disconnected_callback: Optional[Callable] = None, **kwargs):
+        """为设备创建客户端，disconnected_callback(client)"""
+        raise NotImplementedError
+
+
+class BleakBackend(BluetoothBackend):
+    """基于bleak的真实蓝牙后端"""
+
+    def create_scanner(self, detection_callback, **kwargs):
+        return BleakScanner(detection_callback, **kwargs)
+
+    def create_client(self, device, disconnected_callback=None, **kwargs):
+        return BleakClient(device, disconnected_callback=disconnected_callback, **kwargs)
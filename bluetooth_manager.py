@@ -4,195 +4,877 @@
 """
 
 import asyncio
+import os
 import threading
 import time
-from typing import List, Dict, Callable, Optional
-from bleak import BleakScanner, BleakClient, BleakError
+from concurrent.futures import Future
+from typing import AsyncIterator, List, Dict, Callable, Optional, Tuple, Union
+from bleak import BleakError
+from kivy.clock import Clock
 from kivy.logger import Logger
+from bluetooth_backend import BluetoothBackend, BleakBackend
+from device_registry import DeviceRegistry
+from write_engine import BulkWriter
+from write_queue import WriteQueue, DEFAULT_FLUSH_DELAY, DEFAULT_MAX_DEPTH
+from stream_decoder import StreamDecoder, FRAMING_NEWLINE
+from frame_protocol import FrameParser
+from gatt_cache import GattCache, SERVICE_CHANGED_UUID
+from link_supervisor import LinkSupervisor
+from metrics import Metrics
+from scan_filter import ScanFilter
+from advertisement import decode_advertisement
+from proximity import ProximityRanker
+from background_scanner import BackgroundScanner
+from known_devices import KnownDevices
+from gatt_profiles import GattProfile, ProfileRegistry
+
+# 同步接口等待后台事件循环结果的最长时间（秒）
+SYNC_CALL_TIMEOUT = 30.0
+# 接收数据空闲多久（秒）后输出未找到帧结束符的数据
+RX_IDLE_FLUSH = 0.2
+# 默认扫描时长（秒）
+SCAN_DURATION = 10.0
+# 扫描结果缓存时间（秒）：超过该时间没有收到广播的设备在下一轮扫描开始时移除
+SCAN_CACHE_TTL = 300.0
+# 批量连接时默认的并发连接数（适配器一般能同时处理3-7个连接请求）
+CONNECT_CONCURRENCY = 4
+# 批量连接时单个设备的默认超时（秒）
+CONNECT_TIMEOUT = 15.0
+# 默认的本地数据目录（GATT缓存等）
+DEFAULT_DATA_DIR = os.path.join(os.path.expanduser('~'), '.bluetooth_assistant')
+# 本地数据文件的写入延迟（秒）：在后台线程中合并写入，不阻塞事件循环
+STORE_SAVE_DELAY = 1.0
 
 class BluetoothManager:
-    def __init__(self):
+    def __init__(self, data_dir: Optional[str] = None,
+                 backend: Optional[BluetoothBackend] = None):
         self.clients = {}
+        # 传输后端，默认使用bleak；测试和压测时可换成SimulatedBackend
+        self.backend = backend or BleakBackend()
         self.scanner = None
         self.is_scanning = False
-        self.discovered_devices = []
+        # 默认扫描过滤条件（ScanFilter），各扫描方法也可以单独指定
+        self.scan_filter = None
+        # 扫描结果缓存时间，新一轮扫描保留缓存的设备并标记为未确认；为None时每轮扫描都清空
+        self.scan_cache_ttl = SCAN_CACHE_TTL
+        # 按地址索引的设备注册表，扫描结果和连接状态都记录在这里
+        self.registry = DeviceRegistry()
+        # RSSI平滑和接近度排名，扫描时随广播更新
+        self.proximity = ProximityRanker()
+        # 发送队列参数：小消息合并等待时间和最大排队消息数
+        self.write_flush_delay = DEFAULT_FLUSH_DELAY
+        self.write_queue_depth = DEFAULT_MAX_DEPTH
+        # 接收数据分帧参数（StreamDecoder的关键字参数），可在connect_device_async中覆盖
+        self.rx_framing = {'framing': FRAMING_NEWLINE}
+        # 接收空闲超时（秒）：发送不带结束符文本的模块也能及时显示，为None时只在断开时输出
+        self.rx_idle_flush = RX_IDLE_FLUSH
+        # GATT配置：按设备名称/服务UUID选择通知、写入特征值和写入方式，可注册自定义配置
+        self.profiles = ProfileRegistry()
+        # 本地数据目录，GATT布局记录等保存在这里（见GattCache）
+        self.data_dir = data_dir or DEFAULT_DATA_DIR
+        self.gatt_cache = GattCache(os.path.join(self.data_dir, 'gatt_cache.json'),
+                                    save_delay=STORE_SAVE_DELAY)
+        # 连接过的设备，启动时可不扫描直接重连上次会话的设备
+        self.known_devices = KnownDevices(os.path.join(self.data_dir, 'known_devices.json'),
+                                          save_delay=STORE_SAVE_DELAY)
+        # 延迟直方图、计数器和设备状态量，通过 get_metrics() 读取快照
+        self.metrics = Metrics()
+        # 连接监督：意外断开时自动重连，参数可通过 self.supervisor 调整
+        self.supervisor = LinkSupervisor(self)
+        # 后台占空比扫描，参数可通过 self.background_scanner.configure() 运行时调整
+        self.background_scanner = BackgroundScanner(self)
+        # 正在建立的连接数，后台扫描在此期间让出射频
+        self.connects_pending = 0
+        # 所有客户端都创建并运行在同一个常驻事件循环中
+        self.loop = None
+        self._loop_thread = None
+        self._loop_lock = threading.Lock()
+        # 关闭过程中断开的连接仍算作上次会话的设备
+        self._closing = False
+    
+    @property
+    def discovered_devices(self) -> List[Dict]:
+        """已发现的设备列表（按发现顺序）"""
+        return self.registry.devices()
+    
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """启动（如尚未启动）后台事件循环线程"""
+        with self._loop_lock:
+            if self.loop is not None and self._loop_thread.is_alive():
+                return self.loop
+            
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+            
+            def run_loop():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(ready.set)
+                try:
+                    loop.run_forever()
+                finally:
+                    loop.close()
+            
+            self._loop_thread = threading.Thread(
+                target=run_loop, name='BluetoothLoop', daemon=True
+            )
+            self._loop_thread.start()
+            ready.wait()
+            self.loop = loop
+            Logger.info("蓝牙事件循环线程已启动")
+            return loop
+    
+    def submit(self, coro) -> Future:
+        """将协程提交到后台事件循环，返回concurrent.futures.Future"""
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(coro, loop)
+    
+    def shutdown(self):
+        """断开所有连接并停止后台事件循环"""
+        self._closing = True
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.supervisor.stop)
+            if self.background_scanner.running:
+                try:
+                    self.stop_background_scan().result(timeout=SYNC_CALL_TIMEOUT)
+                except Exception as e:
+                    Logger.error(f"停止后台扫描时出错: {e}")
+        self.disconnect_all()
+        with self._loop_lock:
+            loop, thread = self.loop, self._loop_thread
+            self.loop = None
+            self._loop_thread = None
+            self._closing = False
+        if loop is not None and thread is not None and thread.is_alive():
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout=5)
+            Logger.info("蓝牙事件循环线程已停止")
+        # 写入延迟中尚未保存的设备记录和GATT布局
+        self.known_devices.flush()
+        self.gatt_cache.flush()
+        
+    def _create_scanner(self, device_detected: Callable, scan_filter: Optional[ScanFilter]):
+        """创建扫描器：服务UUID下推给后端，其余条件在回调入口处过滤"""
+        if scan_filter is None:
+            return self.backend.create_scanner(device_detected)
+        matches = scan_filter.matches
         
-    async def scan_devices_async(self, callback: Callable[[List[Dict]], None]):
-        """异步扫描蓝牙设备"""
+        def filtered(device, advertisement_data):
+            if matches(device, advertisement_data):
+                device_detected(device, advertisement_data)
+        
+        return self.backend.create_scanner(filtered, **scan_filter.scanner_options())
+    
+    def _record_advertisement(self, device, advertisement_data) -> Tuple[Dict, bool, bool]:
+        """记录一次广播：更新注册表和RSSI平滑，返回 (device_info, is_new, rssi_changed)"""
+        device_info, is_new, rssi_changed = self.registry.update(device, advertisement_data)
+        address = device_info['address']
+        device_info['rssi_smoothed'] = self.proximity.update(
+            address, advertisement_data.rssi, getattr(advertisement_data, 'tx_power', None))
+        device_info['distance'] = self.proximity.distance(address)
+        return device_info, is_new, rssi_changed
+    
+    def _on_scan_advertisement(self, device, advertisement_data):
+        """scan_devices_async 的设备检测回调"""
+        _, is_new, _ = self._record_advertisement(device, advertisement_data)
+        if is_new:
+            Logger.info(f"发现设备: {device.name} ({device.address})")
+    
+    def _begin_scan(self):
+        """开始新一轮扫描：移除过期的缓存设备，其余标记为未确认，扫描中收到广播后重新确认"""
+        if self.scan_cache_ttl is None:
+            self.clear_scan_cache()
+            return
+        self._expire_cached(self.scan_cache_ttl)
+        self.registry.mark_stale()
+    
+    def _expire_cached(self, ttl: float) -> List[Dict]:
+        """移除超过ttl秒没有广播的设备（已连接设备除外）"""
+        removed = self.registry.expire(ttl)
+        for device_info in removed:
+            self.proximity.remove(device_info['address'])
+        return removed
+    
+    def clear_scan_cache(self):
+        """清空扫描结果缓存（保留已连接设备）"""
+        self.registry.clear()
+        self.proximity.clear()
+    
+    def known_device_infos(self) -> List[Dict]:
+        """已知设备中还不在扫描缓存里的设备（可不扫描直接连接）"""
+        return [d for d in self.known_devices.device_infos() if d['address'] not in self.registry]
+    
+    def cached_devices(self) -> List[Dict]:
+        """返回缓存的设备（不扫描，可在新一轮扫描完成前立即显示），confirmed 区分本轮是否已确认"""
+        if self.scan_cache_ttl is not None:
+            return [d for d in self.registry.devices()
+                    if d['connected'] or time.monotonic() - d['last_seen'] <= self.scan_cache_ttl]
+        return self.registry.devices()
+    
+    async def scan_devices_async(self, callback: Callable[[List[Dict]], None],
+                                 scan_filter: Optional[ScanFilter] = None):
+        """异步扫描蓝牙设备，scan_filter 默认使用 self.scan_filter
+        
+        callback(devices) 收到本轮确认的设备和仍在缓存期内的未确认设备（confirmed 为False）
+        """
         try:
             self.is_scanning = True
-            devices = []
-            
-            def device_detected(device, advertisement_data):
-                """设备检测回调"""
-                device_info = {
-                    'name': device.name or '未知设备',
-                    'address': device.address,
-                    'rssi': advertisement_data.rssi,
-                    'device': device
-                }
-                # 避免重复添加同一设备
-                if not any(d['address'] == device.address for d in devices):
-                    devices.append(device_info)
-                    Logger.info(f"发现设备: {device.name} ({device.address})")
+            # 前台扫描期间暂停后台扫描，两个扫描器不同时运行
+            await self.background_scanner.pause()
+            self._begin_scan()
             
             # 启动扫描器
-            self.scanner = BleakScanner(device_detected)
+            self.scanner = self._create_scanner(self._on_scan_advertisement,
+                                                scan_filter or self.scan_filter)
             await self.scanner.start()
             
             # 扫描10秒
-            await asyncio.sleep(10)
+            await asyncio.sleep(SCAN_DURATION)
             
             # 停止扫描
             await self.scanner.stop()
             self.is_scanning = False
-            self.discovered_devices = devices
+            devices = self.registry.devices()
             
-            Logger.info(f"扫描完成，发现 {len(devices)} 个设备")
+            confirmed = sum(1 for d in devices if d['confirmed'])
+            Logger.info(f"扫描完成，发现 {confirmed} 个设备，缓存中未确认 {len(devices) - confirmed} 个")
             callback(devices)
             
         except Exception as e:
             Logger.error(f"扫描蓝牙设备时出错: {e}")
-            self.is_scanning = False
             callback([])
+        finally:
+            self.is_scanning = False
+            self.background_scanner.resume()
     
-    def scan_devices(self, callback: Callable[[List[Dict]], None]):
-        """在单独线程中执行异步扫描"""
-        def run_scan():
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
+    def scan_devices(self, callback: Callable[[List[Dict]], None],
+                     scan_filter: Optional[ScanFilter] = None) -> Future:
+        """在后台事件循环中执行异步扫描"""
+        return self.submit(self.scan_devices_async(callback, scan_filter))
+    
+    @staticmethod
+    def _scan_target_matched(device_info: Dict, advertisement_data,
+                             target_name: Optional[str],
+                             target_address: Optional[str],
+                             target_service: Optional[str]) -> bool:
+        """判断设备是否为扫描目标"""
+        if target_address and device_info['address'].upper() == target_address.upper():
+            return True
+        if target_name and target_name in device_info['name']:
+            return True
+        if target_service:
+            uuids = getattr(advertisement_data, 'service_uuids', None) or []
+            return target_service.lower() in (u.lower() for u in uuids)
+        return False
+    
+    async def scan_stream(self, duration: float = SCAN_DURATION,
+                          target_name: Optional[str] = None,
+                          target_address: Optional[str] = None,
+                          target_service: Optional[str] = None,
+                          max_devices: Optional[int] = None,
+                          scan_filter: Optional[ScanFilter] = None) -> AsyncIterator[Tuple[Dict, bool]]:
+        """流式扫描，逐个产出 (device_info, is_new)
+        
+        新发现的设备和RSSI变化都会立即产出；找到目标设备（名称/地址/服务UUID）
+        或已发现max_devices个设备时提前结束扫描，否则最多扫描duration秒。
+        不满足 scan_filter（默认 self.scan_filter）的广播在入队之前就被丢弃。
+        提前退出迭代时应调用 aclose() 以便立即停止扫描器。
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        seen = set()
+        
+        def device_detected(device, advertisement_data):
+            """设备检测回调，只入队，处理放在迭代器中"""
+            queue.put_nowait((device, advertisement_data))
+        
+        try:
+            self.is_scanning = True
+            await self.background_scanner.pause()
+            self._begin_scan()
+            self.scanner = self._create_scanner(device_detected, scan_filter or self.scan_filter)
+            await self.scanner.start()
+            deadline = loop.time() + duration
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    device, advertisement_data = await asyncio.wait_for(queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                
+                device_info, is_new, rssi_changed = self._record_advertisement(device, advertisement_data)
+                if is_new:
+                    Logger.info(f"发现设备: {device.name} ({device.address})")
+                elif not rssi_changed:
+                    continue
+                seen.add(device.address)
+                
+                yield device_info, is_new
+                
+                if self._scan_target_matched(device_info, advertisement_data,
+                                             target_name, target_address, target_service):
+                    Logger.info(f"找到目标设备，提前结束扫描: {device_info['name']}")
+                    break
+                if max_devices and len(seen) >= max_devices:
+                    break
+        finally:
+            self.is_scanning = False
+            if self.scanner is not None:
+                try:
+                    await self.scanner.stop()
+                except Exception as e:
+                    Logger.error(f"停止扫描器时出错: {e}")
+            self.background_scanner.resume()
+            Logger.info(f"扫描结束，发现 {len(seen)} 个设备")
+    
+    def scan_devices_streaming(self, device_callback: Callable[[Dict, bool], None],
+                               complete_callback: Optional[Callable[[List[Dict]], None]] = None,
+                               **criteria) -> Future:
+        """在后台事件循环中执行流式扫描
+        
+        device_callback(device_info, is_new) 在每个新设备或RSSI更新时调用，
+        complete_callback(devices) 在扫描结束后调用。criteria 同 scan_stream 参数。
+        """
+        async def run():
+            stream = self.scan_stream(**criteria)
             try:
-                loop.run_until_complete(self.scan_devices_async(callback))
+                async for device_info, is_new in stream:
+                    device_callback(device_info, is_new)
+            except Exception as e:
+                Logger.error(f"扫描蓝牙设备时出错: {e}")
             finally:
-                loop.close()
+                await stream.aclose()
+            if complete_callback is not None:
+                complete_callback(self.discovered_devices)
+            return self.discovered_devices
+        
+        return self.submit(run())
+    
+    def start_background_scan(self, device_callback: Optional[Callable[[Dict, bool], None]] = None,
+                              expired_callback: Optional[Callable[[List[Dict]], None]] = None,
+                              **params) -> Future:
+        """开始（或调整）后台占空比扫描，可与已有连接同时运行
+        
+        params 为 scan_window / scan_interval / device_ttl / busy_interval_factor，
+        见 BackgroundScanner；回调在事件循环线程中调用。与一次性扫描不同，
+        开始后台扫描不会清空已有的扫描结果。
+        """
+        scanner = self.background_scanner
+        
+        async def start():
+            if params:
+                scanner.configure(**params)
+            scanner.start(device_callback, expired_callback)
         
-        scan_thread = threading.Thread(target=run_scan, daemon=True)
-        scan_thread.start()
+        return self.submit(start())
+    
+    def stop_background_scan(self) -> Future:
+        """停止后台扫描"""
+        return self.submit(self.background_scanner.stop())
     
     async def connect_device_async(self, device_info: Dict, 
                                  success_callback: Callable,
                                  failed_callback: Callable,
-                                 data_callback: Callable):
-        """异步连接设备"""
+                                 data_callback: Callable,
+                                 framing: Optional[Dict] = None,
+                                 frame_parser: Optional[FrameParser] = None,
+                                 timeout: Optional[float] = None,
+                                 profile: Optional[Union[str, GattProfile]] = None) -> bool:
+        """异步连接设备，返回是否连接成功
+        
+        framing 为接收数据的分帧参数（见StreamDecoder），默认使用GATT配置或 self.rx_framing；
+        指定 frame_parser 时按二进制帧协议解析，data_callback 收到每帧负载的memoryview
+        （可直接传入FrameDispatcher）；timeout 为连接超时（秒），默认使用bleak的设置；
+        profile 为GATT配置或其名称，默认由 self.profiles 按设备信息和服务发现结果选择
+        """
+        client = None
+        from_cache = False
+        self.connects_pending += 1
         try:
             device = device_info['device']
-            address = device.address
+            address = device_info['address']
             name = device_info['name']
             
             Logger.info(f"正在连接设备: {name} ({address})")
             
-            # 创建客户端
-            client = BleakClient(device)
+            # 创建客户端（连接过的设备让后端复用它自己的服务缓存，见GattCache）
+            client_options = self.gatt_cache.client_options(address)
+            if timeout is not None:
+                client_options['timeout'] = timeout
+            client = self.backend.create_client(
+                device,
+                disconnected_callback=lambda c: self._on_client_disconnected(address, c),
+                **client_options
+            )
             
-            # 设置数据接收回调
-            def data_received(data):
-                """数据接收回调"""
+            # 设置数据接收回调（decoder 在确定GATT配置后创建）
+            metrics = self.metrics
+            loop = asyncio.get_running_loop()
+            idle_flush = self.rx_idle_flush
+            idle_timer = None
+            last_rx = 0.0
+            
+            def dispatch(message):
+                """调用数据回调，回调出错单独计数，不影响后续消息和解码状态"""
                 try:
-                    message = data.decode('utf-8')
-                    Logger.info(f"收到数据: {message}")
                     data_callback(message)
                 except Exception as e:
+                    metrics.incr('callback_errors')
+                    Logger.error(f"数据回调出错: {e}")
+            
+            def decode(step):
+                """执行一次解码，统计其中包含无效字节的数据包，返回完整的消息"""
+                errors = decoder.decode_errors
+                try:
+                    messages = step()
+                except Exception as e:
+                    metrics.incr('decode_errors')
                     Logger.error(f"解析接收数据时出错: {e}")
+                    return []
+                if decoder.decode_errors != errors:
+                    metrics.incr('decode_errors', decoder.decode_errors - errors)
+                    Logger.warning(f"接收数据不是有效的{decoder.encoding}编码，无效字节已替换")
+                return messages
+            
+            def deliver(messages):
+                for message in messages:
+                    Logger.info(f"收到数据: {message}")
+                    dispatch(message)
+            
+            def flush_rx():
+                """输出解码器中未完成的帧（接收空闲超时或连接断开时）"""
+                nonlocal idle_timer
+                if idle_timer is not None:
+                    idle_timer.cancel()
+                    idle_timer = None
+                deliver(decode(decoder.flush))
+            
+            def idle_check():
+                nonlocal idle_timer
+                idle_timer = None
+                remaining = last_rx + idle_flush - loop.time()
+                if remaining > 0:
+                    idle_timer = loop.call_later(remaining, idle_check)
+                elif decoder.pending:
+                    flush_rx()
+            
+            def data_received(sender, data):
+                """数据接收回调"""
+                nonlocal idle_timer, last_rx
+                start = time.perf_counter()
+                self.supervisor.touch(address)
+                metrics.incr('bytes_in', len(data))
+                metrics.incr_gauge(address, 'bytes_in', len(data))
+                deliver(decode(lambda: decoder.feed(data)))
+                # 有分隔符的分帧方式在接收空闲后输出不完整的帧（固定长度分帧不拆帧）
+                if idle_flush is not None and decoder.separator is not None and decoder.pending:
+                    last_rx = loop.time()
+                    if idle_timer is None:
+                        idle_timer = loop.call_later(idle_flush, idle_check)
+                metrics.record('notify_dispatch', time.perf_counter() - start)
+            
+            def frame_received(sender, data):
+                """二进制帧接收回调"""
+                start = time.perf_counter()
+                self.supervisor.touch(address)
+                metrics.incr('bytes_in', len(data))
+                metrics.incr_gauge(address, 'bytes_in', len(data))
+                errors = frame_parser.crc_errors + frame_parser.framing_errors
+                try:
+                    frame_parser.feed(data, dispatch)
+                except Exception as e:
+                    Logger.error(f"解析二进制帧时出错: {e}")
+                errors = frame_parser.crc_errors + frame_parser.framing_errors - errors
+                if errors:
+                    metrics.incr('decode_errors', errors)
+                metrics.record('notify_dispatch', time.perf_counter() - start)
             
-            client.register_for_notify(0xFFE0, data_received)  # 通用串口服务UUID
+            notify_handler = frame_received if frame_parser is not None else data_received
             
             # 连接设备
-            await client.connect()
-            Logger.info(f"设备连接成功: {name}")
+            connect_start = time.perf_counter()
+            connect_options = self.gatt_cache.connect_options(address)
+            from_cache = bool(client_options.get('winrt') or connect_options)
+            if timeout is not None:
+                await asyncio.wait_for(client.connect(**connect_options), timeout)
+            else:
+                await client.connect(**connect_options)
+            Logger.info(f"设备连接成功: {name}，耗时 {time.perf_counter() - connect_start:.2f} 秒")
+            
+            # 记录完整发现得到的GATT布局，订阅Service Changed以便服务变化时删除记录
+            try:
+                if self.gatt_cache.update(address, client.services, from_cache) is False:
+                    Logger.info(f"已记录GATT布局: {name}")
+            except Exception as e:
+                Logger.warning(f"记录GATT布局失败: {e}")
+            await self._watch_service_changed(client, address)
+            
+            # 选择GATT配置并解析特征值对象，本连接的收发都直接使用这些对象
+            gatt_profile = self._select_profile(device_info, client.services, profile)
+            characteristics = gatt_profile.resolve(client.services)
+            Logger.info(f"使用GATT配置: {gatt_profile.name}")
+            
+            # 每个连接一个增量解码器，跨包的字符和消息会被拼接完整
+            decoder = StreamDecoder(**(framing or gatt_profile.framing or self.rx_framing))
             
             # 启动通知
-            await client.start_notify(0xFFE0, data_received)
+            await client.start_notify(characteristics['notify'], notify_handler)
+            
+            # 读取MTU和写特征值属性，后续写入复用
+            writer = BulkWriter(client, characteristics['write'], gatt_profile.write_response)
+            writer.resolve()
             
             # 保存客户端
+            device_info = self.registry.add(device_info)
+            device_info['confirmed'] = True
+            device_info['profile'] = gatt_profile.name
             self.clients[address] = {
                 'client': client,
                 'device_info': device_info,
-                'name': name
+                'name': name,
+                'profile': gatt_profile,
+                'characteristics': characteristics,
+                'writer': writer,
+                'queue': WriteQueue(writer, self.write_flush_delay, self.write_queue_depth),
+                'decoder': decoder,
+                'flush_rx': flush_rx if frame_parser is None else None,
+                'frame_parser': frame_parser
             }
+            self.registry.set_connected(address, True)
+            layout = self.gatt_cache.get(address)
+            self.known_devices.remember(device_info, device_info.get('profile'),
+                                        layout.get('hash') if layout else None)
+            # 记录连接参数，链路意外断开时用同样的回调重连
+            self.supervisor.track(address, {
+                'device_info': device_info,
+                'success_callback': success_callback,
+                'failed_callback': failed_callback,
+                'data_callback': data_callback,
+                'options': {'framing': framing, 'frame_parser': frame_parser, 'timeout': timeout,
+                            'profile': profile}
+            })
+            
+            self.metrics.record('connect', time.perf_counter() - connect_start)
+            self.metrics.incr('connects')
+            self.metrics.set_gauge(address, 'chunk_size', writer.chunk_size)
             
             success_callback(device_info)
+            return True
             
         except BleakError as e:
+            self.metrics.incr('connect_failures')
             Logger.error(f"连接设备失败: {e}")
+            self._drop_stale_layout(address, from_cache)
+            await self._cleanup_failed_client(client)
             failed_callback(str(e))
+        except asyncio.TimeoutError:
+            self.metrics.incr('connect_failures')
+            Logger.error(f"连接设备超时: {device_info.get('name')}")
+            await self._cleanup_failed_client(client)
+            failed_callback("连接超时")
+        except LookupError as e:
+            self.metrics.incr('connect_failures')
+            Logger.error(f"连接设备失败: {e}")
+            self._drop_stale_layout(address, from_cache)
+            await self._cleanup_failed_client(client)
+            failed_callback(str(e))
+        except asyncio.CancelledError:
+            # 连接流程被取消（例如关闭或批量连接被取消）时断开已建立的链路，避免泄漏客户端
+            Logger.info(f"连接设备已取消: {device_info.get('name')}")
+            await self._cleanup_failed_client(client)
+            raise
         except Exception as e:
+            self.metrics.incr('connect_failures')
             Logger.error(f"连接设备时发生未知错误: {e}")
+            await self._cleanup_failed_client(client)
             failed_callback(f"未知错误: {e}")
+        finally:
+            self.connects_pending -= 1
+        return False
+    
+    def _select_profile(self, device_info: Dict, services,
+                        profile: Optional[Union[str, GattProfile]]) -> GattProfile:
+        """确定连接使用的GATT配置：显式指定 > 设备信息/广播匹配 > 服务发现结果 > 默认配置"""
+        if isinstance(profile, GattProfile):
+            return profile
+        if profile is not None:
+            found = self.profiles.get(profile)
+            if found is None:
+                raise LookupError(f"未知的GATT配置: {profile}")
+            return found
+        matched = self.profiles.match(device_info)
+        if matched is None or matched is self.profiles.default:
+            # 广播中经常没有服务UUID，按实际发现的服务再匹配一次
+            matched = self.profiles.match_services(services) or matched
+        if matched is None:
+            raise LookupError(f"没有与设备匹配的GATT配置: {device_info.get('name')}")
+        return matched
+    
+    def _on_client_disconnected(self, address: str, client):
+        """bleak断开回调：链路意外断开时清理连接并交给监督器重连"""
+        entry = self.clients.get(address)
+        if entry is None or entry['client'] is not client:
+            # 主动断开（已从clients移除）或旧连接的回调
+            return
+        del self.clients[address]
+        entry['queue'].close()
+        if entry['flush_rx'] is not None:
+            entry['flush_rx']()
+        if entry['frame_parser'] is not None:
+            entry['frame_parser'].reset()
+        self.registry.set_connected(address, False)
+        self.supervisor.on_disconnected(address)
+    
+    def _drop_stale_layout(self, address: str, from_cache: bool):
+        """复用后端服务缓存的连接失败时删除布局记录，下次连接重新完整发现服务"""
+        if from_cache:
+            Logger.info(f"缓存的服务不可用，下次连接重新发现服务: {address}")
+            self.gatt_cache.invalidate(address)
+    
+    async def _watch_service_changed(self, client, address: str):
+        """订阅Service Changed指示，设备服务变化时删除其GATT缓存"""
+        try:
+            char = client.services.get_characteristic(SERVICE_CHANGED_UUID)
+            if char is None or 'indicate' not in char.properties:
+                return
+            
+            def service_changed(sender, data):
+                Logger.info(f"设备服务已变化，清除GATT缓存: {address}")
+                self.gatt_cache.invalidate(address)
+            
+            await client.start_notify(char, service_changed)
+        except Exception as e:
+            Logger.warning(f"订阅Service Changed失败: {e}")
+    
+    @staticmethod
+    async def _cleanup_failed_client(client):
+        """连接流程中途失败时断开已建立的链路"""
+        if client is None:
+            return
+        try:
+            if client.is_connected:
+                await client.disconnect()
+        except Exception as e:
+            Logger.error(f"清理失败连接时出错: {e}")
     
     def connect_device(self, device_info: Dict,
                       success_callback: Callable,
                       failed_callback: Callable,
-                      data_callback: Callable):
-        """在单独线程中执行异步连接"""
-        def run_connect():
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                loop.run_until_complete(
-                    self.connect_device_async(device_info, success_callback, failed_callback, data_callback)
-                )
-            finally:
-                loop.close()
+                      data_callback: Callable,
+                      **options) -> Future:
+        """在后台事件循环中执行异步连接，options 同 connect_device_async 的可选参数"""
+        return self.submit(
+            self.connect_device_async(device_info, success_callback, failed_callback, data_callback,
+                                      **options)
+        )
+    
+    async def connect_many_async(self, devices: List[Dict],
+                                 data_callback: Callable[[str, object], None],
+                                 max_concurrency: int = CONNECT_CONCURRENCY,
+                                 timeout: float = CONNECT_TIMEOUT,
+                                 progress_callback: Optional[Callable[[str, Dict], None]] = None,
+                                 success_callback: Optional[Callable[[Dict], None]] = None,
+                                 failed_callback: Optional[Callable[[str], None]] = None,
+                                 **options) -> Dict[str, Dict]:
+        """并发连接多个设备，同时进行的连接数不超过max_concurrency
         
-        connect_thread = threading.Thread(target=run_connect, daemon=True)
-        connect_thread.start()
+        data_callback(address, data) 接收所有设备的数据；
+        progress_callback(address, result) 在每个设备连接结束时调用；
+        success_callback / failed_callback 与 connect_device_async 相同，每个设备各调用一次（可选）；
+        同一地址出现多次时只连接第一次出现的设备信息；
+        返回 {address: {'success', 'error', 'elapsed'}}
+        """
+        unique = {}
+        for device_info in devices:
+            unique.setdefault(device_info['address'], device_info)
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        results = {}
+        
+        async def connect_one(device_info):
+            address = device_info['address']
+            start = time.perf_counter()
+            errors = []
+            
+            def failed(error):
+                errors.append(error)
+                if failed_callback is not None:
+                    failed_callback(error)
+            
+            success = address in self.clients
+            if not success:
+                async with semaphore:
+                    # 排队期间设备可能已由 connect_device 或链路重连连上
+                    success = address in self.clients or await self.connect_device_async(
+                        device_info,
+                        success_callback or (lambda info: None),
+                        failed,
+                        lambda data: data_callback(address, data),
+                        timeout=timeout,
+                        **options
+                    )
+            result = {
+                'success': success,
+                'error': errors[0] if errors else None,
+                'elapsed': time.perf_counter() - start
+            }
+            results[address] = result
+            if progress_callback is not None:
+                progress_callback(address, result)
+        
+        await asyncio.gather(*(connect_one(d) for d in unique.values()))
+        connected = sum(1 for r in results.values() if r['success'])
+        Logger.info(f"批量连接完成: 成功 {connected}/{len(unique)}")
+        return results
+    
+    async def reconnect_last_session_async(self, success_callback: Callable,
+                                           failed_callback: Callable,
+                                           data_callback: Callable,
+                                           max_concurrency: int = CONNECT_CONCURRENCY,
+                                           timeout: float = CONNECT_TIMEOUT,
+                                           **options) -> Dict[str, bool]:
+        """不扫描，按地址直接重连上次会话结束时仍连接的设备
+        
+        回调与 connect_device_async 相同，每个设备各调用一次；返回 {address: 是否成功}
+        """
+        devices = self.known_devices.last_session()
+        if not devices:
+            return {}
+        Logger.info(f"重连上次会话的 {len(devices)} 个设备")
+        results = await self.connect_many_async(
+            devices, lambda address, data: data_callback(data), max_concurrency, timeout,
+            success_callback=success_callback, failed_callback=failed_callback, **options
+        )
+        return {address: result['success'] for address, result in results.items()}
+    
+    def reconnect_last_session(self, success_callback: Callable,
+                               failed_callback: Callable,
+                               data_callback: Callable,
+                               **options) -> Future:
+        """在后台事件循环中重连上次会话的设备，options 同 reconnect_last_session_async"""
+        return self.submit(
+            self.reconnect_last_session_async(success_callback, failed_callback, data_callback,
+                                              **options)
+        )
+    
+    def connect_many(self, devices: List[Dict],
+                     data_callback: Callable[[str, object], None],
+                     **options) -> Future:
+        """在后台事件循环中并发连接多个设备，options 同 connect_many_async 的可选参数"""
+        return self.submit(self.connect_many_async(devices, data_callback, **options))
+    
+    def _resolve_address(self, address: Optional[str]) -> Optional[str]:
+        """确定消息的目标设备地址，无法确定时返回None"""
+        if not address and len(self.clients) == 1:
+            # 如果只有一个设备，发送给它
+            return next(iter(self.clients))
+        if not address and len(self.clients) > 1:
+            Logger.error("有多个连接设备，请指定目标地址")
+            return None
+        if address not in self.clients:
+            Logger.error(f"未找到设备地址: {address}")
+            return None
+        return address
+    
+    async def send_bytes_async(self, data: bytes, address: Optional[str] = None) -> Optional[Dict]:
+        """按MTU分包写入二进制数据，返回所在批次的发送统计（字节数、包数、耗时、字节/秒），失败返回None"""
+        address = self._resolve_address(address)
+        if address is None:
+            return None
+        try:
+            # 经发送队列合并后写入（写特征值在连接时已解析）
+            start = time.perf_counter()
+            stats = await self.clients[address]['queue'].send(data)
+            self.metrics.record('write', time.perf_counter() - start)
+            self.metrics.incr('bytes_out', len(data))
+            self.metrics.incr_gauge(address, 'bytes_out', len(data))
+            Logger.info(f"发送 {stats['bytes']} 字节，共 {stats['chunks']} 包，"
+                        f"{stats['bytes_per_sec'] / 1024:.1f} KB/s")
+            return stats
+        except Exception as e:
+            self.metrics.incr('drops')
+            Logger.error(f"发送消息时出错: {e}")
+            return None
+    
+    async def send_message_async(self, message: str, address: Optional[str] = None) -> bool:
+        """异步发送消息到指定的蓝牙设备（需在后台事件循环中运行），按GATT配置追加行结束符"""
+        address = self._resolve_address(address)
+        if address is None:
+            return False
+        line_ending = self.clients[address]['profile'].line_ending
+        stats = await self.send_bytes_async((message + line_ending).encode('utf-8'), address)
+        if stats is None:
+            return False
+        Logger.info(f"消息发送成功: {message}")
+        return True
+    
+    async def read_async(self, address: Optional[str] = None) -> Optional[bytes]:
+        """读取GATT配置中的读特征值，配置没有读特征值或读取失败时返回None"""
+        address = self._resolve_address(address)
+        if address is None:
+            return None
+        entry = self.clients[address]
+        characteristic = entry['characteristics']['read']
+        if characteristic is None:
+            Logger.error(f"GATT配置 {entry['profile'].name} 没有可读特征值")
+            return None
+        try:
+            return bytes(await entry['client'].read_gatt_char(characteristic))
+        except Exception as e:
+            Logger.error(f"读取特征值时出错: {e}")
+            return None
+    
+    def send_message_nowait(self, message: str, address: Optional[str] = None,
+                            callback: Optional[Callable[[str, bool], None]] = None) -> Future:
+        """非阻塞发送消息，立即返回Future
+        
+        callback(message, success) 会通过Clock在UI线程中调用
+        """
+        future = self.submit(self.send_message_async(message, address))
+        if callback is not None:
+            def on_done(f):
+                success = not f.cancelled() and f.exception() is None and f.result()
+                Clock.schedule_once(lambda dt: callback(message, success))
+            future.add_done_callback(on_done)
+        return future
     
     def send_message(self, message: str, address: Optional[str] = None) -> bool:
-        """发送消息到指定的蓝牙设备"""
+        """发送消息到指定的蓝牙设备（阻塞直到写入完成）"""
         try:
-            if not address and len(self.clients) == 1:
-                # 如果只有一个设备，发送给它
-                address = list(self.clients.keys())[0]
-            elif not address and len(self.clients) > 1:
-                Logger.error("有多个连接设备，请指定目标地址")
-                return False
-            
-            if address not in self.clients:
-                Logger.error(f"未找到设备地址: {address}")
-                return False
-            
-            async def send_async():
-                try:
-                    client = self.clients[address]['client']
-                    # 发送消息（使用通用串口UUID）
-                    await client.write_gatt_char(0xFFE1, message.encode('utf-8'))
-                    Logger.info(f"消息发送成功: {message}")
-                    return True
-                except Exception as e:
-                    Logger.error(f"发送消息时出错: {e}")
-                    return False
-            
-            # 在新线程中发送
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                return loop.run_until_complete(send_async())
-            finally:
-                loop.close()
-                
+            return self.submit(self.send_message_async(message, address)).result(timeout=SYNC_CALL_TIMEOUT)
         except Exception as e:
             Logger.error(f"发送消息时发生错误: {e}")
             return False
     
+    async def disconnect_device_async(self, address: str):
+        """异步断开指定设备连接"""
+        self.supervisor.forget(address)
+        if not self._closing:
+            self.known_devices.end_session(address)
+        entry = self.clients.pop(address, None)
+        if entry is None:
+            return
+        self.registry.set_connected(address, False)
+        entry['queue'].close()
+        if entry['flush_rx'] is not None:
+            entry['flush_rx']()
+        try:
+            await entry['client'].disconnect()
+            Logger.info(f"设备已断开连接: {address}")
+        except Exception as e:
+            Logger.error(f"断开设备连接时出错: {e}")
+    
     def disconnect_device(self, address: str):
         """断开指定设备连接"""
-        if address in self.clients:
-            async def disconnect_async():
-                try:
-                    client = self.clients[address]['client']
-                    await client.disconnect()
-                    Logger.info(f"设备已断开连接: {address}")
-                except Exception as e:
-                    Logger.error(f"断开设备连接时出错: {e}")
-            
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
+        if self.loop is not None:
+            # 即使链路已断开也要提交，以便取消正在进行的自动重连
+            future = self.submit(self.disconnect_device_async(address))
             try:
-                loop.run_until_complete(disconnect_async())
-            finally:
-                loop.close()
-            
-            del self.clients[address]
+                future.result(timeout=SYNC_CALL_TIMEOUT)
+            except Exception as e:
+                Logger.error(f"断开设备连接时出错: {e}")
+        self.clients.pop(address, None)
+        self.registry.set_connected(address, False)
     
     def disconnect_all(self):
         """断开所有设备连接"""
@@ -200,16 +882,41 @@ class BluetoothManager:
         for address in addresses:
             self.disconnect_device(address)
     
+    def get_metrics(self) -> Dict:
+        """获取指标快照（延迟直方图、计数器和每个设备的状态量），可在任意线程调用"""
+        snapshot = self.metrics.snapshot()
+        devices = snapshot['devices']
+        for address, entry in list(self.clients.items()):
+            gauges = devices.setdefault(address, {})
+            gauges['connected'] = True
+            gauges['queue_depth'] = len(entry['queue'])
+            gauges['stalled'] = entry.get('stalled', False)
+        return snapshot
+    
     def get_connected_devices(self) -> List[Dict]:
         """获取已连接的设备列表"""
         return [info['device_info'] for info in self.clients.values()]
     
     def is_device_connected(self, address: str) -> bool:
         """检查设备是否已连接"""
-        return address in self.clients
+        return self.registry.is_connected(address)
     
     def get_device_info(self, address: str) -> Optional[Dict]:
         """获取设备信息"""
-        if address in self.clients:
-            return self.clients[address]['device_info']
-        return None
\ No newline at end of file
+        return self.registry.get(address)
+    
+    def nearest_devices(self, limit: Optional[int] = None, min_samples: int = 3) -> List[Dict]:
+        """按平滑RSSI从近到远返回扫描到的设备，min_samples 过滤样本太少的设备"""
+        devices = []
+        for address in self.proximity.ranking(limit, min_samples):
+            device_info = self.registry.get(address)
+            if device_info is not None:
+                devices.append(device_info)
+        return devices
+    
+    def get_advertisement(self, address: str) -> Optional[Dict]:
+        """获取设备最近一次广播的结构化数据（首次访问时才解析，见 advertisement.decode_advertisement）"""
+        device_info = self.registry.get(address)
+        if device_info is None:
+            return None
+        return decode_advertisement(device_info)
@@ -0,0 +1,230 @@
+"""
+设备列表模块
+基于RecycleView、以地址为键的设备列表，增量应用新增、移除和RSSI变化，不再整表重建
+"""
+
+import bisect
+from typing import Callable, Dict, Iterable, List, Optional
+
+from kivy.metrics import dp
+from kivy.uix.button import Button
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+
+# 排序方式
+ORDER_DISCOVERY = 'discovery'  # 按发现顺序，位置不变
+ORDER_RSSI = 'rssi'            # 按信号强度从强到弱，同强度按发现顺序
+ORDER_NAME = 'name'            # 按名称，同名按发现顺序
+ORDER_PROXIMITY = 'proximity'  # 按平滑RSSI估算的距离从近到远（见 proximity.ProximityRanker）
+
+_ORDERS = (ORDER_DISCOVERY, ORDER_RSSI, ORDER_NAME, ORDER_PROXIMITY)
+
+# 没有RSSI/距离的设备排在最后
+_MISSING_RSSI = -1000
+_MISSING_DISTANCE = float('inf')
+
+
+def default_device_text(device: Dict) -> str:
+    """设备行的默认显示文本"""
+    text = f"{device.get('name') or 'Unknown'} ({device['address']})"
+    rssi = device.get('rssi_smoothed')
+    if rssi is None:
+        rssi = device.get('rssi')
+    if rssi is not None:
+        text += f"  {rssi:.0f} dBm"
+    distance = device.get('distance')
+    if distance is not None:
+        text += f"  ~{distance:.1f} m"
+    if device.get('confirmed') is False:
+        text += "  (未确认)"
+    return text
+
+
+class DeviceListItem(RecycleDataViewBehavior, Button):
+    """设备列表中的一行，点击时通知所属的 DeviceListView"""
+
+    def __init__(self, **kwargs):
+        self.address = None
+        self.list_view = None
+        super().__init__(**kwargs)
+
+    def refresh_view_attrs(self, rv, index, data):
+        self.list_view = rv
+        return super().refresh_view_attrs(rv, index, data)
+
+    def on_press(self):
+        if self.list_view and self.address:
+            self.list_view.select(self.address)
+
+
+class DeviceListView(RecycleView):
+    """以地址为键的增量设备列表
+
+    update_device()/remove_device() 只修改受影响的行；set_devices() 与当前内容
+    做差异比较后增量应用。RecycleView 只为可见行创建控件，几百个设备也能流畅滚动。
+    empty_text 在 set_devices()/remove_device() 之后列表为空时显示。
+    confirmed 为False的设备（缓存中本轮扫描尚未收到广播）用 stale_color 显示。
+    所有方法都要在UI线程中调用。
+    """
+
+    def __init__(self, select_callback: Optional[Callable[[Dict], None]] = None,
+                 order: str = ORDER_DISCOVERY, text_formatter: Callable[[Dict], str] = default_device_text,
+                 empty_text: str = '', row_height: float = dp(50), font_size='14sp',
+                 item_color: tuple = (0.7, 0.7, 0.7, 1),
+                 stale_color: tuple = (0.45, 0.45, 0.45, 1), **kwargs):
+        if order not in _ORDERS:
+            raise ValueError(f"不支持的排序方式: {order}")
+        super().__init__(**kwargs)
+        self.select_callback = select_callback
+        self.order = order
+        self.text_formatter = text_formatter
+        self.empty_text = empty_text
+        self.font_size = font_size
+        self.item_color = item_color
+        self.stale_color = stale_color
+        self.viewclass = DeviceListItem
+        self.do_scroll_x = False
+
+        layout = RecycleBoxLayout(
+            orientation='vertical',
+            default_size=(None, row_height),
+            default_size_hint=(1, None),
+            size_hint=(1, None),
+            spacing=dp(5),
+            padding=dp(5)
+        )
+        layout.bind(minimum_height=layout.setter('height'))
+        self.add_widget(layout)
+
+        self._devices = {}   # address -> device_info
+        self._keys = []      # 与 data 一一对应的排序键
+        self._key_of = {}    # address -> 当前排序键（设备信息可能被原地修改，不能事后重算）
+        self._seq = {}       # address -> 发现序号，保证排序稳定
+        self._next_seq = 0
+
+    def __len__(self) -> int:
+        return len(self._devices)
+
+    def __contains__(self, address: str) -> bool:
+        return address in self._devices
+
+    def devices(self) -> List[Dict]:
+        """按当前显示顺序返回设备信息"""
+        return [self._devices[key[-1]] for key in self._keys]
+
+    def _sort_key(self, device: Dict) -> tuple:
+        address = device['address']
+        seq = self._seq[address]
+        if self.order == ORDER_RSSI:
+            rssi = device.get('rssi')
+            return (-(rssi if rssi is not None else _MISSING_RSSI), seq, address)
+        if self.order == ORDER_NAME:
+            return ((device.get('name') or '').lower(), seq, address)
+        if self.order == ORDER_PROXIMITY:
+            # 保留一位小数，避免平滑值的微小变化引起行的来回移动
+            distance = device.get('distance')
+            return (round(distance, 1) if distance is not None else _MISSING_DISTANCE, seq, address)
+        return (seq, address)
+
+    def _row(self, device: Dict) -> Dict:
+        return {
+            'text': self.text_formatter(device),
+            'address': device['address'],
+            'font_size': self.font_size,
+            'background_color': self.item_color if device.get('confirmed', True) else self.stale_color,
+            'disabled': False
+        }
+
+    def _show_empty(self):
+        if self.empty_text:
+            self.data = [{'text': self.empty_text, 'address': None, 'font_size': self.font_size,
+                          'background_color': (0, 0, 0, 0), 'disabled': True}]
+        else:
+            self.data = []
+
+    def update_device(self, device: Dict):
+        """新增或更新一个设备，只刷新受影响的行"""
+        address = device['address']
+        if not self._devices:
+            self.data = []
+        if address not in self._seq:
+            self._seq[address] = self._next_seq
+            self._next_seq += 1
+        self._devices[address] = device
+        key = self._sort_key(device)
+        row = self._row(device)
+
+        old_key = self._key_of.get(address)
+        if old_key is not None:
+            index = bisect.bisect_left(self._keys, old_key)
+            if old_key == key:
+                # 位置不变，原地更新这一行
+                if self.data[index] != row:
+                    self.data[index] = row
+                return
+            del self._keys[index]
+            del self.data[index]
+
+        index = bisect.bisect_left(self._keys, key)
+        self._keys.insert(index, key)
+        self._key_of[address] = key
+        self.data.insert(index, row)
+
+    def remove_device(self, address: str):
+        """移除一个设备"""
+        if self._devices.pop(address, None) is None:
+            return
+        index = bisect.bisect_left(self._keys, self._key_of.pop(address))
+        del self._keys[index]
+        del self.data[index]
+        del self._seq[address]
+        if not self._devices:
+            self._show_empty()
+
+    def set_devices(self, devices: Iterable[Dict]):
+        """把列表同步为给定的设备集合：只移除消失的设备、更新或插入其余设备"""
+        devices = list(devices)
+        if not self._devices and devices:
+            # 空列表时一次性构建，只触发一次刷新
+            for device in devices:
+                address = device['address']
+                if address not in self._seq:
+                    self._seq[address] = self._next_seq
+                    self._next_seq += 1
+                self._devices[address] = device
+            self.set_order(self.order)
+            return
+        present = {device['address'] for device in devices}
+        for address in [a for a in self._devices if a not in present]:
+            self.remove_device(address)
+        for device in devices:
+            self.update_device(device)
+        if not self._devices:
+            self._show_empty()
+
+    def set_order(self, order: str):
+        """切换排序方式并重新排序"""
+        if order not in _ORDERS:
+            raise ValueError(f"不支持的排序方式: {order}")
+        self.order = order
+        if not self._devices:
+            return
+        self._key_of = {address: self._sort_key(device) for address, device in self._devices.items()}
+        self._keys = sorted(self._key_of.values())
+        self.data = [self._row(self._devices[key[-1]]) for key in self._keys]
+
+    def clear(self):
+        """清空列表（不显示空列表提示，用于开始新一轮扫描）"""
+        self._devices = {}
+        self._keys = []
+        self._key_of = {}
+        self._seq = {}
+        self._next_seq = 0
+        self.data = []
+
+    def select(self, address: str):
+        """某一行被点击"""
+        device = self._devices.get(address)
+        if device is not None and self.select_callback:
+            self.select_callback(device)
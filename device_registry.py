@@ -0,0 +1,146 @@
+"""
+设备注册表模块
+以设备地址为键保存扫描到的设备信息，支持O(1)原地更新和排序视图
+"""
+
+import heapq
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class DeviceRegistry:
+    """按地址索引的设备注册表
+
+    每个设备对应一个信息字典（与原有的 device_info 结构兼容）：
+    name / address / rssi / device / advertisement_data / last_seen / connected / confirmed
+
+    confirmed 表示本轮扫描是否收到过该设备的广播：开始新一轮扫描时用 mark_stale()
+    把缓存的设备标记为未确认，收到广播后重新变为已确认。
+
+    advertisement_data 保存原始广播对象，扫描时不做解析；
+    需要结构化字段时用 advertisement.decode_advertisement() 按需解析。
+    """
+
+    def __init__(self):
+        self._devices = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._devices)
+
+    def __contains__(self, address: str) -> bool:
+        return address in self._devices
+
+    def get(self, address: str) -> Optional[Dict]:
+        """按地址获取设备信息"""
+        return self._devices.get(address)
+
+    def update(self, device, advertisement_data) -> Tuple[Dict, bool, bool]:
+        """记录一次广播，返回 (device_info, is_new, rssi_changed)"""
+        now = time.monotonic()
+        rssi = advertisement_data.rssi
+        with self._lock:
+            device_info = self._devices.get(device.address)
+            if device_info is None:
+                device_info = {
+                    'name': device.name or '未知设备',
+                    'address': device.address,
+                    'rssi': rssi,
+                    'device': device,
+                    'advertisement_data': advertisement_data,
+                    'last_seen': now,
+                    'connected': False,
+                    'confirmed': True
+                }
+                self._devices[device.address] = device_info
+                return device_info, True, False
+
+            rssi_changed = device_info['rssi'] != rssi
+            device_info['rssi'] = rssi
+            device_info['device'] = device
+            device_info['advertisement_data'] = advertisement_data
+            device_info['last_seen'] = now
+            device_info['confirmed'] = True
+            if device.name and device_info['name'] == '未知设备':
+                device_info['name'] = device.name
+            return device_info, False, rssi_changed
+
+    def add(self, device_info: Dict) -> Dict:
+        """登记一个非扫描得到的设备信息（例如直接连接的设备）"""
+        with self._lock:
+            existing = self._devices.get(device_info['address'])
+            if existing is not None:
+                return existing
+            device_info.setdefault('rssi', None)
+            device_info.setdefault('advertisement_data', None)
+            device_info.setdefault('last_seen', time.monotonic())
+            device_info.setdefault('connected', False)
+            device_info.setdefault('confirmed', True)
+            self._devices[device_info['address']] = device_info
+            return device_info
+
+    def set_connected(self, address: str, connected: bool):
+        """更新设备连接状态"""
+        device_info = self._devices.get(address)
+        if device_info is not None:
+            device_info['connected'] = connected
+
+    def is_connected(self, address: str) -> bool:
+        """检查设备是否已连接"""
+        device_info = self._devices.get(address)
+        return device_info is not None and device_info['connected']
+
+    def remove(self, address: str) -> Optional[Dict]:
+        """移除设备"""
+        with self._lock:
+            return self._devices.pop(address, None)
+
+    def clear(self, keep_connected: bool = True):
+        """清空注册表，默认保留已连接设备"""
+        with self._lock:
+            if keep_connected:
+                self._devices = {a: d for a, d in self._devices.items() if d['connected']}
+            else:
+                self._devices = {}
+
+    def mark_stale(self) -> int:
+        """把未连接的设备标记为未确认（开始新一轮扫描时调用），返回标记的设备数"""
+        count = 0
+        with self._lock:
+            for device_info in self._devices.values():
+                if not device_info['connected']:
+                    device_info['confirmed'] = False
+                    count += 1
+        return count
+
+    def expire(self, ttl: float, now: Optional[float] = None) -> List[Dict]:
+        """移除超过ttl秒没有收到广播的设备（已连接设备除外），返回被移除的设备"""
+        deadline = (time.monotonic() if now is None else now) - ttl
+        with self._lock:
+            expired = [d for d in self._devices.values()
+                       if not d['connected'] and d['last_seen'] < deadline]
+            for device_info in expired:
+                del self._devices[device_info['address']]
+        return expired
+
+    def devices(self) -> List[Dict]:
+        """按发现顺序返回所有设备"""
+        with self._lock:
+            return list(self._devices.values())
+
+    def by_rssi(self, limit: Optional[int] = None) -> List[Dict]:
+        """按信号强度从强到弱排序"""
+        key = lambda d: d['rssi'] if d['rssi'] is not None else -999
+        devices = self.devices()
+        if limit is not None:
+            return heapq.nlargest(limit, devices, key=key)
+        return sorted(devices, key=key, reverse=True)
+
+    def by_last_seen(self, limit: Optional[int] = None) -> List[Dict]:
+        """按最近一次收到广播的时间从新到旧排序"""
+        key = lambda d: d['last_seen']
+        devices = self.devices()
+        if limit is not None:
+            return heapq.nlargest(limit, devices, key=key)
+        return sorted(devices, key=key, reverse=True)
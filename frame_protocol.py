@@ -0,0 +1,237 @@
+"""
+二进制帧协议模块
+在通知数据的memoryview上直接解析长度前缀 / COBS / SLIP 帧，并做CRC校验
+"""
+
+import binascii
+import struct
+import zlib
+from typing import Callable, Optional
+
+from kivy.logger import Logger
+
+# CRC类型
+CRC_NONE = None
+CRC16 = 'crc16'    # CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF)
+CRC32 = 'crc32'    # IEEE 802.3
+
+# 帧最大长度，超过视为错误帧丢弃
+DEFAULT_MAX_FRAME_LENGTH = 4096
+
+# SLIP控制字节
+SLIP_END = 0xC0
+SLIP_ESC = 0xDB
+SLIP_ESC_END = 0xDC
+SLIP_ESC_ESC = 0xDD
+
+
+def crc16_ccitt(data) -> int:
+    """计算CRC-16/CCITT-FALSE，data可以是任意bytes-like对象"""
+    return binascii.crc_hqx(data, 0xFFFF)
+
+
+def crc32(data) -> int:
+    """计算CRC-32，data可以是任意bytes-like对象"""
+    return zlib.crc32(data) & 0xFFFFFFFF
+
+
+_CRC_SIZES = {CRC_NONE: 0, CRC16: 2, CRC32: 4}
+_CRC_FUNCS = {CRC16: crc16_ccitt, CRC32: crc32}
+
+
+class FrameParser:
+    """帧解析器基类
+
+    feed() 把解析出的每个帧负载以memoryview交给回调。负载通常直接引用
+    通知数据（零拷贝），只在回调执行期间有效，需要保留时请自行 bytes() 复制。
+    只有跨包的半帧和需要反转义的帧才会产生复制。
+    """
+
+    def __init__(self, crc: Optional[str] = CRC_NONE, byteorder: str = 'little',
+                 max_frame_length: int = DEFAULT_MAX_FRAME_LENGTH):
+        if crc not in _CRC_SIZES:
+            raise ValueError(f"不支持的CRC类型: {crc}")
+        self.crc = crc
+        self.crc_size = _CRC_SIZES[crc]
+        self.byteorder = byteorder
+        self.max_frame_length = max_frame_length
+        self.frames = 0
+        self.crc_errors = 0
+        self.framing_errors = 0
+        self._buffer = None
+
+    def feed(self, data, callback: Callable[[memoryview], None]):
+        """输入一个通知数据包，对其中每个完整帧调用 callback(payload)"""
+        if self._buffer:
+            self._buffer += data
+            buf = self._buffer
+        elif isinstance(data, (bytes, bytearray)):
+            buf = data
+        else:
+            buf = bytes(data)
+        view = memoryview(buf)
+        consumed = self._parse(buf, view, callback)
+        # 只复制剩余的半帧；不在原缓冲区上缩容，避免回调持有的视图阻止resize
+        rest = len(buf) - consumed
+        self._buffer = bytearray(view[consumed:]) if rest else None
+        if rest > self.max_frame_length:
+            Logger.warning(f"未完成帧超过 {self.max_frame_length} 字节，已丢弃")
+            self.framing_errors += 1
+            self._buffer = None
+
+    def reset(self):
+        """丢弃未完成的半帧"""
+        self._buffer = None
+
+    def _parse(self, buf, view: memoryview, callback) -> int:
+        """解析buf中的完整帧，返回已消费的字节数"""
+        raise NotImplementedError
+
+    def _deliver(self, frame: memoryview, callback):
+        """校验CRC并交付负载"""
+        if self.crc_size:
+            if len(frame) < self.crc_size:
+                self.framing_errors += 1
+                return
+            payload = frame[:-self.crc_size]
+            expected = int.from_bytes(frame[-self.crc_size:], self.byteorder)
+            if _CRC_FUNCS[self.crc](payload) != expected:
+                self.crc_errors += 1
+                return
+        else:
+            payload = frame
+        self.frames += 1
+        callback(payload)
+
+
+class LengthPrefixedParser(FrameParser):
+    """长度前缀帧: [长度][负载][CRC]，长度字段只计负载"""
+
+    def __init__(self, length_size: int = 1, **kwargs):
+        super().__init__(**kwargs)
+        if length_size not in (1, 2, 4):
+            raise ValueError("长度字段只能是1、2或4字节")
+        self.length_size = length_size
+
+    def _parse(self, buf, view, callback) -> int:
+        offset = 0
+        total = len(view)
+        header = self.length_size
+        while total - offset >= header:
+            length = int.from_bytes(view[offset:offset + header], self.byteorder)
+            if length > self.max_frame_length:
+                # 长度字段不可信，丢弃剩余数据重新同步
+                Logger.warning(f"帧长度 {length} 超过上限，丢弃数据")
+                self.framing_errors += 1
+                return total
+            end = offset + header + length + self.crc_size
+            if end > total:
+                break
+            self._deliver(view[offset + header:end], callback)
+            offset = end
+        return offset
+
+
+class SlipParser(FrameParser):
+    """SLIP帧（RFC 1055），以0xC0分隔"""
+
+    def _parse(self, buf, view, callback) -> int:
+        offset = 0
+        end_byte = bytes((SLIP_END,))
+        esc_byte = bytes((SLIP_ESC,))
+        while True:
+            end = buf.find(end_byte, offset)
+            if end < 0:
+                return offset
+            if end > offset:
+                if buf.find(esc_byte, offset, end) < 0:
+                    frame = view[offset:end]
+                else:
+                    frame = self._unescape(view[offset:end])
+                if frame is not None:
+                    self._deliver(frame, callback)
+            offset = end + 1
+
+    def _unescape(self, frame: memoryview) -> Optional[memoryview]:
+        out = bytearray()
+        escaped = False
+        for b in frame:
+            if escaped:
+                if b == SLIP_ESC_END:
+                    out.append(SLIP_END)
+                elif b == SLIP_ESC_ESC:
+                    out.append(SLIP_ESC)
+                else:
+                    self.framing_errors += 1
+                    return None
+                escaped = False
+            elif b == SLIP_ESC:
+                escaped = True
+            else:
+                out.append(b)
+        return memoryview(out)
+
+
+class CobsParser(FrameParser):
+    """COBS帧，以0x00分隔"""
+
+    def _parse(self, buf, view, callback) -> int:
+        offset = 0
+        while True:
+            end = buf.find(b'\x00', offset)
+            if end < 0:
+                return offset
+            if end > offset:
+                frame = self._decode(view[offset:end])
+                if frame is not None:
+                    self._deliver(frame, callback)
+            offset = end + 1
+
+    def _decode(self, frame: memoryview) -> Optional[memoryview]:
+        out = bytearray()
+        i = 0
+        n = len(frame)
+        while i < n:
+            code = frame[i]
+            block_end = i + code
+            if code == 0 or block_end > n:
+                self.framing_errors += 1
+                return None
+            out += frame[i + 1:block_end]
+            i = block_end
+            if code < 0xFF and i < n:
+                out.append(0)
+        return memoryview(out)
+
+
+class FrameDispatcher:
+    """按负载首字节（帧类型）把帧解包后分发给类型化回调
+
+    register(0x01, '<hH', on_temperature) 表示类型0x01的帧负载（去掉类型字节）
+    按 struct 格式 '<hH' 解包，并以 on_temperature(*values) 调用。
+    """
+
+    def __init__(self, default_callback: Optional[Callable[[int, memoryview], None]] = None):
+        self._handlers = {}
+        self.default_callback = default_callback
+        self.unknown_frames = 0
+
+    def register(self, frame_type: int, fmt: str, callback: Callable):
+        """注册帧类型的解包格式和回调"""
+        self._handlers[frame_type] = (struct.Struct(fmt), callback)
+
+    def __call__(self, payload: memoryview):
+        if not payload:
+            return
+        frame_type = payload[0]
+        handler = self._handlers.get(frame_type)
+        if handler is None:
+            self.unknown_frames += 1
+            if self.default_callback is not None:
+                self.default_callback(frame_type, payload[1:])
+            return
+        frame_struct, callback = handler
+        if len(payload) - 1 < frame_struct.size:
+            Logger.warning(f"帧类型 0x{frame_type:02X} 长度不足")
+            return
+        callback(*frame_struct.unpack_from(payload, 1))
@@ -0,0 +1,108 @@
+"""
+GATT服务缓存模块
+按设备地址把完整服务发现得到的服务/特征值/句柄保存在本地文件，
+用于判断设备的服务是否变化，以及决定重连时能否让后端复用它自己的服务缓存
+"""
+
+import hashlib
+import json
+import time
+from typing import Dict, Optional
+
+from kivy.utils import platform
+
+from json_store import JsonStore
+
+# Service Changed 特征值（Generic Attribute服务）
+SERVICE_CHANGED_UUID = '00002a05-0000-1000-8000-00805f9b34fb'
+
+
+def describe_services(services) -> Dict:
+    """把bleak的服务集合转换为可序列化的GATT布局"""
+    layout = []
+    for service in services:
+        characteristics = []
+        for char in service.characteristics:
+            characteristics.append({
+                'uuid': char.uuid,
+                'handle': char.handle,
+                'properties': list(char.properties),
+                'descriptors': [{'uuid': d.uuid, 'handle': d.handle} for d in char.descriptors]
+            })
+        layout.append({
+            'uuid': service.uuid,
+            'handle': service.handle,
+            'characteristics': characteristics
+        })
+    layout.sort(key=lambda s: s['handle'])
+    return {'services': layout, 'hash': layout_hash(layout)}
+
+
+def layout_hash(services) -> str:
+    """计算GATT布局的哈希，用于判断设备的服务是否变化"""
+    data = json.dumps(services, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+class GattCache(JsonStore):
+    """本地GATT布局缓存（JSON文件，读写见 JsonStore）
+
+    bleak不能从外部注入服务表，这里保存的布局本身不能跳过服务发现，只用来：
+    - 比较前后两次完整服务发现的结果，发现设备的服务变化（update()）；
+    - 判断能否让后端复用它自己的服务缓存（client_options()/connect_options()）：
+      WinRT 的 use_cached_services 使用系统缓存，有布局记录即可；
+      BlueZ 的 dangerous_use_bleak_cache 使用bleak进程内的缓存，只在本进程内完整发现过后才有效；
+      Android/macOS 没有对应选项，总是完整发现。
+    复用后端缓存时得到的服务没有经过设备确认，update() 不会据此判断布局是否有效，
+    需要调用方在使用特征值失败时调用 invalidate()，下次连接重新完整发现。
+    """
+
+    description = 'GATT缓存'
+
+    def __init__(self, path: str, save_delay: Optional[float] = None):
+        # 本进程内完整发现过服务的设备（BlueZ下bleak缓存只在这些设备上可用）
+        self._discovered = set()
+        super().__init__(path, save_delay)
+
+    def get(self, address: str) -> Optional[Dict]:
+        """获取设备的缓存布局"""
+        return self._entries.get(address)
+
+    def update(self, address: str, services, from_cache: bool = False) -> Optional[bool]:
+        """记录连接后得到的服务布局
+
+        返回布局与记录是否一致（没有记录时为False）；from_cache 为True表示服务来自后端缓存，
+        没有经过设备确认，不与记录比较也不写入，返回None。
+        """
+        if from_cache:
+            return None
+        layout = describe_services(services)
+        with self._lock:
+            self._discovered.add(address)
+            cached = self._entries.get(address)
+            unchanged = cached is not None and cached.get('hash') == layout['hash']
+            if not unchanged:
+                layout['updated'] = time.time()
+                self._entries[address] = layout
+                self._commit()
+        return unchanged
+
+    def invalidate(self, address: str):
+        """删除设备的布局记录（例如收到Service Changed指示或缓存的特征值不可用时），
+        下次连接不再复用后端缓存"""
+        with self._lock:
+            self._discovered.discard(address)
+            if self._entries.pop(address, None) is not None:
+                self._commit()
+
+    def client_options(self, address: str) -> Dict:
+        """Windows上有布局记录时，返回让WinRT复用系统服务缓存的BleakClient构造参数"""
+        if platform == 'win' and address in self._entries:
+            return {'winrt': {'use_cached_services': True}}
+        return {}
+
+    def connect_options(self, address: str) -> Dict:
+        """Linux上本进程内完整发现过服务时，返回让bleak复用其服务缓存的connect()参数"""
+        if platform == 'linux' and address in self._discovered and address in self._entries:
+            return {'dangerous_use_bleak_cache': True}
+        return {}
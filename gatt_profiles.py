@@ -0,0 +1,195 @@
+"""
+GATT配置模块
+按设备名称/服务UUID匹配设备使用的串口类GATT约定（通知、写入、读取特征值、写入方式和分帧），
+连接时解析出特征值对象，之后的收发直接复用
+"""
+
+import re
+from typing import Dict, Iterable, List, Optional, Pattern, Union
+
+from stream_decoder import FRAMING_NEWLINE
+
+# 写入方式
+WRITE_AUTO = 'auto'                          # 特征值支持时使用无响应写入
+WRITE_WITH_RESPONSE = 'response'             # 总是等待写入响应
+WRITE_WITHOUT_RESPONSE = 'no-response'       # 总是使用无响应写入
+
+_WRITE_MODES = (WRITE_AUTO, WRITE_WITH_RESPONSE, WRITE_WITHOUT_RESPONSE)
+
+# 特征值标识：句柄（int）或UUID字符串
+CharSpecifier = Union[int, str]
+
+
+def _uuid16(short: int) -> str:
+    """16位UUID展开为128位字符串"""
+    return f'0000{short:04x}-0000-1000-8000-00805f9b34fb'
+
+
+class GattProfile:
+    """一类设备的GATT约定
+
+    notify / write / read    特征值（句柄或UUID），read 可为None
+    service_uuids            广播或服务发现结果中出现任一UUID即匹配
+    name_pattern             设备名称匹配的正则表达式（search语义）
+    write_mode               WRITE_AUTO / WRITE_WITH_RESPONSE / WRITE_WITHOUT_RESPONSE
+    framing                  接收数据的分帧参数（StreamDecoder的关键字参数），None时使用管理器的默认值
+    line_ending              send_message 发送文本时追加的行结束符
+    """
+
+    def __init__(self, name: str, notify: CharSpecifier, write: CharSpecifier,
+                 read: Optional[CharSpecifier] = None,
+                 service_uuids: Optional[Iterable[str]] = None,
+                 name_pattern: Optional[Union[str, Pattern]] = None,
+                 write_mode: str = WRITE_AUTO,
+                 framing: Optional[Dict] = None,
+                 line_ending: str = ''):
+        if write_mode not in _WRITE_MODES:
+            raise ValueError(f"不支持的写入方式: {write_mode}")
+        self.name = name
+        self.notify = notify
+        self.write = write
+        self.read = read
+        self.service_uuids = frozenset(u.lower() for u in service_uuids) if service_uuids else frozenset()
+        if isinstance(name_pattern, str):
+            name_pattern = re.compile(name_pattern)
+        self.name_regex = name_pattern
+        self.write_mode = write_mode
+        self.framing = framing
+        self.line_ending = line_ending
+
+    def __repr__(self):
+        return f'GattProfile({self.name!r})'
+
+    @property
+    def write_response(self) -> Optional[bool]:
+        """传给 BulkWriter 的 response 参数（None表示按特征值属性决定）"""
+        if self.write_mode == WRITE_WITH_RESPONSE:
+            return True
+        if self.write_mode == WRITE_WITHOUT_RESPONSE:
+            return False
+        return None
+
+    def matches(self, device_info: Dict) -> bool:
+        """按设备名称或广播中的服务UUID判断（连接前）"""
+        if self.service_uuids:
+            advertisement_data = device_info.get('advertisement_data')
+            uuids = getattr(advertisement_data, 'service_uuids', None)
+            if uuids and not self.service_uuids.isdisjoint(u.lower() for u in uuids):
+                return True
+        if self.name_regex is not None:
+            name = device_info.get('name')
+            if name and self.name_regex.search(name) is not None:
+                return True
+        return False
+
+    def matches_services(self, services) -> bool:
+        """按服务发现结果判断（连接后，广播里没有服务UUID时使用）"""
+        if not self.service_uuids:
+            return False
+        return any(service.uuid.lower() in self.service_uuids for service in services)
+
+    def resolve(self, services) -> Dict:
+        """在服务集合中查找特征值对象，返回 {'notify', 'write', 'read'}
+
+        notify 或 write 不存在时抛出 LookupError；read 不存在时为None。
+        """
+        resolved = {}
+        for role in ('notify', 'write', 'read'):
+            specifier = getattr(self, role)
+            if specifier is None:
+                resolved[role] = None
+                continue
+            characteristic = services.get_characteristic(specifier)
+            if characteristic is None and role != 'read':
+                raise LookupError(f"设备不支持配置 {self.name}: 找不到{role}特征值 {specifier}")
+            resolved[role] = characteristic
+        return resolved
+
+
+# 内置配置
+# HC-05/HM-10/HC-08等透传模块：0xFFE0 服务中的 0xFFE1 特征值同时用于通知和写入
+# （必须用UUID：bleak把int当作句柄，而句柄由设备分配，与UUID无关）
+PROFILE_SERIAL = GattProfile(
+    'serial-ffe0', notify=_uuid16(0xFFE1), write=_uuid16(0xFFE1),
+    service_uuids=[_uuid16(0xFFE0)],
+    name_pattern=r'^(HC-|HM-|BT05|JDY-|MLT-BT05)',
+    framing={'framing': FRAMING_NEWLINE}
+)
+# Nordic UART Service：RX写入、TX通知
+PROFILE_NORDIC_UART = GattProfile(
+    'nordic-uart',
+    notify='6e400003-b5a3-f393-e0a9-e50e24dcca9e',
+    write='6e400002-b5a3-f393-e0a9-e50e24dcca9e',
+    service_uuids=['6e400001-b5a3-f393-e0a9-e50e24dcca9e'],
+    write_mode=WRITE_WITHOUT_RESPONSE
+)
+# ESP-IDF ble_spp_server 示例：0xABF1 写入、0xABF2 通知
+PROFILE_ESP_SPP = GattProfile(
+    'esp-spp', notify=_uuid16(0xABF2), write=_uuid16(0xABF1),
+    service_uuids=[_uuid16(0xABF0)],
+    name_pattern=r'^ESP_SPP',
+    write_mode=WRITE_WITHOUT_RESPONSE
+)
+# Microchip（ISSC）透传服务：RN4870/BM70等
+PROFILE_MICROCHIP_TRANSPARENT = GattProfile(
+    'microchip-transparent',
+    notify='49535343-1e4d-4bd9-ba61-23c647249616',
+    write='49535343-8841-43f4-a8d4-ecbe34729bb3',
+    service_uuids=['49535343-fe7d-4ae5-8fa9-9fafd205e455']
+)
+
+BUILTIN_PROFILES = (PROFILE_SERIAL, PROFILE_NORDIC_UART, PROFILE_ESP_SPP,
+                    PROFILE_MICROCHIP_TRANSPARENT)
+
+
+class ProfileRegistry:
+    """GATT配置注册表
+
+    match() 依次尝试：device_info 中记录的配置名称（例如已知设备）、
+    按注册顺序匹配名称/广播服务UUID（后注册的自定义配置优先）、默认配置。
+    连接后可用 match_services() 按实际服务再确认一次。
+    """
+
+    def __init__(self, profiles: Iterable[GattProfile] = BUILTIN_PROFILES,
+                 default: Optional[GattProfile] = PROFILE_SERIAL):
+        self._profiles = list(profiles)
+        self.default = default
+
+    def __iter__(self):
+        return iter(list(self._profiles))
+
+    def register(self, profile: GattProfile):
+        """注册配置（同名配置会被替换），自定义配置优先于已有配置匹配"""
+        self.unregister(profile.name)
+        self._profiles.insert(0, profile)
+
+    def unregister(self, name: str):
+        self._profiles = [p for p in self._profiles if p.name != name]
+
+    def get(self, name: str) -> Optional[GattProfile]:
+        for profile in self._profiles:
+            if profile.name == name:
+                return profile
+        return None
+
+    def names(self) -> List[str]:
+        return [p.name for p in self._profiles]
+
+    def match(self, device_info: Dict) -> Optional[GattProfile]:
+        """连接前按设备信息选择配置，都不匹配时返回默认配置"""
+        name = device_info.get('profile')
+        if name:
+            profile = self.get(name)
+            if profile is not None:
+                return profile
+        for profile in self._profiles:
+            if profile.matches(device_info):
+                return profile
+        return self.default
+
+    def match_services(self, services) -> Optional[GattProfile]:
+        """连接后按服务发现结果选择配置，都不匹配时返回None"""
+        for profile in self._profiles:
+            if profile.matches_services(services):
+                return profile
+        return None
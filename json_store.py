@@ -0,0 +1,86 @@
+"""
+JSON文件存储模块
+KnownDevices 和 GattCache 共用的字典存储：读取失败时重新建立、通过临时文件原子写入，
+可以把写入推迟到后台线程，合并短时间内的多次修改
+"""
+
+import json
+import os
+import threading
+from typing import Optional
+
+from kivy.logger import Logger
+
+
+class JsonStore:
+    """以JSON文件保存的 {键: 记录} 存储基类
+
+    子类在 self._lock 中修改 self._entries，修改后（仍持有锁时）调用 _commit()。
+    save_delay 为None时 _commit() 立即写入文件；否则由后台线程在 save_delay 秒后写入，
+    期间的修改合并为一次写入，调用方（例如蓝牙事件循环）不会阻塞在文件IO上。
+    flush() 立即写入尚未保存的修改，关闭前应调用。
+    """
+
+    # 日志中使用的存储名称
+    description = 'JSON存储'
+
+    def __init__(self, path: str, save_delay: Optional[float] = None):
+        self.path = path
+        self.save_delay = save_delay
+        self._entries = {}
+        self._lock = threading.Lock()
+        # 串行化延迟写入，保证较新的内容不会被较旧的覆盖
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        self._timer = None
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._entries = json.load(f)
+        except FileNotFoundError:
+            self._entries = {}
+        except Exception as e:
+            Logger.warning(f"读取{self.description}失败，将重新建立: {e}")
+            self._entries = {}
+
+    def _write(self, data: str):
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            Logger.error(f"保存{self.description}失败: {e}")
+
+    def _commit(self):
+        """保存修改（需持有 self._lock）"""
+        if self.save_delay is None:
+            self._write(json.dumps(self._entries, ensure_ascii=False))
+            return
+        self._dirty = True
+        if self._timer is None:
+            self._timer = threading.Timer(self.save_delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """立即写入尚未保存的修改"""
+        with self._save_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._dirty:
+                    return
+                self._dirty = False
+                data = json.dumps(self._entries, ensure_ascii=False)
+            self._write(data)
@@ -0,0 +1,100 @@
+"""
+已知设备模块
+把连接过的设备（地址、名称、配置、GATT布局哈希、最近连接时间）保存在本地文件，
+应用启动时可以不扫描直接按地址重连上次会话的设备
+"""
+
+import time
+from typing import Dict, List, Optional
+
+from json_store import JsonStore
+
+# 最多保存的设备数，超过时移除最久未连接的设备
+MAX_KNOWN_DEVICES = 50
+
+
+class KnownDevices(JsonStore):
+    """已知设备存储（JSON文件，读写见 JsonStore）
+
+    每个设备一条记录：name / address / profile / gatt_hash / last_connected / in_session。
+    完整的GATT布局由 GattCache 按同一地址保存，这里只记录连接时的布局哈希。
+    in_session 表示设备在上次会话结束时仍处于连接状态（主动断开的设备不算），
+    last_session() 返回这些设备供启动时直接重连。
+    """
+
+    description = '已知设备'
+
+    def __init__(self, path: str, max_devices: int = MAX_KNOWN_DEVICES,
+                 save_delay: Optional[float] = None):
+        self.max_devices = max_devices
+        super().__init__(path, save_delay)
+
+    def get(self, address: str) -> Optional[Dict]:
+        """获取设备记录"""
+        return self._entries.get(address)
+
+    def devices(self) -> List[Dict]:
+        """按最近连接时间从新到旧返回所有设备记录"""
+        with self._lock:
+            entries = list(self._entries.values())
+        return sorted(entries, key=lambda e: e['last_connected'], reverse=True)
+
+    def remember(self, device_info: Dict, profile: Optional[str] = None,
+                 gatt_hash: Optional[str] = None):
+        """连接成功后记录设备，并标记为当前会话中的设备"""
+        address = device_info['address']
+        with self._lock:
+            entry = self._entries.get(address, {})
+            entry.update({
+                'address': address,
+                'name': device_info.get('name') or entry.get('name') or '未知设备',
+                'profile': profile or entry.get('profile'),
+                'gatt_hash': gatt_hash or entry.get('gatt_hash'),
+                'last_connected': time.time(),
+                'in_session': True
+            })
+            self._entries[address] = entry
+            if len(self._entries) > self.max_devices:
+                oldest = min(self._entries.values(), key=lambda e: e['last_connected'])
+                del self._entries[oldest['address']]
+            self._commit()
+
+    def end_session(self, address: str):
+        """设备被主动断开，下次启动时不再自动重连"""
+        with self._lock:
+            entry = self._entries.get(address)
+            if entry is None or not entry.get('in_session'):
+                return
+            entry['in_session'] = False
+            self._commit()
+
+    def forget(self, address: str):
+        """删除设备记录"""
+        with self._lock:
+            if self._entries.pop(address, None) is not None:
+                self._commit()
+
+    @staticmethod
+    def to_device_info(entry: Dict) -> Dict:
+        """把设备记录转换为可直接传给 connect_device 的设备信息
+
+        device 字段为地址字符串，后端直接按地址连接，不需要先扫描；
+        本次运行还没有收到广播，因此 confirmed 为False。
+        """
+        return {
+            'name': entry['name'],
+            'address': entry['address'],
+            'rssi': None,
+            'device': entry['address'],
+            'profile': entry.get('profile'),
+            'confirmed': False,
+            'known': True
+        }
+
+    def device_infos(self) -> List[Dict]:
+        """所有已知设备的设备信息（按最近连接时间从新到旧）"""
+        return [self.to_device_info(entry) for entry in self.devices()]
+
+    def last_session(self) -> List[Dict]:
+        """上次会话结束时仍连接的设备的设备信息"""
+        return [self.to_device_info(entry) for entry in self.devices() if entry.get('in_session')]
@@ -0,0 +1,190 @@
+"""
+连接监督模块
+检测链路断开和停滞，并以带抖动的指数退避自动重连
+"""
+
+import asyncio
+import random
+import time
+from typing import Dict, Optional
+
+from kivy.logger import Logger
+
+# 链路状态（通过 state_callback(address, state) 通知）
+LINK_LOST = 'lost'
+LINK_RECONNECTING = 'reconnecting'
+LINK_RESTORED = 'restored'
+LINK_STALLED = 'stalled'
+LINK_FAILED = 'failed'
+
+# 重连退避参数（秒）
+DEFAULT_BASE_DELAY = 1.0
+DEFAULT_MAX_DELAY = 60.0
+# 看门狗检查间隔（秒）
+DEFAULT_CHECK_INTERVAL = 5.0
+
+
+class LinkSupervisor:
+    """BluetoothManager 的连接监督器
+
+    track() 记录每个连接的原始连接参数；链路意外断开时用同样的参数
+    （包括原来的 data_callback）重新连接并重新订阅通知。
+    link_timeout 不为None时，看门狗会把超过该时间没有收到数据的链路标记为停滞，
+    restart_stalled 为True时主动断开停滞链路以触发重连。
+    link_timeout 可在运行时从任意线程设置，看门狗随之启动或停止。
+    """
+
+    def __init__(self, manager,
+                 base_delay: float = DEFAULT_BASE_DELAY,
+                 max_delay: float = DEFAULT_MAX_DELAY,
+                 max_attempts: Optional[int] = None,
+                 link_timeout: Optional[float] = None,
+                 restart_stalled: bool = False,
+                 check_interval: float = DEFAULT_CHECK_INTERVAL):
+        self.manager = manager
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self._link_timeout = link_timeout
+        self.restart_stalled = restart_stalled
+        self.check_interval = check_interval
+        # state_callback(address, state) 在链路状态变化时调用（事件循环线程中）
+        self.state_callback = None
+        self._links = {}
+        self._last_activity = {}
+        self._reconnect_tasks = {}
+        self._watchdog_task = None
+
+    @property
+    def link_timeout(self) -> Optional[float]:
+        return self._link_timeout
+
+    @link_timeout.setter
+    def link_timeout(self, value: Optional[float]):
+        if value is not None and value <= 0:
+            raise ValueError(f"链路超时必须大于0: {value}")
+        self._link_timeout = value
+        loop = self.manager.loop
+        if loop is not None:
+            loop.call_soon_threadsafe(self._update_watchdog)
+
+    def _update_watchdog(self):
+        """按 link_timeout 和是否有监督中的链路启动或停止看门狗（需在事件循环中调用）"""
+        if self._link_timeout is not None and self._links:
+            if self._watchdog_task is None:
+                self._watchdog_task = asyncio.ensure_future(self._watchdog())
+        elif self._watchdog_task is not None:
+            self._watchdog_task.cancel()
+            self._watchdog_task = None
+
+    def backoff_delay(self, attempt: int) -> float:
+        """第attempt次重连前的等待时间：指数增长并加入±50%抖动"""
+        delay = min(self.base_delay * (2 ** attempt), self.max_delay)
+        return delay * random.uniform(0.5, 1.5)
+
+    def track(self, address: str, connect_args: Dict):
+        """登记连接成功的设备及其连接参数（需在事件循环中调用）"""
+        self._links[address] = connect_args
+        self._last_activity[address] = time.monotonic()
+        self._update_watchdog()
+
+    def forget(self, address: str):
+        """主动断开时取消监督和正在进行的重连"""
+        self._links.pop(address, None)
+        self._last_activity.pop(address, None)
+        task = self._reconnect_tasks.pop(address, None)
+        if task is not None:
+            task.cancel()
+
+    def touch(self, address: str):
+        """记录链路活动（收到数据）"""
+        self._last_activity[address] = time.monotonic()
+
+    def stop(self):
+        """停止所有重连和看门狗任务"""
+        for address in list(self._links):
+            self.forget(address)
+        self._update_watchdog()
+
+    def on_disconnected(self, address: str):
+        """链路意外断开（由bleak的断开回调触发，在事件循环中调用）"""
+        if address not in self._links or address in self._reconnect_tasks:
+            return
+        Logger.warning(f"设备连接已断开，准备重连: {address}")
+        self._notify(address, LINK_LOST)
+        self._reconnect_tasks[address] = asyncio.ensure_future(self._reconnect(address))
+
+    def _notify(self, address: str, state: str):
+        if self.state_callback is not None:
+            try:
+                self.state_callback(address, state)
+            except Exception as e:
+                Logger.error(f"链路状态回调出错: {e}")
+
+    async def _reconnect(self, address: str):
+        """按退避策略重连，直到成功、被取消或超过最大次数"""
+        attempt = 0
+        try:
+            while address in self._links:
+                if self.max_attempts is not None and attempt >= self.max_attempts:
+                    Logger.error(f"重连 {address} 失败，已放弃")
+                    args = self._links.pop(address)
+                    self._notify(address, LINK_FAILED)
+                    args['failed_callback']("重连失败")
+                    return
+
+                delay = self.backoff_delay(attempt)
+                Logger.info(f"{delay:.1f} 秒后第 {attempt + 1} 次重连 {address}")
+                await asyncio.sleep(delay)
+                if address not in self._links:
+                    return
+                if address in self.manager.clients:
+                    return
+
+                self._notify(address, LINK_RECONNECTING)
+                self.manager.metrics.incr('reconnects')
+                args = self._links[address]
+                success = await self.manager.connect_device_async(
+                    args['device_info'],
+                    args['success_callback'],
+                    lambda error: None,
+                    args['data_callback'],
+                    **args['options']
+                )
+                if success:
+                    Logger.info(f"设备已重新连接: {address}")
+                    self._notify(address, LINK_RESTORED)
+                    return
+                attempt += 1
+        finally:
+            self._reconnect_tasks.pop(address, None)
+
+    async def _watchdog(self):
+        """定期检查长时间没有数据的链路"""
+        while True:
+            await asyncio.sleep(self.check_interval)
+            if self._link_timeout is None:
+                continue
+            now = time.monotonic()
+            for address, last in list(self._last_activity.items()):
+                entry = self.manager.clients.get(address)
+                if entry is None:
+                    continue
+                if now - last < self._link_timeout:
+                    entry['stalled'] = False
+                    continue
+                client = entry['client']
+                if not client.is_connected:
+                    # 没有收到断开回调的死链路
+                    self.manager._on_client_disconnected(address, client)
+                    continue
+                if entry.get('stalled'):
+                    continue
+                entry['stalled'] = True
+                Logger.warning(f"链路 {now - last:.0f} 秒没有数据: {address}")
+                self._notify(address, LINK_STALLED)
+                if self.restart_stalled:
+                    try:
+                        await client.disconnect()
+                    except Exception as e:
+                        Logger.error(f"断开停滞链路时出错: {e}")
@@ -5,24 +5,35 @@
 """
 
 import asyncio
+import os
 from kivy.app import App
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.label import Label
 from kivy.uix.button import Button
 from kivy.uix.textinput import TextInput
-from kivy.uix.scrollview import ScrollView
 from kivy.uix.popup import Popup
 from kivy.clock import Clock
 from bluetooth_manager import BluetoothManager
+from receive_buffer import ReceiveBuffer, SUMMARIZE, format_summary
+from message_log import MessageLogView
+from device_list import DeviceListView, ORDER_PROXIMITY
+from ui_dispatcher import UIDispatcher
 from kivy.logger import Logger
 
 class BluetoothApp(App):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.title = "蓝牙助手"
-        self.bluetooth_manager = BluetoothManager()
+        self.bluetooth_manager = BluetoothManager(data_dir=self.user_data_dir)
+        self.bluetooth_manager.supervisor.state_callback = self.on_link_state
+        # 接收数据先进入有界缓冲区，由UI每帧批量取出
+        self.rx_buffer = ReceiveBuffer(policy=SUMMARIZE)
+        # 所有界面修改经由调度器每帧合并应用一次
+        self.ui = UIDispatcher()
         self.devices_list = []
         self.connected_device = None
+        # 启动时不扫描，直接重连上次会话结束时仍连接的设备
+        self.reconnect_on_start = True
         
     def build(self):
         """构建用户界面"""
@@ -57,25 +68,21 @@ class BluetoothApp(App):
         )
         main_layout.add_widget(scan_button)
         
-        # 设备列表区域
-        scroll_view = ScrollView(size_hint=(1, 0.4))
-        self.devices_layout = BoxLayout(
-            orientation='vertical',
-            size_hint_y=None,
-            padding=10,
-            spacing=5
+        # 设备列表区域（按地址增量更新，估算距离近的排在前面）
+        self.device_list = DeviceListView(
+            select_callback=self.connect_device,
+            order=ORDER_PROXIMITY,
+            empty_text='未找到蓝牙设备',
+            size_hint=(1, 0.4)
         )
-        self.devices_layout.bind(minimum_height=self.devices_layout.setter('height'))
-        scroll_view.add_widget(self.devices_layout)
-        main_layout.add_widget(scroll_view)
+        main_layout.add_widget(self.device_list)
         
         # 通信区域
         comm_layout = BoxLayout(orientation='vertical', size_hint=(1, 0.3), spacing=5)
         
-        # 消息显示
-        self.message_display = TextInput(
-            text='',
-            readonly=True,
+        # 消息显示（内存中只保留最近的消息，完整历史写入磁盘）
+        self.message_display = MessageLogView(
+            history_path=os.path.join(self.user_data_dir, 'message_history.log'),
             size_hint_y=0.7,
             background_color=(0.9, 0.9, 0.9, 1)
         )
@@ -103,59 +110,58 @@ class BluetoothApp(App):
         
         main_layout.add_widget(comm_layout)
         
+        # 每帧取一次接收缓冲区
+        Clock.schedule_interval(self.drain_received, 0)
+        
         return main_layout
     
     def update_status(self, message):
         """更新状态显示"""
-        def update(dt):
-            self.status_label.text = message
-        Clock.schedule_once(update)
+        self.ui.set_attr(self.status_label, 'text', message)
     
     def update_devices_list(self, devices):
-        """更新设备列表显示"""
-        def update(dt):
-            self.devices_layout.clear_widgets()
-            if not devices:
-                no_device_label = Label(
-                    text='未找到蓝牙设备',
-                    font_size='16sp',
-                    size_hint_y=None,
-                    height=40
-                )
-                self.devices_layout.add_widget(no_device_label)
-                return
-                
-            for device in devices:
-                device_button = Button(
-                    text=f"{device['name']} ({device['address']})",
-                    size_hint_y=None,
-                    height=50,
-                    background_color=(0.7, 0.7, 0.7, 1),
-                    on_press=lambda x, d=device: self.connect_device(d)
-                )
-                self.devices_layout.add_widget(device_button)
-                
-        Clock.schedule_once(update)
+        """更新设备列表显示（只应用变化的部分）"""
+        self.ui.set('devices', self.device_list.set_devices, devices)
     
     def append_message(self, message, is_sent=False):
         """在消息显示区域添加消息"""
-        def update(dt):
-            prefix = "发送: " if is_sent else "接收: "
-            self.message_display.text += f"{prefix}{message}\n"
-            # 滚动到底部
-            self.message_display.cursor = (0, len(self.message_display.text))
-                
-        Clock.schedule_once(update)
+        prefix = "发送: " if is_sent else "接收: "
+        self.ui.append('log', self.append_lines, f"{prefix}{message}")
+    
+    def append_lines(self, lines):
+        """一次性追加多行到消息显示区域（在UI线程中调用）"""
+        self.message_display.extend(lines)
+    
+    def drain_received(self, dt):
+        """每帧从接收缓冲区批量取出数据并显示"""
+        items, summary = self.rx_buffer.drain_summary()
+        if not items and not summary:
+            return
+        lines = [f"接收: {data}" for data in items]
+        if summary and self.rx_buffer.policy == SUMMARIZE:
+            lines.append(format_summary(summary, self.rx_buffer.dropped_total))
+        self.append_lines(lines)
     
     def scan_devices(self, instance):
-        """扫描蓝牙设备"""
-        self.update_status('正在扫描蓝牙设备...')
+        """扫描蓝牙设备（先显示缓存的设备，扫描完成后再标记确认/未确认）"""
+        cached = self.bluetooth_manager.cached_devices() + self.bluetooth_manager.known_device_infos()
+        if cached:
+            self.update_devices_list(cached)
+            self.update_status(f'正在扫描蓝牙设备...（已显示 {len(cached)} 个缓存设备）')
+        else:
+            self.update_status('正在扫描蓝牙设备...')
         self.bluetooth_manager.scan_devices(self.on_scan_complete)
     
     def on_scan_complete(self, devices):
         """扫描完成回调"""
-        self.update_status(f'扫描完成，找到 {len(devices)} 个设备')
-        self.update_devices_list(devices)
+        confirmed = sum(1 for d in devices if d.get('confirmed', True))
+        stale = len(devices) - confirmed
+        if stale:
+            self.update_status(f'扫描完成，找到 {confirmed} 个设备，{stale} 个缓存设备未确认')
+        else:
+            self.update_status(f'扫描完成，找到 {confirmed} 个设备')
+        # 没有扫描到的已知设备也保留在列表中，可直接按地址连接
+        self.update_devices_list(devices + self.bluetooth_manager.known_device_infos())
     
     def connect_device(self, device):
         """连接蓝牙设备"""
@@ -171,7 +177,7 @@ class BluetoothApp(App):
         """连接成功回调"""
         self.connected_device = device
         self.update_status(f'已连接设备: {device["name"]}')
-        self.send_button.disabled = False
+        self.ui.set_attr(self.send_button, 'disabled', False)
         self.append_message(f'已成功连接到 {device["name"]}')
     
     def on_connect_failed(self, error):
@@ -180,31 +186,60 @@ class BluetoothApp(App):
         self.append_message(f'连接失败: {error}')
     
     def on_data_received(self, data):
-        """数据接收回调"""
-        self.append_message(data, is_sent=False)
+        """数据接收回调（在蓝牙线程中执行，只放入缓冲区）"""
+        self.rx_buffer.push(data)
+    
+    def on_link_state(self, address, state):
+        """链路状态变化回调（自动重连）"""
+        texts = {
+            'lost': '连接已断开，正在尝试重连...',
+            'reconnecting': '正在重新连接...',
+            'restored': '已重新连接',
+            'stalled': '链路长时间没有数据',
+            'failed': '重连失败，请重新连接设备'
+        }
+        if state in texts:
+            self.update_status(texts[state])
+    
+    def on_send_complete(self, message, success):
+        """发送完成回调（在UI线程中执行）"""
+        if success:
+            self.append_message(message, is_sent=True)
+        else:
+            self.update_status('发送失败')
     
     def send_message(self, instance):
         """发送消息"""
         message = self.message_input.text.strip()
         if message and self.connected_device:
-            # 发送消息
-            success = self.bluetooth_manager.send_message(message)
-            if success:
-                self.append_message(message, is_sent=True)
-                self.message_input.text = ''
-            else:
-                self.update_status('发送失败')
+            # 非阻塞发送，结果通过on_send_complete回调
+            self.message_input.text = ''
+            self.bluetooth_manager.send_message_nowait(message, callback=self.on_send_complete)
         elif not self.connected_device:
             self.update_status('请先连接设备')
     
     def on_start(self):
-        """应用启动时的初始化"""
-        self.update_status('应用启动，请开始扫描蓝牙设备')
+        """应用启动时的初始化：显示已知设备，并按设置直接重连上次会话的设备"""
+        known = self.bluetooth_manager.known_device_infos()
+        if known:
+            self.update_devices_list(known)
+        session = self.bluetooth_manager.known_devices.last_session()
+        if self.reconnect_on_start and session:
+            names = '、'.join(d['name'] for d in session)
+            self.update_status(f'正在重连上次的设备: {names}')
+            self.bluetooth_manager.reconnect_last_session(
+                self.on_connect_success,
+                self.on_connect_failed,
+                self.on_data_received
+            )
+        else:
+            self.update_status('应用启动，请开始扫描蓝牙设备')
     
     def on_stop(self):
         """应用关闭时清理资源"""
         if self.bluetooth_manager:
-            self.bluetooth_manager.disconnect_all()
+            self.bluetooth_manager.shutdown()
+        self.message_display.close()
 
 if __name__ == '__main__':
     BluetoothApp().run()
\ No newline at end of file
@@ -0,0 +1,173 @@
+"""
+消息日志模块
+内存中只保留最近的消息并用RecycleView显示（只布局可见行），完整历史追加写入磁盘
+"""
+
+import os
+import time
+from collections import deque
+from typing import Iterable, List, Optional, Tuple, Union
+
+from kivy.graphics import Color, Rectangle
+from kivy.logger import Logger
+from kivy.metrics import dp
+from kivy.uix.label import Label
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
+from kivy.uix.recycleview import RecycleView
+
+# 内存中保留的消息条数
+DEFAULT_MAX_ENTRIES = 2000
+# 默认文字颜色
+DEFAULT_TEXT_COLOR = (0.2, 0.2, 0.2, 1)
+
+# 日志条目：文本，或 (文本, 颜色)
+Entry = Union[str, Tuple[str, tuple]]
+
+
+class MessageLog:
+    """有界消息日志
+
+    entries 保存最近 max_entries 条消息文本，超出时丢弃最早的；
+    指定 history_path 时每条消息带时间戳追加写入该文件。
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, history_path: Optional[str] = None):
+        self.entries = deque(maxlen=max_entries)
+        self.total = 0
+        self.history_path = None
+        self._history_file = None
+        if history_path:
+            self.open_history(history_path)
+
+    def open_history(self, history_path: str):
+        """打开（追加模式）历史文件，之后的消息都会写入"""
+        self.close()
+        try:
+            directory = os.path.dirname(history_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._history_file = open(history_path, 'a', encoding='utf-8')
+            self._history_file.write(f"---- {time.strftime('%Y-%m-%d %H:%M:%S')} ----\n")
+            self.history_path = history_path
+        except OSError as e:
+            Logger.warning(f"MessageLog: 无法打开历史文件 {history_path}: {e}")
+            self._history_file = None
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def extend(self, texts: List[str]) -> int:
+        """追加一批消息，返回因超出容量被移出内存的条数"""
+        evicted = max(0, len(self.entries) + len(texts) - self.entries.maxlen)
+        self.entries.extend(texts)
+        self.total += len(texts)
+        if self._history_file:
+            stamp = time.strftime('%H:%M:%S')
+            try:
+                # 一批消息只写一次
+                self._history_file.write(''.join(f"[{stamp}] {text}\n" for text in texts))
+                self._history_file.flush()
+            except OSError as e:
+                Logger.warning(f"MessageLog: 写入历史文件失败: {e}")
+        return evicted
+
+    def clear(self):
+        self.entries.clear()
+
+    def close(self):
+        if self._history_file:
+            self._history_file.close()
+            self._history_file = None
+
+
+class MessageLogLine(Label):
+    """日志单行，固定行高，过长的内容截断显示"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.halign = 'left'
+        self.valign = 'middle'
+        self.shorten = True
+        self.shorten_from = 'right'
+        self.bind(size=self._update_text_size)
+
+    def _update_text_size(self, instance, size):
+        self.text_size = (size[0] - dp(8), size[1])
+
+
+class MessageLogView(RecycleView):
+    """基于RecycleView的消息日志控件
+
+    只为可见的行创建和布局控件，消息再多也不会拖慢界面；
+    视图停在底部时自动跟随最新消息。
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, history_path: Optional[str] = None,
+                 font_size='14sp', line_height: float = dp(22),
+                 text_color: tuple = DEFAULT_TEXT_COLOR, background_color: Optional[tuple] = None,
+                 **kwargs):
+        super().__init__(**kwargs)
+        self.log = MessageLog(max_entries, history_path)
+        self.font_size = font_size
+        self.text_color = text_color
+        self.viewclass = MessageLogLine
+        self.do_scroll_x = False
+
+        layout = RecycleBoxLayout(
+            orientation='vertical',
+            default_size=(None, line_height),
+            default_size_hint=(1, None),
+            size_hint=(1, None)
+        )
+        layout.bind(minimum_height=layout.setter('height'))
+        self.add_widget(layout)
+        self._layout = layout
+
+        if background_color:
+            with self.canvas.before:
+                Color(*background_color)
+                self._background = Rectangle(pos=self.pos, size=self.size)
+            self.bind(pos=self._update_background, size=self._update_background)
+
+    def _update_background(self, *args):
+        self._background.pos = self.pos
+        self._background.size = self.size
+
+    def extend(self, entries: Iterable[Entry]):
+        """追加一批消息（在UI线程中调用），每批只触发一次刷新"""
+        texts = []
+        rows = []
+        for entry in entries:
+            if isinstance(entry, tuple):
+                text, color = entry
+            else:
+                text, color = entry, self.text_color
+            texts.append(text)
+            rows.append({'text': text, 'color': color, 'font_size': self.font_size})
+        if not rows:
+            return
+
+        following = self.scroll_y <= 0.001 or self.height >= self._layout.height
+        evicted = self.log.extend(texts)
+        if len(rows) > self.log.entries.maxlen:
+            rows = rows[-self.log.entries.maxlen:]
+        if evicted >= len(self.data):
+            self.data = rows
+        else:
+            if evicted:
+                del self.data[:evicted]
+            self.data.extend(rows)
+        if following:
+            self.scroll_y = 0
+
+    def append(self, text: str, color: Optional[tuple] = None):
+        """追加一条消息"""
+        self.extend([(text, color or self.text_color)])
+
+    def clear(self):
+        self.log.clear()
+        self.data = []
+
+    def close(self):
+        """关闭历史文件"""
+        self.log.close()
@@ -0,0 +1,147 @@
+"""
+性能指标模块
+提供HDR风格的延迟直方图、计数器和按设备的状态量，开销很小，可在热点路径上使用
+"""
+
+import time
+from typing import Dict, Optional
+
+# 直方图每个2的幂区间划分的子桶数（约3%相对误差）
+SUB_BUCKET_BITS = 5
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+# 直方图记录的最大值（微秒），超过的值计入最后一个桶
+MAX_TRACKABLE_US = 60 * 1000 * 1000
+
+
+def _bucket_index(value: int) -> int:
+    """把微秒值映射到对数-线性桶的下标"""
+    if value < SUB_BUCKET_COUNT:
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS - 1
+    return ((shift + 1) << SUB_BUCKET_BITS) + ((value >> shift) - SUB_BUCKET_COUNT)
+
+
+def _bucket_value(index: int) -> int:
+    """桶下标对应的数值区间上界（微秒）"""
+    if index < SUB_BUCKET_COUNT:
+        return index
+    shift = (index >> SUB_BUCKET_BITS) - 1
+    sub = index & (SUB_BUCKET_COUNT - 1)
+    return ((sub + SUB_BUCKET_COUNT + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    """对数-线性分桶的延迟直方图（单位：秒，内部以微秒记录）"""
+
+    def __init__(self):
+        self.counts = [0] * (_bucket_index(MAX_TRACKABLE_US) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def record(self, seconds: float):
+        """记录一个延迟样本"""
+        value = int(seconds * 1000000)
+        if value < 0:
+            value = 0
+        elif value > MAX_TRACKABLE_US:
+            value = MAX_TRACKABLE_US
+        self.counts[_bucket_index(value)] += 1
+        self.count += 1
+        self.total += seconds
+        if self.min is None or seconds < self.min:
+            self.min = seconds
+        if self.max is None or seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q: float) -> Optional[float]:
+        """返回分位数（秒），q取0-100"""
+        if not self.count:
+            return None
+        target = max(1, int(self.count * q / 100.0 + 0.5))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            if n:
+                seen += n
+                if seen >= target:
+                    return max(min(_bucket_value(index) / 1000000.0, self.max), self.min)
+        return self.max
+
+    def reset(self):
+        self.counts = [0] * len(self.counts)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def snapshot(self) -> Dict:
+        """直方图摘要（毫秒）"""
+        if not self.count:
+            return {'count': 0}
+        return {
+            'count': self.count,
+            'min_ms': self.min * 1000.0,
+            'mean_ms': self.total / self.count * 1000.0,
+            'p50_ms': self.percentile(50) * 1000.0,
+            'p90_ms': self.percentile(90) * 1000.0,
+            'p99_ms': self.percentile(99) * 1000.0,
+            'max_ms': self.max * 1000.0
+        }
+
+
+class Metrics:
+    """蓝牙管理器的指标集合
+
+    指标只在后台事件循环线程中更新；snapshot() 可在任意线程调用，
+    得到的是近似一致的快照。
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+
+    def record(self, name: str, seconds: float):
+        """记录延迟样本"""
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = LatencyHistogram()
+        histogram.record(seconds)
+
+    def incr(self, name: str, amount: int = 1):
+        """累加计数器"""
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def set_gauge(self, address: str, name: str, value):
+        """设置设备的状态量"""
+        gauges = self.gauges.get(address)
+        if gauges is None:
+            gauges = self.gauges[address] = {}
+        gauges[name] = value
+
+    def incr_gauge(self, address: str, name: str, amount: int = 1):
+        """累加设备的计数型状态量"""
+        gauges = self.gauges.get(address)
+        if gauges is None:
+            gauges = self.gauges[address] = {}
+        gauges[name] = gauges.get(name, 0) + amount
+
+    def remove_device(self, address: str):
+        self.gauges.pop(address, None)
+
+    def reset(self):
+        self.started = time.time()
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+
+    def snapshot(self) -> Dict:
+        """返回全部指标的快照"""
+        return {
+            'uptime_s': time.time() - self.started,
+            'latency': {name: h.snapshot() for name, h in list(self.histograms.items())},
+            'counters': dict(self.counters),
+            'devices': {address: dict(g) for address, g in list(self.gauges.items())}
+        }
@@ -0,0 +1,195 @@
+"""
+接近度排序模块
+每个设备用定长数组环保存最近的RSSI样本，做EMA/卡尔曼平滑并估算距离；
+排名在每次更新时用二分查找增量调整，不做整表排序
+"""
+
+import bisect
+from array import array
+from typing import Dict, List, Optional
+
+# 平滑方式
+SMOOTHING_EMA = 'ema'
+SMOOTHING_KALMAN = 'kalman'
+
+# 每个设备保留的RSSI样本数
+DEFAULT_WINDOW = 16
+# EMA平滑系数（越大越跟手，越小越平稳）
+DEFAULT_ALPHA = 0.3
+# 卡尔曼滤波的过程噪声和测量噪声（dBm²）
+DEFAULT_PROCESS_NOISE = 0.5
+DEFAULT_MEASUREMENT_NOISE = 16.0
+# 1米处的参考RSSI（iBeacon常用值）和路径损耗指数（空旷环境约2，室内2.5-4）
+DEFAULT_MEASURED_POWER = -59
+DEFAULT_PATH_LOSS_EXPONENT = 2.5
+# 广播发射功率（0米）换算到1米参考RSSI的衰减
+TX_POWER_TO_1M = 41
+
+
+def estimate_distance(rssi: float, measured_power: float = DEFAULT_MEASURED_POWER,
+                      path_loss_exponent: float = DEFAULT_PATH_LOSS_EXPONENT) -> float:
+    """对数距离路径损耗模型估算距离（米）"""
+    return 10 ** ((measured_power - rssi) / (10.0 * path_loss_exponent))
+
+
+class RssiTrack:
+    """单个设备的RSSI样本环和平滑状态"""
+
+    __slots__ = ('samples', 'index', 'count', 'smoothed', 'variance', 'measured_power')
+
+    def __init__(self, window: int = DEFAULT_WINDOW):
+        self.samples = array('h', bytes(2 * window))
+        self.index = 0
+        self.count = 0
+        self.smoothed = None
+        self.variance = 0.0
+        self.measured_power = DEFAULT_MEASURED_POWER
+
+    def add(self, rssi: int):
+        self.samples[self.index] = rssi
+        self.index = (self.index + 1) % len(self.samples)
+        if self.count < len(self.samples):
+            self.count += 1
+
+    def window(self) -> List[int]:
+        """按时间顺序返回窗口内的样本"""
+        n = len(self.samples)
+        if self.count < n:
+            return self.samples[:self.count].tolist()
+        return (self.samples[self.index:] + self.samples[:self.index]).tolist()
+
+    def mean(self) -> Optional[float]:
+        if not self.count:
+            return None
+        return sum(self.samples[:self.count]) / self.count
+
+
+class ProximityRanker:
+    """按平滑后的RSSI估算距离并给设备排名（越近越靠前）
+
+    update() 在扫描回调中调用；ranking()/nearest() 返回当前排名。
+    只在蓝牙事件循环线程中更新，读取可在任意线程进行（得到近似一致的结果）。
+    """
+
+    def __init__(self, window: int = DEFAULT_WINDOW, smoothing: str = SMOOTHING_KALMAN,
+                 alpha: float = DEFAULT_ALPHA,
+                 process_noise: float = DEFAULT_PROCESS_NOISE,
+                 measurement_noise: float = DEFAULT_MEASUREMENT_NOISE,
+                 path_loss_exponent: float = DEFAULT_PATH_LOSS_EXPONENT):
+        if smoothing not in (SMOOTHING_EMA, SMOOTHING_KALMAN):
+            raise ValueError(f"不支持的平滑方式: {smoothing}")
+        self.window = window
+        self.smoothing = smoothing
+        self.alpha = alpha
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+        self.path_loss_exponent = path_loss_exponent
+        self._tracks = {}
+        # 排名：按 (路径损耗, 序号, 地址) 排序的键列表，以及每个地址当前的键；
+        # 路径损耗 = 1米参考RSSI - 平滑RSSI，与估算距离单调对应
+        self._ranking = []
+        self._key_of = {}
+        self._seq = 0
+
+    def __len__(self) -> int:
+        return len(self._tracks)
+
+    def __contains__(self, address: str) -> bool:
+        return address in self._tracks
+
+    def update(self, address: str, rssi: Optional[int], tx_power: Optional[int] = None) -> Optional[float]:
+        """记录一个RSSI样本，返回平滑后的RSSI"""
+        if rssi is None:
+            track = self._tracks.get(address)
+            return track.smoothed if track else None
+        track = self._tracks.get(address)
+        if track is None:
+            track = self._tracks[address] = RssiTrack(self.window)
+        if tx_power is not None:
+            track.measured_power = tx_power - TX_POWER_TO_1M
+        track.add(rssi)
+
+        if track.smoothed is None:
+            track.smoothed = float(rssi)
+            track.variance = self.measurement_noise
+        elif self.smoothing == SMOOTHING_EMA:
+            track.smoothed += self.alpha * (rssi - track.smoothed)
+        else:
+            # 一维卡尔曼滤波（常量模型）
+            variance = track.variance + self.process_noise
+            gain = variance / (variance + self.measurement_noise)
+            track.smoothed += gain * (rssi - track.smoothed)
+            track.variance = (1.0 - gain) * variance
+
+        self._rerank(address, track.measured_power - track.smoothed)
+        return track.smoothed
+
+    def _rerank(self, address: str, path_loss: float):
+        old_key = self._key_of.get(address)
+        if old_key is None:
+            seq = self._seq
+            self._seq += 1
+        else:
+            seq = old_key[1]
+        key = (path_loss, seq, address)
+        if old_key is not None:
+            if old_key == key:
+                return
+            del self._ranking[bisect.bisect_left(self._ranking, old_key)]
+        bisect.insort(self._ranking, key)
+        self._key_of[address] = key
+
+    def remove(self, address: str):
+        """移除设备"""
+        if self._tracks.pop(address, None) is None:
+            return
+        key = self._key_of.pop(address)
+        del self._ranking[bisect.bisect_left(self._ranking, key)]
+
+    def clear(self):
+        self._tracks = {}
+        self._ranking = []
+        self._key_of = {}
+        self._seq = 0
+
+    def smoothed(self, address: str) -> Optional[float]:
+        """平滑后的RSSI"""
+        track = self._tracks.get(address)
+        return track.smoothed if track else None
+
+    def distance(self, address: str) -> Optional[float]:
+        """估算距离（米）"""
+        track = self._tracks.get(address)
+        if track is None or track.smoothed is None:
+            return None
+        return estimate_distance(track.smoothed, track.measured_power, self.path_loss_exponent)
+
+    def stats(self, address: str) -> Optional[Dict]:
+        """设备的RSSI统计"""
+        track = self._tracks.get(address)
+        if track is None:
+            return None
+        return {
+            'samples': track.window(),
+            'mean': track.mean(),
+            'smoothed': track.smoothed,
+            'distance': self.distance(address)
+        }
+
+    def ranking(self, limit: Optional[int] = None, min_samples: int = 1) -> List[str]:
+        """按距离从近到远返回地址，min_samples 过滤样本太少的设备"""
+        result = []
+        for key in list(self._ranking):
+            address = key[2]
+            track = self._tracks.get(address)
+            if track is None or track.count < min_samples:
+                continue
+            result.append(address)
+            if limit is not None and len(result) >= limit:
+                break
+        return result
+
+    def nearest(self, min_samples: int = 3) -> Optional[str]:
+        """最近的设备地址（样本数不少于 min_samples）"""
+        ranking = self.ranking(1, min_samples)
+        return ranking[0] if ranking else None
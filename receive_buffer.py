@@ -0,0 +1,110 @@
+"""
+接收缓冲模块
+在蓝牙通知回调和UI之间放一个有界环形缓冲区，UI每帧批量取出
+"""
+
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+# 溢出策略
+DROP_OLDEST = 'drop_oldest'    # 丢弃最早的数据，保留最新的
+DROP_NEWEST = 'drop_newest'    # 丢弃新到的数据
+SUMMARIZE = 'summarize'        # 丢弃新到的数据，取出时给出丢弃数量和首末两条被丢弃的数据
+
+DEFAULT_CAPACITY = 1000
+# UI每帧最多取出的条数
+DEFAULT_BATCH_SIZE = 200
+# 汇报丢弃数据时每条最多显示的字符数
+SUMMARY_PREVIEW = 32
+
+
+class ReceiveBuffer:
+    """线程安全的有界接收缓冲区
+
+    push() 在蓝牙事件循环线程中调用，drain()/drain_summary() 在UI线程中每帧调用一次。
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, policy: str = DROP_OLDEST):
+        if policy not in (DROP_OLDEST, DROP_NEWEST, SUMMARIZE):
+            raise ValueError(f"不支持的溢出策略: {policy}")
+        self.capacity = capacity
+        self.policy = policy
+        self.dropped_total = 0
+        self._items = deque()
+        self._dropped_pending = 0
+        # SUMMARIZE 策略下上次取出后第一条和最后一条被丢弃的数据
+        self._first_dropped = None
+        self._last_dropped = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def push(self, item) -> bool:
+        """放入一条数据，被丢弃时返回False"""
+        with self._lock:
+            if len(self._items) < self.capacity:
+                self._items.append(item)
+                return True
+            self.dropped_total += 1
+            self._dropped_pending += 1
+            if self.policy == DROP_OLDEST:
+                self._items.popleft()
+                self._items.append(item)
+                return True
+            if self.policy == SUMMARIZE:
+                if self._dropped_pending == 1:
+                    self._first_dropped = item
+                self._last_dropped = item
+            return False
+
+    def drain(self, max_items: int = DEFAULT_BATCH_SIZE) -> Tuple[List, int]:
+        """取出最多max_items条数据，返回 (数据列表, 上次取出后丢弃的条数)"""
+        items, summary = self.drain_summary(max_items)
+        return items, summary['count'] if summary else 0
+
+    def drain_summary(self, max_items: int = DEFAULT_BATCH_SIZE) -> Tuple[List, Optional[Dict]]:
+        """取出最多max_items条数据，返回 (数据列表, 丢弃汇总)
+
+        上次取出后没有丢弃数据时汇总为None，否则为 {'count', 'first', 'last'}，
+        first/last 只在 SUMMARIZE 策略下记录（其他策略为None）
+        """
+        with self._lock:
+            count = min(max_items, len(self._items))
+            items = [self._items.popleft() for _ in range(count)]
+            summary = None
+            if self._dropped_pending:
+                summary = {'count': self._dropped_pending,
+                           'first': self._first_dropped,
+                           'last': self._last_dropped}
+            self._reset_dropped()
+        return items, summary
+
+    def _reset_dropped(self):
+        self._dropped_pending = 0
+        self._first_dropped = None
+        self._last_dropped = None
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._reset_dropped()
+
+
+def _preview(item) -> str:
+    text = item.hex(' ') if isinstance(item, (bytes, bytearray, memoryview)) else str(item)
+    if len(text) > SUMMARY_PREVIEW:
+        text = text[:SUMMARY_PREVIEW] + '…'
+    return text
+
+
+def format_summary(summary: Dict, dropped_total: int) -> str:
+    """把 drain_summary() 的丢弃汇总格式化为一行提示"""
+    text = f"数据过多，已丢弃 {summary['count']} 条"
+    if summary['first'] is not None:
+        if summary['count'] == 1:
+            text += f"（{_preview(summary['first'])}）"
+        else:
+            text += f"（首条 {_preview(summary['first'])}，末条 {_preview(summary['last'])}）"
+    return f"（{text}，累计丢弃 {dropped_total} 条）"
@@ -0,0 +1,86 @@
+"""
+扫描过滤模块
+服务UUID下推到扫描器（由平台过滤），其余条件在扫描回调入口处判断，
+不匹配的广播在任何分配和日志之前就被丢弃
+"""
+
+import re
+from typing import Dict, Iterable, Optional, Pattern, Union
+
+
+class ScanFilter:
+    """扫描过滤条件，各条件之间是"与"的关系，未指定的条件不参与判断
+
+    service_uuids      广播中包含任一服务UUID（同时作为 BleakScanner 的 service_uuids 参数下推）
+    name_pattern       设备名称匹配的正则表达式（search语义），预先编译
+    addresses          地址白名单
+    exclude_addresses  地址黑名单
+    min_rssi           最小信号强度（dBm）
+    manufacturer_ids   广播中包含任一厂商ID（manufacturer_data的键）
+    """
+
+    def __init__(self, service_uuids: Optional[Iterable[str]] = None,
+                 name_pattern: Optional[Union[str, Pattern]] = None,
+                 addresses: Optional[Iterable[str]] = None,
+                 exclude_addresses: Optional[Iterable[str]] = None,
+                 min_rssi: Optional[int] = None,
+                 manufacturer_ids: Optional[Iterable[int]] = None):
+        self.service_uuids = frozenset(u.lower() for u in service_uuids) if service_uuids else None
+        if isinstance(name_pattern, str):
+            name_pattern = re.compile(name_pattern)
+        self.name_regex = name_pattern
+        self.addresses = self._address_set(addresses)
+        self.exclude_addresses = self._address_set(exclude_addresses)
+        self.min_rssi = min_rssi
+        self.manufacturer_ids = frozenset(manufacturer_ids) if manufacturer_ids else None
+        # 统计：通过和被过滤的广播数
+        self.accepted = 0
+        self.rejected = 0
+
+    @staticmethod
+    def _address_set(addresses: Optional[Iterable[str]]) -> Optional[frozenset]:
+        """同时保存大小写两种形式，匹配时不用再转换回调里的地址"""
+        if not addresses:
+            return None
+        result = set()
+        for address in addresses:
+            result.add(address.upper())
+            result.add(address.lower())
+        return frozenset(result)
+
+    def scanner_options(self) -> Dict:
+        """传给 create_scanner 的参数（可由平台完成的过滤）"""
+        if self.service_uuids:
+            return {'service_uuids': sorted(self.service_uuids)}
+        return {}
+
+    def matches(self, device, advertisement_data) -> bool:
+        """判断一条广播是否通过过滤（按开销从小到大依次判断）"""
+        if self.min_rssi is not None and advertisement_data.rssi < self.min_rssi:
+            self.rejected += 1
+            return False
+        address = device.address
+        if self.exclude_addresses is not None and address in self.exclude_addresses:
+            self.rejected += 1
+            return False
+        if self.addresses is not None and address not in self.addresses:
+            self.rejected += 1
+            return False
+        if self.manufacturer_ids is not None:
+            manufacturer_data = advertisement_data.manufacturer_data
+            if not manufacturer_data or self.manufacturer_ids.isdisjoint(manufacturer_data):
+                self.rejected += 1
+                return False
+        if self.service_uuids is not None:
+            # 部分平台不会严格按service_uuids过滤，这里再确认一次
+            service_uuids = advertisement_data.service_uuids
+            if not service_uuids or self.service_uuids.isdisjoint(service_uuids):
+                self.rejected += 1
+                return False
+        if self.name_regex is not None:
+            name = device.name or advertisement_data.local_name
+            if not name or self.name_regex.search(name) is None:
+                self.rejected += 1
+                return False
+        self.accepted += 1
+        return True
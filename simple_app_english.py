@@ -23,10 +23,12 @@ from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.label import Label
 from kivy.uix.button import Button
 from kivy.uix.textinput import TextInput
-from kivy.uix.scrollview import ScrollView
-from kivy.clock import Clock
 from kivy.core.window import Window
 
+from message_log import MessageLogView
+from device_list import DeviceListView
+from ui_dispatcher import UIDispatcher
+
 # Kivy configuration
 from kivy.config import Config
 Config.set('graphics', 'width', '360')
@@ -97,6 +99,8 @@ class SimpleBluetoothApp(App):
         super().__init__(**kwargs)
         self.title = "Bluetooth Assistant"
         Window.size = (360, 640)  # Mobile screen size
+        # Collect UI updates from any thread and apply them once per frame
+        self.ui = UIDispatcher()
     
     def build(self):
         """Build user interface"""
@@ -158,16 +162,16 @@ class SimpleBluetoothApp(App):
         )
         device_list_frame.add_widget(device_list_label)
         
-        scroll_view = ScrollView(size_hint_y=1)
-        self.devices_layout = BoxLayout(
-            orientation='vertical',
-            size_hint_y=None,
-            padding=5,
-            spacing=5
+        self.device_list = DeviceListView(
+            select_callback=self.connect_device,
+            text_formatter=lambda d: "{} ({})".format(d['name'], d['address']),
+            empty_text='No Bluetooth devices found',
+            row_height=60,
+            font_size='12sp',
+            item_color=(0.9, 0.9, 0.9, 1),
+            size_hint_y=1
         )
-        self.devices_layout.bind(minimum_height=self.devices_layout.setter('height'))
-        scroll_view.add_widget(self.devices_layout)
-        device_list_frame.add_widget(scroll_view)
+        device_list_frame.add_widget(self.device_list)
         main_layout.add_widget(device_list_frame)
         
         # Communication area
@@ -187,13 +191,13 @@ class SimpleBluetoothApp(App):
         comm_frame.add_widget(comm_label)
         
         # Message display
-        self.message_display = TextInput(
-            text='Welcome to Bluetooth Assistant!\nScan devices to start connecting...\n',
-            readonly=True,
+        self.message_display = MessageLogView(
+            history_path=os.path.join(self.user_data_dir, 'message_history.log'),
             size_hint_y=0.7,
             background_color=(1, 1, 1, 1),
             font_size='12sp'
         )
+        self.message_display.extend(['Welcome to Bluetooth Assistant!', 'Scan devices to start connecting...'])
         comm_frame.add_widget(self.message_display)
         
         # Send message layout
@@ -239,13 +243,16 @@ class SimpleBluetoothApp(App):
     
     def update_status(self, message):
         """Update status display"""
-        def update(dt):
-            self.status_label.text = message
-        Clock.schedule_once(update)
+        self.ui.set_attr(self.status_label, 'text', message)
+    
+    def set_scan_button(self, text, disabled):
+        """Update scan button"""
+        self.ui.set_attr(self.scan_button, 'text', text)
+        self.ui.set_attr(self.scan_button, 'disabled', disabled)
     
     def update_connection_status(self, connected, device_name=None):
         """Update connection status"""
-        def update(dt):
+        def update():
             if connected:
                 self.connection_status.text = 'Connected: {}'.format(device_name)
                 self.connection_status.color = (0.3, 0.8, 0.3, 1)
@@ -256,67 +263,35 @@ class SimpleBluetoothApp(App):
                 self.connection_status.color = (1, 0.3, 0.3, 1)
                 self.send_button.disabled = True
                 self.send_button.background_color = (0.7, 0.7, 0.7, 1)
-        Clock.schedule_once(update)
+        self.ui.set('connection', update)
     
     def append_message(self, message, is_sent=False):
         """Add message to display area"""
-        def update(dt):
-            timestamp = time.strftime('%H:%M:%S')
-            prefix = "[{}] Sent: ".format(timestamp) if is_sent else "[{}] Received: ".format(timestamp)
-            
-            self.message_display.text += "{}{}\n".format(prefix, message)
-            # Scroll to bottom
-            self.message_display.cursor = (0, len(self.message_display.text))
-                
-        Clock.schedule_once(update)
+        timestamp = time.strftime('%H:%M:%S')
+        prefix = "[{}] Sent: ".format(timestamp) if is_sent else "[{}] Received: ".format(timestamp)
+        
+        self.ui.append('log', self.message_display.extend, "{}{}".format(prefix, message))
     
     def scan_devices(self, instance):
         """Scan for Bluetooth devices"""
         self.update_status('Scanning for Bluetooth devices...')
-        self.scan_button.text = 'Scanning...'
-        self.scan_button.disabled = True
+        self.set_scan_button('Scanning...', True)
         
         # Clear device list
-        self.devices_layout.clear_widgets()
+        self.device_list.clear()
         self.bluetooth_manager.scan_devices(self.on_scan_complete)
     
     def on_scan_complete(self, devices):
         """Scan complete callback"""
-        def update(dt):
-            self.update_status('Scan complete, found {} devices'.format(len(devices)))
-            self.scan_button.text = 'Scan Bluetooth Devices'
-            self.scan_button.disabled = False
-            
-            self.devices_layout.clear_widgets()
-            if not devices:
-                no_device_label = Label(
-                    text='No Bluetooth devices found',
-                    font_size='16sp',
-                    size_hint_y=None,
-                    height=40,
-                    color=(0.5, 0.5, 0.5, 1)
-                )
-                self.devices_layout.add_widget(no_device_label)
-                return
-                
-            for device in devices:
-                device_button = Button(
-                    text="{} ({})".format(device['name'], device['address']),
-                    size_hint_y=None,
-                    height=60,
-                    background_color=(0.9, 0.9, 0.9, 1),
-                    font_size='12sp',
-                    on_press=lambda x, d=device: self.connect_device(d)
-                )
-                self.devices_layout.add_widget(device_button)
+        self.update_status('Scan complete, found {} devices'.format(len(devices)))
+        self.set_scan_button('Scan Bluetooth Devices', False)
         
-        Clock.schedule_once(update)
+        self.ui.set('devices', self.device_list.set_devices, devices)
     
     def connect_device(self, device):
         """Connect to Bluetooth device"""
         self.update_status('Connecting to {}...'.format(device["name"]))
-        self.scan_button.text = 'Connecting...'
-        self.scan_button.disabled = True
+        self.set_scan_button('Connecting...', True)
         
         self.bluetooth_manager.connect_device(
             device, 
@@ -327,25 +302,17 @@ class SimpleBluetoothApp(App):
     
     def on_connect_success(self, device):
         """Connection success callback"""
-        def update(dt):
-            self.connected_device = device
-            self.update_connection_status(True, device['name'])
-            self.update_status('Connected to: {}'.format(device["name"]))
-            self.append_message('Successfully connected to {}'.format(device["name"]))
-            self.scan_button.text = 'Scan Bluetooth Devices'
-            self.scan_button.disabled = False
-        
-        Clock.schedule_once(update)
+        self.connected_device = device
+        self.update_connection_status(True, device['name'])
+        self.update_status('Connected to: {}'.format(device["name"]))
+        self.append_message('Successfully connected to {}'.format(device["name"]))
+        self.set_scan_button('Scan Bluetooth Devices', False)
     
     def on_connect_failed(self, error):
         """Connection failed callback"""
-        def update(dt):
-            self.update_status('Connection failed: {}'.format(error))
-            self.append_message('Connection failed: {}'.format(error))
-            self.scan_button.text = 'Scan Bluetooth Devices'
-            self.scan_button.disabled = False
-        
-        Clock.schedule_once(update)
+        self.update_status('Connection failed: {}'.format(error))
+        self.append_message('Connection failed: {}'.format(error))
+        self.set_scan_button('Scan Bluetooth Devices', False)
     
     def on_data_received(self, data):
         """Data received callback"""
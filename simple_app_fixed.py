@@ -37,9 +37,11 @@ from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.label import Label
 from kivy.uix.button import Button
 from kivy.uix.textinput import TextInput
-from kivy.uix.scrollview import ScrollView
-from kivy.clock import Clock
 from kivy.core.window import Window
+
+from message_log import MessageLogView
+from device_list import DeviceListView
+from ui_dispatcher import UIDispatcher
 from kivy.logger import Logger
 
 # Kivy配置 - 确保UTF-8支持
@@ -113,6 +115,8 @@ class SimpleBluetoothApp(App):
         super().__init__(**kwargs)
         self.title = "手机蓝牙助手 (简化版)"
         Window.size = (360, 640)  # 手机屏幕尺寸
+        # 任意线程的界面修改经由调度器每帧合并应用一次
+        self.ui = UIDispatcher()
     
     def build(self):
         """构建用户界面"""
@@ -174,16 +178,16 @@ class SimpleBluetoothApp(App):
         )
         device_list_frame.add_widget(device_list_label)
         
-        scroll_view = ScrollView(size_hint_y=1)
-        self.devices_layout = BoxLayout(
-            orientation='vertical',
-            size_hint_y=None,
-            padding=5,
-            spacing=5
+        self.device_list = DeviceListView(
+            select_callback=self.connect_device,
+            text_formatter=lambda d: "{} ({})".format(d['name'], d['address']),
+            empty_text='未找到蓝牙设备',
+            row_height=60,
+            font_size='12sp',
+            item_color=(0.9, 0.9, 0.9, 1),
+            size_hint_y=1
         )
-        self.devices_layout.bind(minimum_height=self.devices_layout.setter('height'))
-        scroll_view.add_widget(self.devices_layout)
-        device_list_frame.add_widget(scroll_view)
+        device_list_frame.add_widget(self.device_list)
         main_layout.add_widget(device_list_frame)
         
         # 通信区域
@@ -203,13 +207,13 @@ class SimpleBluetoothApp(App):
         comm_frame.add_widget(comm_label)
         
         # 消息显示
-        self.message_display = TextInput(
-            text='欢迎使用手机蓝牙助手！\n扫描设备开始连接...\n',
-            readonly=True,
+        self.message_display = MessageLogView(
+            history_path=os.path.join(self.user_data_dir, 'message_history.log'),
             size_hint_y=0.7,
             background_color=(1, 1, 1, 1),
             font_size='12sp'
         )
+        self.message_display.extend(['欢迎使用手机蓝牙助手！', '扫描设备开始连接...'])
         comm_frame.add_widget(self.message_display)
         
         # 发送消息布局
@@ -255,13 +259,16 @@ class SimpleBluetoothApp(App):
     
     def update_status(self, message):
         """更新状态显示"""
-        def update(dt):
-            self.status_label.text = message
-        Clock.schedule_once(update)
+        self.ui.set_attr(self.status_label, 'text', message)
+    
+    def set_scan_button(self, text, disabled):
+        """更新扫描按钮"""
+        self.ui.set_attr(self.scan_button, 'text', text)
+        self.ui.set_attr(self.scan_button, 'disabled', disabled)
     
     def update_connection_status(self, connected, device_name=None):
         """更新连接状态"""
-        def update(dt):
+        def update():
             if connected:
                 self.connection_status.text = '已连接: {}'.format(device_name)
                 self.connection_status.color = (0.3, 0.8, 0.3, 1)
@@ -272,67 +279,35 @@ class SimpleBluetoothApp(App):
                 self.connection_status.color = (1, 0.3, 0.3, 1)
                 self.send_button.disabled = True
                 self.send_button.background_color = (0.7, 0.7, 0.7, 1)
-        Clock.schedule_once(update)
+        self.ui.set('connection', update)
     
     def append_message(self, message, is_sent=False):
         """在消息显示区域添加消息"""
-        def update(dt):
-            timestamp = time.strftime('%H:%M:%S')
-            prefix = "[{}] 发送: ".format(timestamp) if is_sent else "[{}] 接收: ".format(timestamp)
-            
-            self.message_display.text += "{}{}\n".format(prefix, message)
-            # 滚动到底部
-            self.message_display.cursor = (0, len(self.message_display.text))
-                
-        Clock.schedule_once(update)
+        timestamp = time.strftime('%H:%M:%S')
+        prefix = "[{}] 发送: ".format(timestamp) if is_sent else "[{}] 接收: ".format(timestamp)
+        
+        self.ui.append('log', self.message_display.extend, "{}{}".format(prefix, message))
     
     def scan_devices(self, instance):
         """扫描蓝牙设备"""
         self.update_status('正在扫描蓝牙设备...')
-        self.scan_button.text = '扫描中...'
-        self.scan_button.disabled = True
+        self.set_scan_button('扫描中...', True)
         
         # 清空设备列表
-        self.devices_layout.clear_widgets()
+        self.device_list.clear()
         self.bluetooth_manager.scan_devices(self.on_scan_complete)
     
     def on_scan_complete(self, devices):
         """扫描完成回调"""
-        def update(dt):
-            self.update_status('扫描完成，找到 {} 个设备'.format(len(devices)))
-            self.scan_button.text = '扫描蓝牙设备'
-            self.scan_button.disabled = False
-            
-            self.devices_layout.clear_widgets()
-            if not devices:
-                no_device_label = Label(
-                    text='未找到蓝牙设备',
-                    font_size='16sp',
-                    size_hint_y=None,
-                    height=40,
-                    color=(0.5, 0.5, 0.5, 1)
-                )
-                self.devices_layout.add_widget(no_device_label)
-                return
-                
-            for device in devices:
-                device_button = Button(
-                    text="{} ({})".format(device['name'], device['address']),
-                    size_hint_y=None,
-                    height=60,
-                    background_color=(0.9, 0.9, 0.9, 1),
-                    font_size='12sp',
-                    on_press=lambda x, d=device: self.connect_device(d)
-                )
-                self.devices_layout.add_widget(device_button)
+        self.update_status('扫描完成，找到 {} 个设备'.format(len(devices)))
+        self.set_scan_button('扫描蓝牙设备', False)
         
-        Clock.schedule_once(update)
+        self.ui.set('devices', self.device_list.set_devices, devices)
     
     def connect_device(self, device):
         """连接蓝牙设备"""
         self.update_status('正在连接 {}...'.format(device["name"]))
-        self.scan_button.text = '连接中...'
-        self.scan_button.disabled = True
+        self.set_scan_button('连接中...', True)
         
         self.bluetooth_manager.connect_device(
             device, 
@@ -343,25 +318,17 @@ class SimpleBluetoothApp(App):
     
     def on_connect_success(self, device):
         """连接成功回调"""
-        def update(dt):
-            self.connected_device = device
-            self.update_connection_status(True, device['name'])
-            self.update_status('已连接设备: {}'.format(device["name"]))
-            self.append_message('已成功连接到 {}'.format(device["name"]))
-            self.scan_button.text = '扫描蓝牙设备'
-            self.scan_button.disabled = False
-        
-        Clock.schedule_once(update)
+        self.connected_device = device
+        self.update_connection_status(True, device['name'])
+        self.update_status('已连接设备: {}'.format(device["name"]))
+        self.append_message('已成功连接到 {}'.format(device["name"]))
+        self.set_scan_button('扫描蓝牙设备', False)
     
     def on_connect_failed(self, error):
         """连接失败回调"""
-        def update(dt):
-            self.update_status('连接失败: {}'.format(error))
-            self.append_message('连接失败: {}'.format(error))
-            self.scan_button.text = '扫描蓝牙设备'
-            self.scan_button.disabled = False
-        
-        Clock.schedule_once(update)
+        self.update_status('连接失败: {}'.format(error))
+        self.append_message('连接失败: {}'.format(error))
+        self.set_scan_button('扫描蓝牙设备', False)
     
     def on_data_received(self, data):
         """数据接收回调"""
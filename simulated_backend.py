@@ -0,0 +1,375 @@
+"""
+模拟蓝牙后端模块
+在进程内模拟成百上千个BLE外设，无需蓝牙硬件即可对BluetoothManager做功能和压力测试
+"""
+
+import asyncio
+import heapq
+import random
+from typing import Callable, Dict, List, Optional
+
+from bleak import BleakError
+
+from bluetooth_backend import BluetoothBackend
+
+# 模拟HM-10透传模块的GATT布局：0xFFE0服务中只有一个0xFFE1特征值，同时用于通知和写入；
+# 句柄与真实模块一样由设备分配，与UUID无关，调用方应按UUID查找特征值
+SERIAL_SERVICE_UUID = '0000ffe0-0000-1000-8000-00805f9b34fb'
+SERIAL_CHAR_UUID = '0000ffe1-0000-1000-8000-00805f9b34fb'
+SERIAL_SERVICE_HANDLE = 0x0010
+SERIAL_CHAR_HANDLE = 0x0012
+
+
+def default_payload(seq: int) -> bytes:
+    """默认的通知内容：递增序号加换行"""
+    return b'%d\n' % seq
+
+
+class SimulatedPeripheral:
+    """一个模拟外设的参数和运行状态
+
+    adv_interval: 广播间隔（秒）；connect_latency: 连接耗时（秒）；
+    connect_failure_rate: 连接失败概率；mtu: 协商后的ATT MTU；
+    notify_rate: 订阅后每秒发送的通知数（0为不发送）；
+    notify_payload(seq) -> bytes: 生成第seq条通知内容；
+    write_latency: 有响应写入的往返耗时（秒）；packet_loss: 广播和通知的丢包率；
+    echo: 是否把写入的数据作为通知回传
+    """
+
+    def __init__(self, address: str, name: Optional[str] = None,
+                 rssi: int = -60,
+                 adv_interval: float = 0.1,
+                 connect_latency: float = 0.05,
+                 connect_failure_rate: float = 0.0,
+                 mtu: int = 247,
+                 notify_rate: float = 0.0,
+                 notify_payload: Callable[[int], bytes] = default_payload,
+                 write_latency: float = 0.005,
+                 packet_loss: float = 0.0,
+                 echo: bool = False,
+                 service_uuids: Optional[List[str]] = None,
+                 manufacturer_data: Optional[Dict[int, bytes]] = None,
+                 service_data: Optional[Dict[str, bytes]] = None,
+                 tx_power: Optional[int] = None):
+        if adv_interval <= 0:
+            raise ValueError(f"广播间隔必须大于0: {adv_interval}")
+        self.address = address
+        self.name = name
+        self.rssi = rssi
+        self.adv_interval = adv_interval
+        self.connect_latency = connect_latency
+        self.connect_failure_rate = connect_failure_rate
+        self.mtu = mtu
+        self.notify_rate = notify_rate
+        self.notify_payload = notify_payload
+        self.write_latency = write_latency
+        self.packet_loss = packet_loss
+        self.echo = echo
+        self.service_uuids = service_uuids if service_uuids is not None else [SERIAL_SERVICE_UUID]
+        self.manufacturer_data = manufacturer_data or {}
+        self.service_data = service_data or {}
+        self.tx_power = tx_power
+        self.device = SimulatedDevice(address, name)
+        self.client = None
+        # 统计
+        self.bytes_received = 0
+        self.writes_received = 0
+        self.notifications_sent = 0
+
+    def lost(self) -> bool:
+        """按丢包率判断本次是否丢包"""
+        return self.packet_loss > 0 and random.random() < self.packet_loss
+
+    def advertisement(self) -> 'SimulatedAdvertisementData':
+        """生成一次广播数据（RSSI带随机抖动）"""
+        return SimulatedAdvertisementData(
+            local_name=self.name,
+            rssi=self.rssi + random.randint(-4, 4),
+            service_uuids=self.service_uuids,
+            manufacturer_data=self.manufacturer_data,
+            service_data=self.service_data,
+            tx_power=self.tx_power
+        )
+
+    def drop_link(self):
+        """模拟射频中断：已连接的客户端意外断开"""
+        if self.client is not None:
+            self.client._link_lost()
+
+
+class SimulatedDevice:
+    """对应bleak的BLEDevice"""
+
+    def __init__(self, address: str, name: Optional[str]):
+        self.address = address
+        self.name = name
+
+    def __repr__(self):
+        return f"SimulatedDevice({self.address}, {self.name})"
+
+
+class SimulatedAdvertisementData:
+    """对应bleak的AdvertisementData"""
+
+    def __init__(self, local_name, rssi, service_uuids, manufacturer_data, service_data, tx_power):
+        self.local_name = local_name
+        self.rssi = rssi
+        self.service_uuids = service_uuids
+        self.manufacturer_data = manufacturer_data
+        self.service_data = service_data
+        self.tx_power = tx_power
+        self.platform_data = ()
+
+
+class SimulatedCharacteristic:
+    def __init__(self, uuid: str, handle: int, properties: List[str], mtu: int):
+        self.uuid = uuid
+        self.handle = handle
+        self.properties = properties
+        self.descriptors = []
+        self.max_write_without_response_size = mtu - 3
+
+
+class SimulatedService:
+    def __init__(self, uuid: str, handle: int, characteristics: List[SimulatedCharacteristic]):
+        self.uuid = uuid
+        self.handle = handle
+        self.characteristics = characteristics
+
+
+class SimulatedServiceCollection:
+    """对应bleak的BleakGATTServiceCollection"""
+
+    def __init__(self, mtu: int):
+        self.serial_char = SimulatedCharacteristic(
+            SERIAL_CHAR_UUID, SERIAL_CHAR_HANDLE,
+            ['read', 'write-without-response', 'write', 'notify'], mtu
+        )
+        self._services = [SimulatedService(SERIAL_SERVICE_UUID, SERIAL_SERVICE_HANDLE,
+                                           [self.serial_char])]
+
+    def __iter__(self):
+        return iter(self._services)
+
+    def get_characteristic(self, specifier):
+        """与bleak一致：int按句柄查找，字符串按UUID查找"""
+        for service in self._services:
+            for char in service.characteristics:
+                if specifier is char:
+                    return char
+                if isinstance(specifier, int):
+                    if specifier == char.handle:
+                        return char
+                elif isinstance(specifier, str) and specifier.lower() == char.uuid:
+                    return char
+        return None
+
+
+class SimulatedScanner:
+    """模拟扫描器：用一个调度任务按各外设的广播间隔产生广播"""
+
+    def __init__(self, peripherals: List[SimulatedPeripheral], detection_callback: Callable,
+                 service_uuids: Optional[List[str]] = None, **kwargs):
+        self.peripherals = peripherals
+        self.detection_callback = detection_callback
+        self.service_uuids = [u.lower() for u in service_uuids] if service_uuids else None
+        self._task = None
+
+    async def start(self):
+        self._task = asyncio.ensure_future(self._advertise())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def _accepts(self, peripheral: SimulatedPeripheral) -> bool:
+        if self.service_uuids is None:
+            return True
+        return any(u.lower() in self.service_uuids for u in peripheral.service_uuids)
+
+    async def _advertise(self):
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        # (下次广播时间, 序号, 外设)，首次广播时间随机分布在一个广播间隔内
+        schedule = [(now + random.random() * p.adv_interval, i, p)
+                    for i, p in enumerate(self.peripherals) if self._accepts(p)]
+        heapq.heapify(schedule)
+        while schedule:
+            due, i, peripheral = schedule[0]
+            # 落后于调度时也让出一次事件循环，否则广播密集时会一直占用事件循环
+            await asyncio.sleep(max(due - loop.time(), 0))
+            now = loop.time()
+            # 处理所有已到期的广播
+            while schedule and schedule[0][0] <= now:
+                due, i, peripheral = schedule[0]
+                if peripheral.client is None and not peripheral.lost():
+                    self.detection_callback(peripheral.device, peripheral.advertisement())
+                # 落后时不补发错过的广播，从当前时间重新计算，每批中每个外设最多广播一次
+                due += peripheral.adv_interval
+                if due <= now:
+                    due = now + peripheral.adv_interval
+                heapq.heapreplace(schedule, (due, i, peripheral))
+
+
+class SimulatedClient:
+    """模拟GATT客户端"""
+
+    def __init__(self, peripheral: SimulatedPeripheral,
+                 disconnected_callback: Optional[Callable] = None,
+                 timeout: float = 10.0, **kwargs):
+        self.peripheral = peripheral
+        self.disconnected_callback = disconnected_callback
+        self.timeout = timeout
+        self.services = SimulatedServiceCollection(peripheral.mtu)
+        self._connected = False
+        self._notify_callback = None
+        self._notify_tasks = []
+
+    @property
+    def address(self) -> str:
+        return self.peripheral.address
+
+    @property
+    def is_connected(self) -> bool:
+        return self._connected
+
+    @property
+    def mtu_size(self) -> int:
+        return self.peripheral.mtu
+
+    async def connect(self, **kwargs):
+        peripheral = self.peripheral
+        latency = peripheral.connect_latency
+        if latency > self.timeout:
+            await asyncio.sleep(self.timeout)
+            raise asyncio.TimeoutError()
+        await asyncio.sleep(latency)
+        if peripheral.client is not None:
+            raise BleakError(f"设备 {peripheral.address} 已被其他客户端连接")
+        if peripheral.connect_failure_rate and random.random() < peripheral.connect_failure_rate:
+            raise BleakError(f"连接 {peripheral.address} 失败（模拟）")
+        peripheral.client = self
+        self._connected = True
+        return True
+
+    async def disconnect(self):
+        if not self._connected:
+            return True
+        self._teardown()
+        if self.disconnected_callback is not None:
+            self.disconnected_callback(self)
+        return True
+
+    def _teardown(self):
+        self._connected = False
+        for task in self._notify_tasks:
+            task.cancel()
+        self._notify_tasks = []
+        if self.peripheral.client is self:
+            self.peripheral.client = None
+
+    def _link_lost(self):
+        if not self._connected:
+            return
+        self._teardown()
+        if self.disconnected_callback is not None:
+            asyncio.get_running_loop().call_soon(self.disconnected_callback, self)
+
+    def _deliver(self, callback, data: bytes):
+        """发送一条通知（按丢包率丢弃）"""
+        if not self._connected or self.peripheral.lost():
+            return
+        self.peripheral.notifications_sent += 1
+        callback(self.services.serial_char, bytearray(data))
+
+    def _characteristic(self, char_specifier, prop: str) -> SimulatedCharacteristic:
+        """按句柄/UUID/对象查找特征值并检查属性，找不到时与bleak一样抛出BleakError"""
+        char = self.services.get_characteristic(char_specifier)
+        if char is None:
+            raise BleakError(f"找不到特征值 {char_specifier}")
+        if not any(p.startswith(prop) for p in char.properties):
+            raise BleakError(f"特征值 {char.uuid} 不支持 {prop}")
+        return char
+
+    async def start_notify(self, char_specifier, callback):
+        if not self._connected:
+            raise BleakError("设备未连接")
+        self._characteristic(char_specifier, 'notify')
+        self._notify_callback = callback
+        if self.peripheral.notify_rate > 0:
+            self._notify_tasks.append(asyncio.ensure_future(self._notify_loop(callback)))
+
+    async def stop_notify(self, char_specifier):
+        pass
+
+    async def _notify_loop(self, callback):
+        peripheral = self.peripheral
+        interval = 1.0 / peripheral.notify_rate
+        loop = asyncio.get_running_loop()
+        next_time = loop.time()
+        seq = 0
+        while self._connected:
+            next_time += interval
+            delay = next_time - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._deliver(callback, peripheral.notify_payload(seq))
+            seq += 1
+
+    async def write_gatt_char(self, char_specifier, data, response: bool = False):
+        if not self._connected:
+            raise BleakError("设备未连接")
+        self._characteristic(char_specifier, 'write')
+        peripheral = self.peripheral
+        if len(data) > peripheral.mtu - 3:
+            raise BleakError(f"写入长度 {len(data)} 超过MTU")
+        if response:
+            await asyncio.sleep(peripheral.write_latency)
+        peripheral.writes_received += 1
+        peripheral.bytes_received += len(data)
+        if peripheral.echo and self._notify_callback is not None:
+            self._deliver(self._notify_callback, bytes(data))
+
+
+class SimulatedBackend(BluetoothBackend):
+    """模拟外设群后端"""
+
+    def __init__(self, peripherals: Optional[List[SimulatedPeripheral]] = None):
+        self.peripherals = {}
+        for peripheral in peripherals or []:
+            self.add(peripheral)
+
+    @classmethod
+    def fleet(cls, count: int, name_prefix: str = 'SIM', **peripheral_options) -> 'SimulatedBackend':
+        """创建包含count个相同参数外设的后端"""
+        peripherals = []
+        for i in range(count):
+            address = ':'.join(f'{b:02X}' for b in (0xC0, 0xFF, (i >> 24) & 0xFF,
+                                                   (i >> 16) & 0xFF, (i >> 8) & 0xFF, i & 0xFF))
+            peripherals.append(SimulatedPeripheral(address, f'{name_prefix}-{i:04d}',
+                                                   **peripheral_options))
+        return cls(peripherals)
+
+    def add(self, peripheral: SimulatedPeripheral):
+        self.peripherals[peripheral.address] = peripheral
+
+    def device_info(self, address: str) -> Dict:
+        """返回可直接传给connect_device的设备信息（不经过扫描）"""
+        peripheral = self.peripherals[address]
+        return {
+            'name': peripheral.name or '未知设备',
+            'address': address,
+            'rssi': peripheral.rssi,
+            'device': peripheral.device
+        }
+
+    def create_scanner(self, detection_callback, **kwargs):
+        return SimulatedScanner(list(self.peripherals.values()), detection_callback, **kwargs)
+
+    def create_client(self, device, disconnected_callback=None, **kwargs):
+        address = device if isinstance(device, str) else device.address
+        peripheral = self.peripherals.get(address)
+        if peripheral is None:
+            raise BleakError(f"未找到模拟设备: {address}")
+        return SimulatedClient(peripheral, disconnected_callback, **kwargs)
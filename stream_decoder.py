@@ -0,0 +1,110 @@
+"""
+数据流解码模块
+对通知数据做增量UTF-8解码，并按配置的分帧方式切分出完整消息
+"""
+
+import codecs
+from typing import List, Optional
+
+from kivy.logger import Logger
+
+# 分帧方式
+FRAMING_NONE = 'none'            # 不分帧，解码出多少就输出多少
+FRAMING_NEWLINE = 'newline'      # 以 \n 结尾（兼容 \r\n）
+FRAMING_CRLF = 'crlf'            # 以 \r\n 结尾
+FRAMING_FIXED = 'fixed'          # 固定字符数
+FRAMING_DELIMITER = 'delimiter'  # 自定义分隔符
+
+# 缓冲区中未完成帧的最大字符数，超过后强制输出，防止无限增长
+DEFAULT_MAX_FRAME_LENGTH = 4096
+
+
+class StreamDecoder:
+    """单连接的增量解码和分帧器
+
+    跨包拆开的多字节字符会留在解码器中等待后续数据，不会报错丢弃；
+    feed() 只返回完整的帧。无效字节替换为U+FFFD，decode_errors 统计包含无效字节的数据包数。
+    """
+
+    def __init__(self, framing: str = FRAMING_NEWLINE,
+                 delimiter: Optional[str] = None,
+                 frame_length: Optional[int] = None,
+                 encoding: str = 'utf-8',
+                 max_frame_length: int = DEFAULT_MAX_FRAME_LENGTH):
+        if framing == FRAMING_NEWLINE:
+            separator = '\n'
+        elif framing == FRAMING_CRLF:
+            separator = '\r\n'
+        elif framing == FRAMING_DELIMITER:
+            if not delimiter:
+                raise ValueError("delimiter分帧方式需要指定分隔符")
+            separator = delimiter
+        elif framing == FRAMING_FIXED:
+            if not frame_length or frame_length <= 0:
+                raise ValueError("fixed分帧方式需要指定正整数帧长度")
+            separator = None
+        elif framing == FRAMING_NONE:
+            separator = None
+        else:
+            raise ValueError(f"不支持的分帧方式: {framing}")
+
+        self.framing = framing
+        self.separator = separator
+        self.frame_length = frame_length
+        self.max_frame_length = max_frame_length
+        self.encoding = encoding
+        # 正常情况下严格解码，出错时用替换模式的解码器从同一状态重新解码这个数据包
+        self._decoder = codecs.getincrementaldecoder(encoding)()
+        self._fallback = codecs.getincrementaldecoder(encoding)(errors='replace')
+        self._buffer = ''
+        self.decode_errors = 0
+
+    def _decode(self, data: bytes, final: bool = False) -> str:
+        state = self._decoder.getstate()
+        try:
+            return self._decoder.decode(data, final)
+        except UnicodeDecodeError:
+            self.decode_errors += 1
+            self._fallback.setstate(state)
+            text = self._fallback.decode(data, final)
+            self._decoder.setstate(self._fallback.getstate())
+            return text
+
+    def feed(self, data: bytes) -> List[str]:
+        """输入一个通知数据包，返回其中包含的完整帧"""
+        text = self._decode(data)
+        if not text:
+            return []
+
+        if self.framing == FRAMING_NONE:
+            return [text]
+
+        buffer = self._buffer + text
+        if self.framing == FRAMING_FIXED:
+            size = self.frame_length
+            end = len(buffer) - len(buffer) % size
+            frames = [buffer[i:i + size] for i in range(0, end, size)]
+            self._buffer = buffer[end:]
+            return frames
+
+        frames = buffer.split(self.separator)
+        self._buffer = frames.pop()
+        if self.framing == FRAMING_NEWLINE:
+            frames = [f[:-1] if f.endswith('\r') else f for f in frames]
+        if len(self._buffer) > self.max_frame_length:
+            Logger.warning(f"接收数据超过 {self.max_frame_length} 字符仍未找到帧结束符，强制输出")
+            frames.append(self._buffer)
+            self._buffer = ''
+        return frames
+
+    @property
+    def pending(self) -> bool:
+        """缓冲区或UTF-8解码器中是否还有未输出的数据"""
+        return bool(self._buffer) or bool(self._decoder.getstate()[0])
+
+    def flush(self) -> List[str]:
+        """输出缓冲区中剩余的不完整数据（例如连接断开时）"""
+        rest = self._buffer + self._decode(b'', final=True)
+        self._buffer = ''
+        self._decoder.reset()
+        return [rest] if rest else []
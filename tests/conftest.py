@@ -0,0 +1,12 @@
+"""
+测试公共配置
+把项目根目录加入模块搜索路径（模块都在根目录下），并关闭Kivy的命令行解析和控制台日志
+"""
+
+import os
+import sys
+
+os.environ.setdefault('KIVY_NO_ARGS', '1')
+os.environ.setdefault('KIVY_NO_CONSOLELOG', '1')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,88 @@
+"""
+advertisement 测试：iBeacon/Eddystone/厂商数据解析、按需解析和结果缓存
+"""
+
+import struct
+import uuid
+
+from advertisement import (COMPANY_APPLE, EDDYSTONE_SERVICE_UUID, decode_advertisement,
+                           register_decoder, unregister_decoder)
+from device_registry import DeviceRegistry
+from simulated_backend import SimulatedAdvertisementData, SimulatedDevice
+
+BEACON_UUID = uuid.UUID('e2c56db5-dffb-48d2-b060-d0f5a71096e0')
+
+
+def advertisement(manufacturer_data=None, service_data=None, service_uuids=(), local_name=None):
+    return SimulatedAdvertisementData(local_name, -60, list(service_uuids),
+                                      manufacturer_data or {}, service_data or {}, -4)
+
+
+def ibeacon_data(major=1, minor=2, power=-59):
+    return b'\x02\x15' + BEACON_UUID.bytes + struct.pack('>HHb', major, minor, power)
+
+
+def test_ibeacon():
+    info = {'advertisement_data': advertisement({COMPANY_APPLE: ibeacon_data(7, 9)})}
+    decoded = decode_advertisement(info)
+    assert decoded['ibeacon'] == {'uuid': str(BEACON_UUID), 'major': 7, 'minor': 9,
+                                  'measured_power': -59}
+    assert decoded['manufacturer'] == [{'company_id': COMPANY_APPLE, 'company': 'Apple',
+                                        'data': ibeacon_data(7, 9).hex()}]
+    assert decoded['tx_power'] == -4
+
+
+def test_eddystone_frames():
+    url = bytes((0x10, 0xEB, 0x03)) + b'example' + bytes((0x07,))
+    decoded = decode_advertisement({'advertisement_data': advertisement(
+        service_data={EDDYSTONE_SERVICE_UUID: url})})
+    assert decoded['eddystone'] == {'frame': 'url', 'tx_power': -21, 'url': 'https://example.com'}
+
+    tlm = bytes((0x20, 0x00)) + struct.pack('>HhII', 3000, 0x1880, 42, 600)
+    decoded = decode_advertisement({'advertisement_data': advertisement(
+        service_data={EDDYSTONE_SERVICE_UUID: tlm})})
+    assert decoded['eddystone'] == {'frame': 'tlm', 'battery_mv': 3000, 'temperature': 24.5,
+                                    'adv_count': 42, 'uptime_s': 60.0}
+
+
+def test_malformed_data_is_not_decoded():
+    info = {'advertisement_data': advertisement(
+        {COMPANY_APPLE: b'\x02\x15\x00'}, {EDDYSTONE_SERVICE_UUID: b'\x10'})}
+    decoded = decode_advertisement(info)
+    assert 'ibeacon' not in decoded and 'eddystone' not in decoded
+    assert decoded['manufacturer_data'] == {COMPANY_APPLE: b'\x02\x15\x00'}
+
+
+def test_no_advertisement():
+    assert decode_advertisement({'advertisement_data': None}) is None
+
+
+def test_result_is_cached_until_advertisement_changes():
+    calls = []
+    register_decoder('probe', lambda adv: calls.append(adv) or 'seen')
+    try:
+        info = {'advertisement_data': advertisement()}
+        first = decode_advertisement(info)
+        assert decode_advertisement(info) is first
+        assert len(calls) == 1 and first['probe'] == 'seen'
+
+        info['advertisement_data'] = advertisement()
+        assert decode_advertisement(info) is not first
+        assert len(calls) == 2
+    finally:
+        unregister_decoder('probe')
+    # 注销解析器后缓存失效
+    assert 'probe' not in decode_advertisement(info)
+
+
+def test_registry_does_not_decode_during_scan():
+    calls = []
+    register_decoder('probe', lambda adv: calls.append(adv))
+    try:
+        registry = DeviceRegistry()
+        info, _, _ = registry.update(SimulatedDevice('AA:01', 'x'), advertisement())
+        assert calls == []
+        decode_advertisement(info)
+        assert len(calls) == 1
+    finally:
+        unregister_decoder('probe')
@@ -0,0 +1,91 @@
+"""
+background_scanner 测试：前台扫描期间暂停后台扫描窗口
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from bluetooth_manager import BluetoothManager
+from simulated_backend import SimulatedBackend, SimulatedPeripheral, SimulatedScanner
+
+
+class CountingScanner(SimulatedScanner):
+    """记录同时运行的扫描器数量"""
+
+    def __init__(self, backend, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.backend = backend
+
+    async def start(self):
+        self.backend.active += 1
+        self.backend.max_active = max(self.backend.max_active, self.backend.active)
+        await super().start()
+
+    async def stop(self):
+        if self._task is not None:
+            self.backend.active -= 1
+        await super().stop()
+
+
+class CountingBackend(SimulatedBackend):
+
+    def __init__(self, peripherals):
+        super().__init__(peripherals)
+        self.active = 0
+        self.max_active = 0
+
+    def create_scanner(self, detection_callback, **kwargs):
+        return CountingScanner(self, list(self.peripherals.values()), detection_callback, **kwargs)
+
+
+def wait_until(predicate, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("等待超时")
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def manager(tmp_path):
+    backend = CountingBackend([SimulatedPeripheral('C0:FF:00:00:00:01', 'HM-10', adv_interval=0.01)])
+    manager = BluetoothManager(data_dir=str(tmp_path), backend=backend)
+    yield manager
+    manager.shutdown()
+
+
+def test_foreground_scan_pauses_background_window(manager):
+    backend = manager.backend
+    background = manager.background_scanner
+    manager.start_background_scan(scan_window=30.0, scan_interval=60.0).result(5)
+    wait_until(lambda: backend.active == 1)
+
+    async def foreground_scan():
+        # 前台扫描期间只有前台扫描器在运行
+        return {backend.active async for info, is_new in manager.scan_stream(duration=0.05)}
+
+    assert manager.submit(foreground_scan()).result(5) == {1}
+    assert backend.max_active == 1
+    assert background.running
+    assert background.windows == 1
+    assert background._paused == 0
+    manager.stop_background_scan().result(5)
+
+
+def test_paused_scanner_skips_windows(manager):
+    background = manager.background_scanner
+
+    async def run():
+        await background.pause()
+        background.start()
+        await background.pause()
+        background.resume()
+        # 仍有一层暂停，本周期跳过
+        await asyncio.sleep(0.05)
+        assert (background.windows, background.skipped) == (0, 1)
+        background.resume()
+        await background.stop()
+
+    manager.submit(run()).result(5)
@@ -0,0 +1,24 @@
+"""
+benchmark 测试：失败的连接不能混入测量结果
+"""
+
+import pytest
+
+import benchmark
+from bluetooth_manager import BluetoothManager
+from simulated_backend import SimulatedBackend, SimulatedPeripheral
+
+
+def test_connect_raises_when_connection_fails(tmp_path):
+    peripheral = SimulatedPeripheral('C0:FF:00:00:00:09', 'SIM-FAIL', connect_latency=0.0,
+                                     connect_failure_rate=1.0)
+    backend = SimulatedBackend([peripheral])
+    manager = BluetoothManager(data_dir=str(tmp_path), backend=backend)
+    try:
+        with pytest.raises(RuntimeError, match='模拟'):
+            benchmark.connect(manager, backend.device_info(peripheral.address))
+        peripheral.connect_failure_rate = 0.0
+        benchmark.connect(manager, backend.device_info(peripheral.address))
+        assert peripheral.address in manager.clients
+    finally:
+        manager.shutdown()
@@ -0,0 +1,95 @@
+"""
+device_registry 测试：按地址原地更新、连接状态和排序视图
+"""
+
+import pytest
+
+from device_registry import DeviceRegistry
+
+
+class Device:
+    def __init__(self, address, name=None):
+        self.address = address
+        self.name = name
+
+
+class Advertisement:
+    def __init__(self, rssi):
+        self.rssi = rssi
+
+
+@pytest.fixture
+def registry():
+    registry = DeviceRegistry()
+    for i, rssi in enumerate((-70, -40, -90, -55)):
+        registry.update(Device('AA:%02d' % i, 'dev%d' % i), Advertisement(rssi))
+    return registry
+
+
+def test_update_reports_new_and_rssi_changes():
+    registry = DeviceRegistry()
+    info, is_new, rssi_changed = registry.update(Device('AA:01'), Advertisement(-60))
+    assert is_new and not rssi_changed
+    assert info['name'] == '未知设备'
+
+    same, is_new, rssi_changed = registry.update(Device('AA:01', 'HC-05'), Advertisement(-60))
+    assert same is info
+    assert not is_new and not rssi_changed
+    # 之前没有名称的设备在收到名称后补上
+    assert info['name'] == 'HC-05'
+
+    _, _, rssi_changed = registry.update(Device('AA:01'), Advertisement(-50))
+    assert rssi_changed and info['rssi'] == -50
+    assert len(registry) == 1
+
+
+def test_add_returns_existing_entry():
+    registry = DeviceRegistry()
+    scanned, _, _ = registry.update(Device('AA:01', 'x'), Advertisement(-60))
+    assert registry.add({'name': 'x', 'address': 'AA:01', 'device': 'AA:01'}) is scanned
+
+    added = registry.add({'name': 'y', 'address': 'BB:01', 'device': 'BB:01'})
+    assert added['rssi'] is None and not added['connected']
+    assert 'BB:01' in registry
+
+
+def test_clear_keeps_connected_devices(registry):
+    registry.set_connected('AA:01', True)
+    assert registry.is_connected('AA:01')
+    registry.clear()
+    assert [d['address'] for d in registry.devices()] == ['AA:01']
+    registry.clear(keep_connected=False)
+    assert len(registry) == 0
+
+
+def test_sorted_views(registry):
+    assert [d['rssi'] for d in registry.by_rssi()] == [-40, -55, -70, -90]
+    assert [d['rssi'] for d in registry.by_rssi(limit=2)] == [-40, -55]
+    for i, device_info in enumerate(registry.devices()):
+        device_info['last_seen'] = [3.0, 1.0, 4.0, 2.0][i]
+    assert [d['address'] for d in registry.by_last_seen()] == ['AA:02', 'AA:00', 'AA:03', 'AA:01']
+    assert [d['address'] for d in registry.by_last_seen(limit=1)] == ['AA:02']
+    assert [d['address'] for d in registry.devices()] == ['AA:00', 'AA:01', 'AA:02', 'AA:03']
+
+
+def test_remove(registry):
+    assert registry.remove('AA:00')['name'] == 'dev0'
+    assert registry.remove('AA:00') is None
+    assert registry.get('AA:00') is None
+
+
+def test_expire_skips_connected_devices(registry):
+    for i, device_info in enumerate(registry.devices()):
+        device_info['last_seen'] = 100.0 + i * 10
+    registry.set_connected('AA:00', True)
+    expired = registry.expire(15.0, now=130.0)
+    assert [d['address'] for d in expired] == ['AA:01']
+    assert [d['address'] for d in registry.devices()] == ['AA:00', 'AA:02', 'AA:03']
+
+
+def test_mark_stale_until_advertisement_seen(registry):
+    registry.set_connected('AA:00', True)
+    assert registry.mark_stale() == 3
+    assert [d['confirmed'] for d in registry.devices()] == [True, False, False, False]
+    registry.update(Device('AA:02'), Advertisement(-90))
+    assert registry.get('AA:02')['confirmed']
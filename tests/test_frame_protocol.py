@@ -0,0 +1,143 @@
+"""
+frame_protocol 测试：CRC、长度前缀/COBS/SLIP帧解析和跨包拆分
+"""
+
+import struct
+
+import pytest
+
+from frame_protocol import (CRC16, CRC32, SLIP_END, SLIP_ESC, SLIP_ESC_END, SLIP_ESC_ESC,
+                            CobsParser, FrameDispatcher, LengthPrefixedParser, SlipParser,
+                            crc16_ccitt, crc32)
+
+
+def cobs_encode(data: bytes) -> bytes:
+    """COBS编码（不含结尾的0x00）"""
+    out = bytearray()
+    block = bytearray()
+    for b in data:
+        if b == 0:
+            out += bytes((len(block) + 1,)) + block
+            block = bytearray()
+            continue
+        block.append(b)
+        if len(block) == 0xFE:
+            out += b'\xff' + block
+            block = bytearray()
+    out += bytes((len(block) + 1,)) + block
+    return bytes(out)
+
+
+def slip_encode(data: bytes) -> bytes:
+    """SLIP编码（含结尾的0xC0）"""
+    out = bytearray()
+    for b in data:
+        if b == SLIP_END:
+            out += bytes((SLIP_ESC, SLIP_ESC_END))
+        elif b == SLIP_ESC:
+            out += bytes((SLIP_ESC, SLIP_ESC_ESC))
+        else:
+            out.append(b)
+    out.append(SLIP_END)
+    return bytes(out)
+
+
+def with_crc16(payload: bytes) -> bytes:
+    return payload + crc16_ccitt(payload).to_bytes(2, 'little')
+
+
+def collect(parser, packets):
+    """依次输入数据包，返回复制出的全部帧负载"""
+    frames = []
+    for packet in packets:
+        parser.feed(packet, lambda payload: frames.append(bytes(payload)))
+    return frames
+
+
+def splits(data: bytes):
+    """在每个位置把数据拆成两个数据包"""
+    return [[data[:i], data[i:]] for i in range(1, len(data))]
+
+
+def test_crc_check_values():
+    assert crc16_ccitt(b'123456789') == 0x29B1
+    assert crc32(b'123456789') == 0xCBF43926
+    assert crc16_ccitt(memoryview(b'123456789')) == 0x29B1
+
+
+def test_length_prefixed_frames_in_one_packet():
+    payloads = [b'abc', b'', b'\x00\xff']
+    stream = b''.join(bytes((len(p),)) + with_crc16(p) for p in payloads)
+    parser = LengthPrefixedParser(crc=CRC16)
+    assert collect(parser, [stream]) == payloads
+    assert parser.frames == 3 and parser.crc_errors == 0
+
+
+@pytest.mark.parametrize('packets', splits(b'\x05hello\x03abc'))
+def test_length_prefixed_frames_split_across_packets(packets):
+    assert collect(LengthPrefixedParser(), packets) == [b'hello', b'abc']
+
+
+def test_length_prefixed_two_byte_length_big_endian():
+    payload = bytes(300)
+    parser = LengthPrefixedParser(length_size=2, byteorder='big', crc=CRC32)
+    frame = struct.pack('>H', len(payload)) + payload + crc32(payload).to_bytes(4, 'big')
+    assert collect(parser, [frame[:100], frame[100:]]) == [payload]
+
+
+def test_crc_mismatch_drops_frame_and_keeps_parsing():
+    bad = bytearray(b'\x03' + with_crc16(b'bad'))
+    bad[-1] ^= 0xFF
+    good = b'\x02' + with_crc16(b'ok')
+    parser = LengthPrefixedParser(crc=CRC16)
+    assert collect(parser, [bytes(bad) + good]) == [b'ok']
+    assert parser.crc_errors == 1 and parser.frames == 1
+
+
+def test_oversized_length_is_a_framing_error():
+    parser = LengthPrefixedParser(max_frame_length=16)
+    assert collect(parser, [b'\x20' + bytes(32)]) == []
+    assert parser.framing_errors == 1
+
+
+@pytest.mark.parametrize('payload', [b'abc', b'\x00', b'a\x00\x00b', bytes(range(1, 256)) + b'\x00x'])
+def test_cobs_round_trip(payload):
+    assert collect(CobsParser(), [cobs_encode(payload) + b'\x00']) == [payload]
+
+
+def test_cobs_frames_split_byte_by_byte():
+    payloads = [b'\x01\x00\x02', b'hello', b'\x00']
+    stream = b''.join(cobs_encode(with_crc16(p)) + b'\x00' for p in payloads)
+    parser = CobsParser(crc=CRC16)
+    assert collect(parser, [stream[i:i + 1] for i in range(len(stream))]) == payloads
+    assert parser.crc_errors == 0
+
+
+def test_cobs_invalid_code_is_a_framing_error():
+    parser = CobsParser()
+    assert collect(parser, [b'\x05ab\x00' + cobs_encode(b'ok') + b'\x00']) == [b'ok']
+    assert parser.framing_errors == 1
+
+
+@pytest.mark.parametrize('packets', splits(slip_encode(bytes((1, SLIP_END, 2, SLIP_ESC, 3)))))
+def test_slip_escaped_bytes_split_across_packets(packets):
+    assert collect(SlipParser(), packets) == [bytes((1, SLIP_END, 2, SLIP_ESC, 3))]
+
+
+def test_slip_bad_escape_is_a_framing_error():
+    parser = SlipParser()
+    stream = bytes((SLIP_ESC, 0x01, SLIP_END)) + slip_encode(b'ok')
+    assert collect(parser, [stream]) == [b'ok']
+    assert parser.framing_errors == 1
+
+
+def test_dispatcher_unpacks_registered_types():
+    values = []
+    unknown = []
+    dispatcher = FrameDispatcher(lambda frame_type, payload: unknown.append(frame_type))
+    dispatcher.register(0x01, '<hH', lambda a, b: values.append((a, b)))
+    parser = LengthPrefixedParser()
+    for payload in (b'\x01' + struct.pack('<hH', -5, 7), b'\x09xyz', b'\x01\x00'):
+        parser.feed(bytes((len(payload),)) + payload, dispatcher)
+    assert values == [(-5, 7)]
+    assert unknown == [0x09] and dispatcher.unknown_frames == 1
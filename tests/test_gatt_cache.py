@@ -0,0 +1,44 @@
+"""
+gatt_cache 测试：布局记录、缓存命中判断和各平台的连接参数
+"""
+
+import pytest
+
+import gatt_cache
+from gatt_cache import GattCache, describe_services
+from simulated_backend import SimulatedServiceCollection
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return GattCache(str(tmp_path / 'gatt_cache.json'))
+
+
+def test_update_reports_layout_changes(cache):
+    services = SimulatedServiceCollection(247)
+    assert cache.update('AA:01', services) is False
+    assert cache.get('AA:01')['hash'] == describe_services(services)['hash']
+    assert cache.update('AA:01', services) is True
+    # 从系统缓存读出的服务无法判断布局是否变化
+    assert cache.update('AA:01', services, from_cache=True) is None
+
+
+def test_bluez_cache_only_after_discovery_in_this_process(cache, monkeypatch):
+    monkeypatch.setattr(gatt_cache, 'platform', 'linux')
+    assert cache.connect_options('AA:01') == {}
+    cache.update('AA:01', SimulatedServiceCollection(247))
+    assert cache.connect_options('AA:01') == {'dangerous_use_bleak_cache': True}
+    # 重新加载后本进程尚未发现过服务，不使用 BlueZ 缓存
+    reloaded = GattCache(cache.path)
+    assert reloaded.get('AA:01')
+    assert reloaded.connect_options('AA:01') == {}
+    cache.invalidate('AA:01')
+    assert cache.connect_options('AA:01') == {}
+    assert cache.get('AA:01') is None
+
+
+def test_windows_client_options_require_entry(cache, monkeypatch):
+    monkeypatch.setattr(gatt_cache, 'platform', 'win')
+    assert cache.client_options('AA:01') == {}
+    cache.update('AA:01', SimulatedServiceCollection(247))
+    assert cache.client_options('AA:01')
@@ -0,0 +1,115 @@
+"""
+gatt_profiles 测试：按名称/广播/服务选择配置、特征值解析和写入方式
+"""
+
+import pytest
+
+from bluetooth_manager import BluetoothManager
+from gatt_profiles import (PROFILE_ESP_SPP, PROFILE_NORDIC_UART, PROFILE_SERIAL,
+                           WRITE_WITH_RESPONSE, WRITE_WITHOUT_RESPONSE, GattProfile,
+                           ProfileRegistry)
+from simulated_backend import (SERIAL_CHAR_HANDLE, SimulatedAdvertisementData, SimulatedBackend,
+                               SimulatedPeripheral, SimulatedServiceCollection)
+
+NUS_SERVICE = '6e400001-b5a3-f393-e0a9-e50e24dcca9e'
+
+
+def device_info(name=None, service_uuids=None, profile=None):
+    advertisement = SimulatedAdvertisementData(name, -60, service_uuids or [], {}, {}, None)
+    return {'name': name, 'address': 'AA:01', 'advertisement_data': advertisement,
+            'profile': profile}
+
+
+def test_match_by_name_and_advertised_service():
+    registry = ProfileRegistry()
+    assert registry.match(device_info('HM-10')) is PROFILE_SERIAL
+    assert registry.match(device_info('ESP_SPP_SERVER')) is PROFILE_ESP_SPP
+    assert registry.match(device_info('sensor', [NUS_SERVICE.upper()])) is PROFILE_NORDIC_UART
+    # 都不匹配时使用默认配置
+    assert registry.match(device_info('unknown')) is PROFILE_SERIAL
+    assert ProfileRegistry(default=None).match(device_info('unknown')) is None
+
+
+def test_recorded_profile_name_wins():
+    registry = ProfileRegistry()
+    assert registry.match(device_info('HM-10', profile='nordic-uart')) is PROFILE_NORDIC_UART
+    # 记录的配置已不存在时按常规匹配
+    assert registry.match(device_info('HM-10', profile='removed')) is PROFILE_SERIAL
+
+
+def test_registered_profile_takes_priority():
+    registry = ProfileRegistry()
+    custom = GattProfile('custom-hm', notify='0000fff1-0000-1000-8000-00805f9b34fb',
+                         write='0000fff2-0000-1000-8000-00805f9b34fb', name_pattern=r'^HM-')
+    registry.register(custom)
+    assert registry.names()[0] == 'custom-hm'
+    assert registry.match(device_info('HM-10')) is custom
+    registry.unregister('custom-hm')
+    assert registry.get('custom-hm') is None
+    assert registry.match(device_info('HM-10')) is PROFILE_SERIAL
+
+
+def test_match_services_after_connect():
+    registry = ProfileRegistry()
+    services = SimulatedServiceCollection(247)
+    assert registry.match_services(services) is PROFILE_SERIAL
+    registry.unregister(PROFILE_SERIAL.name)
+    assert registry.match_services(services) is None
+
+
+def test_resolve_returns_characteristics_or_raises():
+    services = SimulatedServiceCollection(247)
+    resolved = PROFILE_SERIAL.resolve(services)
+    assert 'notify' in resolved['notify'].properties
+    assert 'write' in resolved['write'].properties
+    assert resolved['read'] is None
+    with pytest.raises(LookupError):
+        PROFILE_NORDIC_UART.resolve(services)
+
+
+def test_serial_profile_addresses_characteristic_by_uuid():
+    services = SimulatedServiceCollection(247)
+    resolved = PROFILE_SERIAL.resolve(services)
+    # HM-10 只有一个 0xFFE1 特征值，通知和写入共用
+    assert resolved['notify'] is resolved['write']
+    assert resolved['notify'].uuid.startswith('0000ffe1')
+    assert resolved['notify'].handle == SERIAL_CHAR_HANDLE
+    # 整数按句柄解析，与 bleak 一致
+    assert services.get_characteristic(0xFFE1) is None
+    assert services.get_characteristic(SERIAL_CHAR_HANDLE) is resolved['notify']
+
+
+def test_write_modes():
+    assert PROFILE_SERIAL.write_response is None
+    assert PROFILE_NORDIC_UART.write_response is False
+    profile = GattProfile('acked', notify=1, write=2, write_mode=WRITE_WITH_RESPONSE)
+    assert profile.write_response is True
+    assert GattProfile('fast', notify=1, write=2,
+                       write_mode=WRITE_WITHOUT_RESPONSE).write_response is False
+    with pytest.raises(ValueError):
+        GattProfile('bad', notify=1, write=2, write_mode='sometimes')
+
+
+@pytest.fixture
+def manager(tmp_path):
+    peripheral = SimulatedPeripheral('C0:FF:00:00:00:01', 'HM-10', connect_latency=0.0)
+    manager = BluetoothManager(data_dir=str(tmp_path), backend=SimulatedBackend([peripheral]))
+    yield manager
+    manager.shutdown()
+
+
+def test_manager_uses_selected_profile(manager):
+    info = manager.backend.device_info('C0:FF:00:00:00:01')
+    assert manager.connect_device(info, lambda d: None, lambda e: None, lambda d: None).result(5)
+    entry = manager.clients['C0:FF:00:00:00:01']
+    assert entry['profile'] is PROFILE_SERIAL
+    assert entry['writer'].characteristic is entry['characteristics']['write']
+
+
+def test_manager_rejects_unsupported_profile(manager):
+    info = manager.backend.device_info('C0:FF:00:00:00:01')
+    errors = []
+    assert not manager.connect_device(info, lambda d: None, errors.append, lambda d: None,
+                                      profile='nordic-uart').result(5)
+    assert 'nordic-uart' in errors[0]
+    assert not manager.clients
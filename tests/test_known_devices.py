@@ -0,0 +1,121 @@
+"""
+known_devices 测试：记录、会话标记、持久化，以及启动时重连上次会话的设备
+"""
+
+import json
+import time
+
+import pytest
+
+import known_devices
+from bluetooth_manager import BluetoothManager
+from known_devices import KnownDevices
+from simulated_backend import SimulatedBackend, SimulatedPeripheral
+
+
+def info(address, name='dev'):
+    return {'address': address, 'name': name, 'device': object()}
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'known_devices.json')
+
+
+def test_remember_and_reload(path):
+    store = KnownDevices(path)
+    store.remember(info('AA:01', 'HC-05'), profile='serial-ffe0', gatt_hash='abc')
+    store.remember(info('AA:01', None))
+
+    reloaded = KnownDevices(path)
+    entry = reloaded.get('AA:01')
+    # 没有新值时保留原有的名称、配置和哈希
+    assert (entry['name'], entry['profile'], entry['gatt_hash']) == ('HC-05', 'serial-ffe0', 'abc')
+    assert entry['in_session']
+    assert len(reloaded) == 1 and 'AA:01' in reloaded
+
+
+def test_last_session_excludes_ended_sessions(path):
+    store = KnownDevices(path)
+    store.remember(info('AA:01'))
+    store.remember(info('AA:02'))
+    store.end_session('AA:01')
+    assert [d['address'] for d in KnownDevices(path).last_session()] == ['AA:02']
+
+    device_info = store.last_session()[0]
+    assert device_info['device'] == 'AA:02'
+    assert not device_info['confirmed'] and device_info['known']
+
+
+def test_oldest_device_is_evicted(path, monkeypatch):
+    clock = iter(range(100))
+    monkeypatch.setattr(known_devices.time, 'time', lambda: next(clock))
+    store = KnownDevices(path, max_devices=2)
+    for address in ('AA:01', 'AA:02', 'AA:03'):
+        store.remember(info(address))
+    assert [d['address'] for d in store.devices()] == ['AA:03', 'AA:02']
+
+
+def test_forget(path):
+    store = KnownDevices(path)
+    store.remember(info('AA:01'))
+    store.forget('AA:01')
+    assert len(KnownDevices(path)) == 0
+
+
+def test_corrupt_file_starts_empty(path):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{not json')
+    store = KnownDevices(path)
+    assert len(store) == 0
+    store.remember(info('AA:01'))
+    with open(path, encoding='utf-8') as f:
+        assert 'AA:01' in json.load(f)
+
+
+def test_delayed_save_coalesces_writes(path, monkeypatch):
+    store = KnownDevices(path, save_delay=60)
+    writes = []
+    write = store._write
+    monkeypatch.setattr(store, '_write', lambda data: (writes.append(data), write(data)))
+    store.remember(info('AA:01'))
+    store.remember(info('AA:02'))
+    # 写入延迟期间文件还没有更新
+    assert len(KnownDevices(path)) == 0
+    store.flush()
+    assert len(writes) == 1
+    assert len(KnownDevices(path)) == 2
+    # 没有新修改时不重复写入
+    store.flush()
+    assert len(writes) == 1
+
+
+def test_delayed_save_writes_in_background(path):
+    store = KnownDevices(path, save_delay=0.01)
+    store.remember(info('AA:01'))
+    deadline = time.monotonic() + 5
+    while 'AA:01' not in KnownDevices(path):
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_manager_reconnects_last_session(tmp_path):
+    peripheral = SimulatedPeripheral('C0:FF:00:00:00:01', 'HM-10', connect_latency=0.0)
+    manager = BluetoothManager(data_dir=str(tmp_path), backend=SimulatedBackend([peripheral]))
+    try:
+        assert manager.connect_device(manager.backend.device_info(peripheral.address),
+                                      lambda d: None, lambda e: None, lambda d: None).result(5)
+    finally:
+        # 关闭时仍连接的设备属于上次会话
+        manager.shutdown()
+
+    manager = BluetoothManager(data_dir=str(tmp_path), backend=SimulatedBackend([peripheral]))
+    try:
+        connected = []
+        results = manager.reconnect_last_session(connected.append, lambda e: None,
+                                                 lambda d: None).result(5)
+        assert results == {peripheral.address: True}
+        assert [d['address'] for d in connected] == [peripheral.address]
+        assert peripheral.address in manager.clients
+    finally:
+        manager.shutdown()
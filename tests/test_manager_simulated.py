@@ -0,0 +1,220 @@
+"""
+BluetoothManager 在模拟后端上的测试：链路中断后的自动重连、写入顺序和扫描状态
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from bluetooth_manager import BluetoothManager
+from link_supervisor import LINK_LOST, LINK_RECONNECTING, LINK_RESTORED, LINK_STALLED
+from simulated_backend import SimulatedBackend, SimulatedPeripheral
+
+ADDRESS = 'C0:FF:00:00:00:01'
+
+
+def wait_until(predicate, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("等待超时")
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def peripheral():
+    # 写入的数据作为通知回传，便于检查收发两个方向
+    return SimulatedPeripheral(ADDRESS, 'HM-10', connect_latency=0.0, echo=True)
+
+
+@pytest.fixture
+def manager(tmp_path, peripheral):
+    manager = BluetoothManager(data_dir=str(tmp_path), backend=SimulatedBackend([peripheral]))
+    manager.supervisor.base_delay = 0.01
+    yield manager
+    manager.shutdown()
+
+
+def connect(manager, data_callback):
+    device_info = manager.backend.device_info(ADDRESS)
+    errors = []
+    assert manager.connect_device(device_info, lambda info: None, errors.append,
+                                  data_callback).result(5), errors
+
+
+def counters(manager):
+    return manager.metrics.snapshot()['counters']
+
+
+def test_reconnects_after_link_drop(manager, peripheral):
+    received = []
+    states = []
+    manager.supervisor.state_callback = lambda address, state: states.append(state)
+    connect(manager, received.append)
+    first_client = manager.clients[ADDRESS]['client']
+
+    manager.loop.call_soon_threadsafe(peripheral.drop_link)
+    wait_until(lambda: LINK_RESTORED in states)
+
+    assert states == [LINK_LOST, LINK_RECONNECTING, LINK_RESTORED]
+    assert manager.clients[ADDRESS]['client'] is not first_client
+    assert counters(manager)['reconnects'] == 1
+    # 重连后通知重新订阅，原来的 data_callback 继续收到数据
+    assert manager.send_message('after\n')
+    wait_until(lambda: received == ['after'])
+
+
+def test_explicit_disconnect_does_not_reconnect(manager, peripheral):
+    states = []
+    manager.supervisor.state_callback = lambda address, state: states.append(state)
+    connect(manager, lambda message: None)
+    manager.submit(manager.disconnect_device_async(ADDRESS)).result(5)
+    time.sleep(0.1)
+    assert ADDRESS not in manager.clients
+    assert peripheral.client is None
+    assert states == []
+    assert not counters(manager).get('reconnects')
+
+
+def test_link_timeout_can_be_changed_while_connected(manager):
+    states = []
+    manager.supervisor.state_callback = lambda address, state: states.append(state)
+    manager.supervisor.check_interval = 0.02
+    connect(manager, lambda data: None)
+    assert manager.supervisor._watchdog_task is None
+
+    # 连接后再设置超时，看门狗随之启动
+    manager.supervisor.link_timeout = 0.05
+    wait_until(lambda: LINK_STALLED in states)
+    manager.supervisor.link_timeout = None
+    wait_until(lambda: manager.supervisor._watchdog_task is None)
+    with pytest.raises(ValueError):
+        manager.supervisor.link_timeout = 0
+
+
+def test_cancelled_connect_disconnects_client(manager, peripheral):
+    blocked = []
+
+    async def block_forever(client, address):
+        blocked.append(client)
+        await asyncio.sleep(3600)
+
+    # 在链路建立后、连接流程完成前取消
+    manager._watch_service_changed = block_forever
+    future = manager.connect_device(manager.backend.device_info(ADDRESS),
+                                    lambda info: None, lambda error: None, lambda data: None)
+    wait_until(lambda: blocked)
+    assert peripheral.client is blocked[0]
+    future.cancel()
+    wait_until(lambda: peripheral.client is None)
+    assert not blocked[0].is_connected
+    assert ADDRESS not in manager.clients
+    assert manager.connects_pending == 0
+
+
+def test_connect_many_connects_each_address_once(manager, peripheral):
+    device_info = manager.backend.device_info(ADDRESS)
+    errors = []
+    results = manager.connect_many([device_info, dict(device_info)], lambda address, data: None,
+                                   failed_callback=errors.append).result(5)
+    assert list(results) == [ADDRESS]
+    assert results[ADDRESS]['success']
+    assert errors == []
+    assert counters(manager)['connects'] == 1
+
+
+def test_connect_many_skips_device_connected_while_queued(tmp_path):
+    slow = SimulatedPeripheral('C0:FF:00:00:00:02', 'SLOW', connect_latency=0.2)
+    fast = SimulatedPeripheral('C0:FF:00:00:00:03', 'FAST', connect_latency=0.0)
+    backend = SimulatedBackend([slow, fast])
+    manager = BluetoothManager(data_dir=str(tmp_path), backend=backend)
+    try:
+        errors = []
+        future = manager.connect_many([backend.device_info(slow.address),
+                                       backend.device_info(fast.address)],
+                                      lambda address, data: None, max_concurrency=1,
+                                      failed_callback=errors.append)
+        # 批量连接还在等待慢设备时单独连接排在后面的设备
+        assert manager.connect_device(backend.device_info(fast.address), lambda info: None,
+                                      errors.append, lambda data: None).result(5)
+        results = future.result(5)
+        assert results[slow.address]['success'] and results[fast.address]['success']
+        assert errors == []
+        assert counters(manager)['connects'] == 2
+    finally:
+        manager.shutdown()
+
+
+def test_concurrent_writes_keep_order(manager, peripheral):
+    received = []
+    connect(manager, received.append)
+    messages = ['msg-%03d' % i for i in range(100)]
+
+    async def send_all():
+        return await asyncio.gather(*(manager.send_message_async(m + '\n') for m in messages))
+
+    assert all(manager.submit(send_all()).result(5))
+    wait_until(lambda: len(received) == len(messages))
+    assert received == messages
+    # 小消息被合并成较少的写入
+    assert peripheral.writes_received < len(messages)
+
+
+class BrokenScanner:
+    async def start(self):
+        raise OSError('adapter busy')
+
+    async def stop(self):
+        pass
+
+
+def test_decode_and_callback_errors_are_counted_separately(manager):
+    received = []
+
+    def data_callback(message):
+        received.append(message)
+        if message == 'boom':
+            raise RuntimeError('callback failed')
+
+    connect(manager, data_callback)
+    send = lambda data: manager.submit(manager.send_bytes_async(data)).result(5)
+    send(b'boom\nok\n')
+    wait_until(lambda: received == ['boom', 'ok'])
+    assert counters(manager).get('callback_errors') == 1
+    assert not counters(manager).get('decode_errors')
+
+    send(b'bad\xff\n')
+    wait_until(lambda: len(received) == 3)
+    assert received[2] == 'bad�'
+    assert counters(manager)['decode_errors'] == 1
+
+
+def test_scan_state_resets_when_scanner_fails_to_start(manager):
+    manager.backend.create_scanner = lambda callback, **kwargs: BrokenScanner()
+    completed = []
+    manager.scan_devices_streaming(lambda info, is_new: None, completed.append,
+                                   duration=1.0).result(5)
+    assert not manager.is_scanning
+    manager.scan_devices(completed.append).result(5)
+    assert not manager.is_scanning
+    assert completed == [[], []]
+
+
+def test_partial_frame_flushed_after_idle_gap(manager):
+    received = []
+    manager.rx_idle_flush = 0.05
+    connect(manager, received.append)
+    manager.submit(manager.send_bytes_async(b'one\ntwo')).result(5)
+    wait_until(lambda: received == ['one', 'two'])
+
+
+def test_partial_frame_flushed_on_disconnect(manager, peripheral):
+    received = []
+    manager.rx_idle_flush = None
+    connect(manager, received.append)
+    manager.submit(manager.send_bytes_async(b'tail')).result(5)
+    time.sleep(0.05)
+    assert received == []
+    manager.loop.call_soon_threadsafe(peripheral.drop_link)
+    wait_until(lambda: received == ['tail'])
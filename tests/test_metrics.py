@@ -0,0 +1,73 @@
+"""
+metrics 测试：直方图分桶精度、分位数、计数器和设备状态量
+"""
+
+import pytest
+
+from metrics import (MAX_TRACKABLE_US, SUB_BUCKET_COUNT, LatencyHistogram, Metrics,
+                     _bucket_index, _bucket_value)
+
+
+def test_bucket_upper_bound_within_relative_error():
+    values = list(range(0, 5000)) + [2 ** k + d for k in range(12, 26) for d in (-1, 0, 1, 12345)]
+    for value in values:
+        upper = _bucket_value(_bucket_index(value))
+        assert upper >= value
+        assert upper - value <= max(value // SUB_BUCKET_COUNT, 0)
+
+
+def test_bucket_index_is_monotonic():
+    indexes = [_bucket_index(v) for v in range(0, 100000, 7)]
+    assert indexes == sorted(indexes)
+
+
+def test_percentiles_of_uniform_samples():
+    histogram = LatencyHistogram()
+    for ms in range(1, 1001):
+        histogram.record(ms / 1000.0)
+    assert histogram.count == 1000
+    assert histogram.percentile(50) == pytest.approx(0.5, rel=0.04)
+    assert histogram.percentile(90) == pytest.approx(0.9, rel=0.04)
+    assert histogram.percentile(99) == pytest.approx(0.99, rel=0.04)
+    # 分位数不会超过实际记录的最大值
+    assert histogram.percentile(100) == 1.0
+    assert histogram.percentile(0) == pytest.approx(0.001, rel=0.04)
+
+
+def test_out_of_range_samples_are_clamped():
+    histogram = LatencyHistogram()
+    histogram.record(-1.0)
+    histogram.record(MAX_TRACKABLE_US / 1000000.0 * 10)
+    assert histogram.count == 2
+    assert histogram.counts[0] == 1 and histogram.counts[-1] == 1
+
+
+def test_empty_histogram_and_reset():
+    histogram = LatencyHistogram()
+    assert histogram.percentile(50) is None
+    assert histogram.snapshot() == {'count': 0}
+    histogram.record(0.002)
+    snapshot = histogram.snapshot()
+    assert snapshot['count'] == 1
+    assert snapshot['min_ms'] == snapshot['max_ms'] == pytest.approx(2.0)
+    histogram.reset()
+    assert histogram.snapshot() == {'count': 0}
+
+
+def test_metrics_snapshot():
+    metrics = Metrics()
+    metrics.record('write', 0.001)
+    metrics.incr('bytes_out', 10)
+    metrics.incr('bytes_out', 5)
+    metrics.set_gauge('AA', 'chunk_size', 244)
+    metrics.incr_gauge('AA', 'bytes_in', 3)
+    metrics.incr_gauge('AA', 'bytes_in', 4)
+    snapshot = metrics.snapshot()
+    assert snapshot['counters'] == {'bytes_out': 15}
+    assert snapshot['latency']['write']['count'] == 1
+    assert snapshot['devices'] == {'AA': {'chunk_size': 244, 'bytes_in': 7}}
+
+    metrics.remove_device('AA')
+    assert metrics.snapshot()['devices'] == {}
+    metrics.reset()
+    assert metrics.snapshot()['counters'] == {}
@@ -0,0 +1,80 @@
+"""
+proximity 测试：RSSI样本环、平滑、距离估算和增量排名
+"""
+
+import random
+
+import pytest
+
+from proximity import (DEFAULT_MEASURED_POWER, SMOOTHING_EMA, ProximityRanker, RssiTrack,
+                       TX_POWER_TO_1M, estimate_distance)
+
+
+def test_estimate_distance():
+    assert estimate_distance(DEFAULT_MEASURED_POWER) == pytest.approx(1.0)
+    assert estimate_distance(-79, -59, 2.0) == pytest.approx(10.0)
+    assert estimate_distance(-50) < 1.0
+
+
+def test_track_window_is_chronological():
+    track = RssiTrack(window=4)
+    for rssi in (-1, -2, -3):
+        track.add(rssi)
+    assert track.window() == [-1, -2, -3]
+    for rssi in (-4, -5, -6):
+        track.add(rssi)
+    assert track.window() == [-3, -4, -5, -6]
+    assert track.mean() == -4.5
+
+
+def test_ema_smoothing():
+    ranker = ProximityRanker(smoothing=SMOOTHING_EMA, alpha=0.5)
+    assert ranker.update('AA', -60) == -60
+    assert ranker.update('AA', -70) == -65
+    assert ranker.update('AA', None) == -65
+
+
+def test_kalman_smoothing_reduces_noise():
+    rng = random.Random(1)
+    ranker = ProximityRanker()
+    for _ in range(200):
+        smoothed = ranker.update('AA', -70 + rng.randint(-8, 8))
+    assert smoothed == pytest.approx(-70, abs=2.5)
+    assert len(ranker.stats('AA')['samples']) == ranker.window
+
+
+def test_tx_power_sets_reference():
+    ranker = ProximityRanker()
+    ranker.update('AA', -50, tx_power=-9)
+    assert ranker.distance('AA') == pytest.approx(
+        estimate_distance(-50, -9 - TX_POWER_TO_1M, ranker.path_loss_exponent))
+
+
+def test_ranking_matches_full_sort():
+    rng = random.Random(2)
+    ranker = ProximityRanker(smoothing=SMOOTHING_EMA)
+    addresses = ['D%02d' % i for i in range(30)]
+    for _ in range(500):
+        ranker.update(rng.choice(addresses), rng.randint(-95, -40))
+    expected = sorted(ranker._tracks, key=lambda a: ranker.distance(a))
+    assert ranker.ranking() == expected
+    assert ranker.ranking(limit=3) == expected[:3]
+
+
+def test_min_samples_remove_and_clear():
+    ranker = ProximityRanker()
+    ranker.update('NEAR', -40)
+    for _ in range(3):
+        ranker.update('FAR', -90)
+    assert ranker.ranking() == ['NEAR', 'FAR']
+    assert ranker.nearest() == 'FAR'
+    ranker.remove('FAR')
+    assert ranker.ranking() == ['NEAR'] and 'FAR' not in ranker
+    ranker.remove('FAR')
+    ranker.clear()
+    assert len(ranker) == 0 and ranker.ranking() == []
+
+
+def test_invalid_smoothing():
+    with pytest.raises(ValueError):
+        ProximityRanker(smoothing='median')
@@ -0,0 +1,63 @@
+"""
+receive_buffer 测试：各溢出策略和丢弃汇总
+"""
+
+import pytest
+
+from receive_buffer import (DROP_NEWEST, DROP_OLDEST, SUMMARIZE, ReceiveBuffer,
+                            format_summary)
+
+
+def fill(buffer, items):
+    return [buffer.push(item) for item in items]
+
+
+def test_drop_oldest_keeps_latest():
+    buffer = ReceiveBuffer(capacity=2, policy=DROP_OLDEST)
+    assert fill(buffer, ['a', 'b', 'c']) == [True, True, True]
+    assert buffer.drain() == (['b', 'c'], 1)
+
+
+def test_drop_newest_keeps_earliest():
+    buffer = ReceiveBuffer(capacity=2, policy=DROP_NEWEST)
+    assert fill(buffer, ['a', 'b', 'c']) == [True, True, False]
+    items, summary = buffer.drain_summary()
+    assert items == ['a', 'b']
+    assert summary == {'count': 1, 'first': None, 'last': None}
+
+
+def test_summarize_reports_first_and_last_dropped():
+    buffer = ReceiveBuffer(capacity=2, policy=SUMMARIZE)
+    fill(buffer, ['a', 'b', 'c', 'd', 'e'])
+    items, summary = buffer.drain_summary()
+    assert items == ['a', 'b']
+    assert summary == {'count': 3, 'first': 'c', 'last': 'e'}
+    assert buffer.dropped_total == 3
+    # 汇总取出后重新开始
+    fill(buffer, ['f', 'g', 'h'])
+    assert buffer.drain_summary() == (['f', 'g'], {'count': 1, 'first': 'h', 'last': 'h'})
+    assert buffer.drain_summary() == ([], None)
+    assert buffer.dropped_total == 4
+
+
+def test_drain_respects_batch_size():
+    buffer = ReceiveBuffer(capacity=10, policy=SUMMARIZE)
+    fill(buffer, range(5))
+    assert buffer.drain(max_items=3) == ([0, 1, 2], 0)
+    assert len(buffer) == 2
+    buffer.clear()
+    assert buffer.drain() == ([], 0)
+
+
+def test_format_summary_truncates_items():
+    summary = {'count': 2, 'first': 'x' * 100, 'last': b'\x01\x02'}
+    text = format_summary(summary, 7)
+    assert 'x' * 32 + '…' in text and 'x' * 33 not in text
+    assert '01 02' in text
+    assert '累计丢弃 7 条' in text
+    assert format_summary({'count': 1, 'first': 'ok', 'last': 'ok'}, 1).count('ok') == 1
+
+
+def test_unknown_policy_rejected():
+    with pytest.raises(ValueError):
+        ReceiveBuffer(policy='drop_all')
@@ -0,0 +1,86 @@
+"""
+scan_filter 测试：各过滤条件、统计计数和服务UUID下推
+"""
+
+import pytest
+
+from bluetooth_manager import BluetoothManager
+from scan_filter import ScanFilter
+from simulated_backend import SimulatedAdvertisementData, SimulatedBackend, SimulatedDevice
+
+SERIAL_UUID = '0000ffe0-0000-1000-8000-00805f9b34fb'
+
+
+def advertisement(rssi=-60, local_name=None, service_uuids=(), manufacturer_data=None):
+    return SimulatedAdvertisementData(local_name, rssi, list(service_uuids),
+                                      manufacturer_data or {}, {}, None)
+
+
+def test_empty_filter_accepts_everything():
+    scan_filter = ScanFilter()
+    assert scan_filter.matches(SimulatedDevice('AA:01', None), advertisement())
+    assert scan_filter.scanner_options() == {}
+
+
+def test_min_rssi():
+    scan_filter = ScanFilter(min_rssi=-70)
+    device = SimulatedDevice('AA:01', 'x')
+    assert scan_filter.matches(device, advertisement(rssi=-70))
+    assert not scan_filter.matches(device, advertisement(rssi=-71))
+    assert (scan_filter.accepted, scan_filter.rejected) == (1, 1)
+
+
+def test_addresses_match_either_case():
+    scan_filter = ScanFilter(addresses=['aa:bb:cc:dd:ee:ff'], exclude_addresses=['11:22:33:44:55:66'])
+    assert scan_filter.matches(SimulatedDevice('AA:BB:CC:DD:EE:FF', None), advertisement())
+    assert not scan_filter.matches(SimulatedDevice('AA:BB:CC:DD:EE:00', None), advertisement())
+    assert not ScanFilter(exclude_addresses=['11:22:33:44:55:66']).matches(
+        SimulatedDevice('11:22:33:44:55:66', None), advertisement())
+
+
+def test_name_pattern_falls_back_to_local_name():
+    scan_filter = ScanFilter(name_pattern=r'^HC-0[56]$')
+    assert scan_filter.matches(SimulatedDevice('AA:01', 'HC-05'), advertisement())
+    assert scan_filter.matches(SimulatedDevice('AA:02', None), advertisement(local_name='HC-06'))
+    assert not scan_filter.matches(SimulatedDevice('AA:03', None), advertisement())
+    assert not scan_filter.matches(SimulatedDevice('AA:04', 'ESP32'), advertisement())
+
+
+def test_service_uuids_and_manufacturer_ids():
+    scan_filter = ScanFilter(service_uuids=[SERIAL_UUID.upper()], manufacturer_ids=[0x004C])
+    device = SimulatedDevice('AA:01', None)
+    assert scan_filter.scanner_options() == {'service_uuids': [SERIAL_UUID]}
+    assert scan_filter.matches(device, advertisement(service_uuids=[SERIAL_UUID],
+                                                     manufacturer_data={0x004C: b'\x01'}))
+    assert not scan_filter.matches(device, advertisement(service_uuids=[SERIAL_UUID]))
+    assert not scan_filter.matches(device, advertisement(manufacturer_data={0x004C: b'\x01'}))
+
+
+class CapturingBackend(SimulatedBackend):
+    """记录 create_scanner 参数的模拟后端"""
+
+    def create_scanner(self, detection_callback, **kwargs):
+        self.detection_callback = detection_callback
+        self.scanner_options = kwargs
+        return super().create_scanner(detection_callback, **kwargs)
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = BluetoothManager(data_dir=str(tmp_path), backend=CapturingBackend())
+    yield manager
+    manager.shutdown()
+
+
+def test_manager_pushes_service_uuids_and_filters_in_callback(manager):
+    detected = []
+    scan_filter = ScanFilter(service_uuids=[SERIAL_UUID], min_rssi=-80)
+    manager._create_scanner(lambda device, adv: detected.append(device.address), scan_filter)
+    backend = manager.backend
+    assert backend.scanner_options == {'service_uuids': [SERIAL_UUID]}
+
+    backend.detection_callback(SimulatedDevice('AA:01', None),
+                               advertisement(rssi=-60, service_uuids=[SERIAL_UUID]))
+    backend.detection_callback(SimulatedDevice('AA:02', None),
+                               advertisement(rssi=-90, service_uuids=[SERIAL_UUID]))
+    assert detected == ['AA:01']
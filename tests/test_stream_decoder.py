@@ -0,0 +1,108 @@
+"""
+stream_decoder 测试：跨包的多字节字符、各种分帧方式和无效字节统计
+"""
+
+import pytest
+
+from stream_decoder import (FRAMING_CRLF, FRAMING_DELIMITER, FRAMING_FIXED, FRAMING_NEWLINE,
+                            FRAMING_NONE, StreamDecoder)
+
+
+def feed_all(decoder, packets):
+    frames = []
+    for packet in packets:
+        frames.extend(decoder.feed(packet))
+    return frames
+
+
+TEXT = '温度: 25℃ 😀\n'.encode('utf-8')
+
+
+@pytest.mark.parametrize('split', range(1, len(TEXT)))
+def test_multibyte_characters_split_across_packets(split):
+    decoder = StreamDecoder()
+    assert feed_all(decoder, [TEXT[:split], TEXT[split:]]) == ['温度: 25℃ 😀']
+    assert decoder.decode_errors == 0
+    assert not decoder.pending
+
+
+def test_byte_by_byte_feed():
+    decoder = StreamDecoder()
+    assert feed_all(decoder, [TEXT[i:i + 1] for i in range(len(TEXT))]) == ['温度: 25℃ 😀']
+
+
+def test_partial_character_is_pending_until_completed():
+    decoder = StreamDecoder(framing=FRAMING_NONE)
+    data = '中'.encode('utf-8')
+    assert decoder.feed(data[:2]) == []
+    assert decoder.pending
+    assert decoder.feed(data[2:]) == ['中']
+
+
+def test_newline_framing_strips_carriage_return():
+    decoder = StreamDecoder(framing=FRAMING_NEWLINE)
+    assert feed_all(decoder, [b'a\r\nb', b'\nc']) == ['a', 'b']
+    assert decoder.flush() == ['c']
+
+
+def test_crlf_and_delimiter_framing():
+    assert feed_all(StreamDecoder(framing=FRAMING_CRLF), [b'a\nb\r', b'\nc']) == ['a\nb']
+    decoder = StreamDecoder(framing=FRAMING_DELIMITER, delimiter=';')
+    assert feed_all(decoder, [b'x;y', b';']) == ['x', 'y']
+
+
+def test_fixed_framing_counts_characters_not_bytes():
+    decoder = StreamDecoder(framing=FRAMING_FIXED, frame_length=2)
+    data = '你好世界'.encode('utf-8')
+    assert feed_all(decoder, [data[:4], data[4:]]) == ['你好', '世界']
+
+
+def test_invalid_bytes_are_replaced_and_counted():
+    decoder = StreamDecoder()
+    assert decoder.feed(b'a\xffb\n') == ['a�b']
+    assert decoder.decode_errors == 1
+    # 出错后解码状态仍然正确，后续跨包字符不受影响
+    data = '好\n'.encode('utf-8')
+    assert feed_all(decoder, [data[:1], data[1:]]) == ['好']
+    assert decoder.decode_errors == 1
+
+
+def test_literal_replacement_character_is_not_an_error():
+    decoder = StreamDecoder()
+    assert decoder.feed('�\n'.encode('utf-8')) == ['�']
+    assert decoder.decode_errors == 0
+
+
+def test_flush_truncated_character_counts_error():
+    decoder = StreamDecoder()
+    assert decoder.feed(b'x\xe4\xb8') == []
+    assert decoder.flush() == ['x�']
+    assert decoder.decode_errors == 1
+    assert not decoder.pending
+
+
+def test_overlong_frame_is_forced_out():
+    decoder = StreamDecoder(max_frame_length=8)
+    assert decoder.feed(b'0123456789') == ['0123456789']
+    assert not decoder.pending
+
+
+def test_invalid_framing_arguments():
+    with pytest.raises(ValueError):
+        StreamDecoder(framing='bogus')
+    with pytest.raises(ValueError):
+        StreamDecoder(framing=FRAMING_DELIMITER)
+    with pytest.raises(ValueError):
+        StreamDecoder(framing=FRAMING_FIXED, frame_length=0)
+
+
+def test_pending_tracks_buffer_and_partial_character():
+    decoder = StreamDecoder()
+    assert not decoder.pending
+    decoder.feed(b'abc')
+    assert decoder.pending
+    assert decoder.flush() == ['abc']
+    assert not decoder.pending
+    # 只有半个多字节字符时也算未输出
+    decoder.feed('中'.encode('utf-8')[:1])
+    assert decoder.pending
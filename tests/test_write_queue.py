@@ -0,0 +1,109 @@
+"""
+write_queue 测试：消息顺序、小消息合并和队列满时的背压
+"""
+
+import asyncio
+
+import pytest
+
+from write_queue import WriteQueue
+
+
+class FakeWriter:
+    """记录每次写入的 BulkWriter 替身，gate 未set时写入会阻塞"""
+
+    def __init__(self, chunk_size: int = 20):
+        self.chunk_size = chunk_size
+        self.writes = []
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    async def write(self, data):
+        await self.gate.wait()
+        self.writes.append(bytes(data))
+        return {'bytes': len(data)}
+
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, 5))
+
+
+def test_messages_are_written_in_order_and_coalesced():
+    async def main():
+        writer = FakeWriter(chunk_size=20)
+        queue = WriteQueue(writer, flush_delay=0.01)
+        messages = [b'msg%02d;' % i for i in range(30)]
+        stats = await asyncio.gather(*(queue.send(m) for m in messages))
+        queue.close()
+        return writer, messages, stats
+
+    writer, messages, stats = run(main())
+    assert b''.join(writer.writes) == b''.join(messages)
+    # 每次写入都不超过一个分包，且每条消息完整地包含在一次写入中
+    assert all(len(w) <= writer.chunk_size for w in writer.writes)
+    assert all(len(w) % len(messages[0]) == 0 for w in writer.writes)
+    assert len(writer.writes) < len(messages)
+    assert all(s['bytes'] in {len(w) for w in writer.writes} for s in stats)
+
+
+def test_message_larger_than_chunk_is_written_alone():
+    async def main():
+        writer = FakeWriter(chunk_size=4)
+        queue = WriteQueue(writer, flush_delay=0)
+        await asyncio.gather(queue.send(b'a'), queue.send(b'0123456789'), queue.send(b'b'))
+        queue.close()
+        return writer
+
+    assert run(main()).writes == [b'a', b'0123456789', b'b']
+
+
+def test_backpressure_blocks_senders_and_keeps_order():
+    async def main():
+        writer = FakeWriter(chunk_size=1)
+        writer.gate.clear()
+        queue = WriteQueue(writer, flush_delay=0, max_depth=2)
+        tasks = [asyncio.ensure_future(queue.send(b'%d' % i)) for i in range(6)]
+        await asyncio.sleep(0.05)
+        # 一批正在写出，排队的消息不超过 max_depth，其余发送方在等待入队
+        depth = len(queue)
+        waiting = sum(1 for t in tasks if not t.done())
+        writer.gate.set()
+        await asyncio.gather(*tasks)
+        queue.close()
+        return writer, depth, waiting
+
+    writer, depth, waiting = run(main())
+    assert 1 <= depth <= 2
+    assert waiting == 6
+    assert writer.writes == [b'%d' % i for i in range(6)]
+
+
+def test_close_fails_pending_messages():
+    async def main():
+        writer = FakeWriter()
+        writer.gate.clear()
+        queue = WriteQueue(writer, flush_delay=0)
+        tasks = [asyncio.ensure_future(queue.send(b'x')) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        queue.close()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        with pytest.raises(ConnectionError):
+            await queue.send(b'y')
+        return results
+
+    results = run(main())
+    assert all(isinstance(r, ConnectionError) for r in results)
+
+
+def test_writer_error_is_raised_to_the_batch():
+    class FailingWriter(FakeWriter):
+        async def write(self, data):
+            raise OSError('write failed')
+
+    async def main():
+        queue = WriteQueue(FailingWriter(), flush_delay=0)
+        with pytest.raises(OSError):
+            await queue.send(b'x')
+        queue.close()
+
+    run(main())
@@ -0,0 +1,81 @@
+"""
+UI更新调度模块
+收集任意线程提交的界面修改，每帧在UI线程中统一应用一次
+"""
+
+import threading
+from typing import Callable, Hashable
+
+from kivy.clock import Clock
+from kivy.logger import Logger
+
+
+class UIDispatcher:
+    """按帧合并的UI更新调度器
+
+    - set(key, ...)：幂等的状态修改（状态文字、按钮状态、设备列表），同一key在一帧内只应用最后一次
+    - append(key, ...)：可合并的批量数据（日志行），一帧内的条目合并成一次调用
+    - call(...)：其余一次性操作，按提交顺序执行
+
+    每帧依次应用 set、append、call。所有方法都可以在任意线程调用，
+    回调总是在UI线程中执行。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._fields = {}
+        self._batches = {}
+        self._calls = []
+        self._trigger = Clock.create_trigger(self._apply)
+
+    def set(self, key: Hashable, func: Callable, *args):
+        """登记幂等修改：本帧内同一key只执行最后一次 func(*args)"""
+        with self._lock:
+            self._fields.pop(key, None)
+            self._fields[key] = (func, args)
+        self._trigger()
+
+    def set_attr(self, widget, name: str, value):
+        """设置控件属性（同一控件同一属性以最后一次为准）"""
+        self.set((id(widget), name), setattr, widget, name, value)
+
+    def append(self, key: Hashable, func: Callable, item):
+        """登记批量数据：本帧内同一key的条目合并为一次 func(items)"""
+        with self._lock:
+            batch = self._batches.get(key)
+            if batch is None:
+                self._batches[key] = (func, [item])
+            else:
+                batch[1].append(item)
+        self._trigger()
+
+    def call(self, func: Callable, *args):
+        """登记一次性操作"""
+        with self._lock:
+            self._calls.append((func, args))
+        self._trigger()
+
+    def flush(self):
+        """立即应用所有待处理的修改（只能在UI线程中调用）"""
+        self._apply(0)
+
+    def _apply(self, dt):
+        with self._lock:
+            fields, self._fields = self._fields, {}
+            batches, self._batches = self._batches, {}
+            calls, self._calls = self._calls, []
+
+        for func, args in fields.values():
+            self._run(func, *args)
+        for func, items in batches.values():
+            self._run(func, items)
+        for func, args in calls:
+            self._run(func, *args)
+
+    @staticmethod
+    def _run(func, *args):
+        try:
+            func(*args)
+        except Exception as e:
+            # 单个修改失败不影响本帧其余修改
+            Logger.error(f"UIDispatcher: UI更新失败: {e}")
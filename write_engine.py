@@ -0,0 +1,88 @@
+"""
+批量写入模块
+根据协商的MTU拆分数据，并在特征值允许时使用无响应写入流水线发送
+"""
+
+import asyncio
+import time
+from typing import Dict, Optional, Union
+
+from kivy.logger import Logger
+
+# ATT写请求头部占用的字节数
+ATT_HEADER_SIZE = 3
+# BLE默认的ATT MTU
+DEFAULT_MTU = 23
+
+
+class BulkWriter:
+    """面向单个连接、单个特征值的批量写入器
+
+    char_specifier 可以是句柄/UUID，也可以是连接时已解析出的特征值对象（不再查找）；
+    response 为None时按特征值属性决定写入方式，True/False 强制有/无响应写入。
+    """
+
+    def __init__(self, client, char_specifier, response: Optional[bool] = None):
+        self.client = client
+        self.char_specifier = char_specifier
+        self.characteristic = None
+        self.forced_response = response
+        self.response = True if response is None else response
+        self.chunk_size = DEFAULT_MTU - ATT_HEADER_SIZE
+
+    def resolve(self):
+        """读取协商MTU和特征值属性，确定分包大小和写入方式"""
+        try:
+            mtu = self.client.mtu_size or DEFAULT_MTU
+        except Exception:
+            mtu = DEFAULT_MTU
+        chunk_size = max(mtu - ATT_HEADER_SIZE, 1)
+
+        characteristic = None
+        services = getattr(self.client, 'services', None)
+        if hasattr(self.char_specifier, 'properties'):
+            characteristic = self.char_specifier
+        elif services is not None:
+            try:
+                characteristic = services.get_characteristic(self.char_specifier)
+            except Exception:
+                characteristic = None
+
+        if characteristic is not None:
+            self.characteristic = characteristic
+            if self.forced_response is None:
+                self.response = 'write-without-response' not in characteristic.properties
+            else:
+                self.response = self.forced_response
+            if not self.response:
+                chunk_size = getattr(characteristic, 'max_write_without_response_size', chunk_size)
+
+        self.chunk_size = chunk_size
+        Logger.info(f"写入参数: MTU={mtu}, 分包={self.chunk_size}, "
+                    f"{'有响应' if self.response else '无响应'}写入")
+
+    async def write(self, data: Union[bytes, bytearray, memoryview]) -> Dict:
+        """分包写入数据，返回发送统计信息"""
+        target = self.characteristic if self.characteristic is not None else self.char_specifier
+        view = memoryview(data)
+        total = len(view)
+        chunk_size = self.chunk_size
+        chunks = 0
+
+        start = time.perf_counter()
+        for offset in range(0, total, chunk_size):
+            await self.client.write_gatt_char(
+                target, view[offset:offset + chunk_size], response=self.response
+            )
+            chunks += 1
+            if not self.response:
+                # 无响应写入不会让出事件循环，主动让出以便处理通知
+                await asyncio.sleep(0)
+        elapsed = time.perf_counter() - start
+
+        return {
+            'bytes': total,
+            'chunks': chunks,
+            'elapsed': elapsed,
+            'bytes_per_sec': total / elapsed if elapsed > 0 else 0.0
+        }
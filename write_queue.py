@@ -0,0 +1,123 @@
+"""
+写入队列模块
+每个连接一个发送队列，把连续的小消息合并成MTU大小的写入
+"""
+
+import asyncio
+from collections import deque
+from typing import Dict, List, Tuple
+
+# 默认合并等待时间（秒）
+DEFAULT_FLUSH_DELAY = 0.005
+# 默认最大排队消息数，超过后发送方需要等待
+DEFAULT_MAX_DEPTH = 256
+
+
+class WriteQueue:
+    """合并小消息的单连接发送队列
+
+    消息按入队顺序写出，每条消息完整地包含在一次批量写入中；
+    send() 在消息实际写出后返回该批次的发送统计。
+    队列中不足一个分包的数据最多等待 flush_delay 秒再写出。
+    """
+
+    def __init__(self, writer, flush_delay: float = DEFAULT_FLUSH_DELAY,
+                 max_depth: int = DEFAULT_MAX_DEPTH):
+        self.writer = writer
+        self.flush_delay = flush_delay
+        self.max_depth = max_depth
+        self._pending = deque()
+        self._pending_bytes = 0
+        self._wakeup = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+        self._enqueue_lock = asyncio.Lock()
+        self._task = None
+        self._closed = False
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    async def send(self, data: bytes) -> Dict:
+        """消息入队并等待写出完成，队列已满时等待（背压）"""
+        # 入队锁按先来先得唤醒等待者，保证背压时消息顺序不变
+        async with self._enqueue_lock:
+            while len(self._pending) >= self.max_depth and not self._closed:
+                self._not_full.clear()
+                await self._not_full.wait()
+            if self._closed:
+                raise ConnectionError("写入队列已关闭")
+
+            future = asyncio.get_running_loop().create_future()
+            self._pending.append((data, future))
+            self._pending_bytes += len(data)
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+        self._wakeup.set()
+        return await future
+
+    def close(self):
+        """关闭队列，未写出的消息以ConnectionError结束"""
+        self._closed = True
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        while self._pending:
+            _, future = self._pending.popleft()
+            if not future.done():
+                future.set_exception(ConnectionError("连接已断开，消息未发送"))
+        self._pending_bytes = 0
+        self._not_full.set()
+
+    def _take_batch(self, chunk_size: int) -> List[Tuple[bytes, asyncio.Future]]:
+        """取出不超过一个分包大小的若干条消息（至少一条）"""
+        data, future = self._pending.popleft()
+        batch = [(data, future)]
+        size = len(data)
+        while self._pending and size + len(self._pending[0][0]) <= chunk_size:
+            data, future = self._pending.popleft()
+            batch.append((data, future))
+            size += len(data)
+        self._pending_bytes -= size
+        return batch
+
+    async def _run(self):
+        """后台写出任务"""
+        loop = asyncio.get_running_loop()
+        while not self._closed:
+            if not self._pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            chunk_size = self.writer.chunk_size
+            # 不足一个分包时等待后续消息，直到截止时间
+            if self._pending_bytes < chunk_size and self.flush_delay > 0:
+                deadline = loop.time() + self.flush_delay
+                while self._pending_bytes < chunk_size:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+
+            batch = self._take_batch(chunk_size)
+            try:
+                stats = await self.writer.write(b''.join(data for data, _ in batch))
+            except asyncio.CancelledError:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(ConnectionError("连接已断开，消息未发送"))
+                raise
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_result(stats)
+            self._not_full.set()